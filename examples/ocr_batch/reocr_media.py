@@ -0,0 +1,48 @@
+# insert path. Can be removed if whisper_test is installed
+import sys
+from pathlib import Path
+
+root_dir = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(root_dir))
+
+import argparse
+import json
+from glob import glob
+from os.path import join
+from time import time
+
+from whisper_test.common import EZ_OCR_BATCH_SIZE
+from whisper_test.ocr_utils import ocr_images_batched
+from whisper_test.omniparser_client import get_omniparser_client
+
+# screenshots OCRed per call, bounds the memory used by decoded images
+CHUNK_SIZE = 32
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-OCR the screenshots of a data collection run.")
+    parser.add_argument("media_dir", nargs="?", default="media_output", help="Directory with the screenshots")
+    parser.add_argument("--batch-size", type=int, default=EZ_OCR_BATCH_SIZE, help="Text boxes per recognition batch")
+    parser.add_argument("--service", choices=["ez_ocr", "omniparser"], default="ez_ocr",
+                        help="omniparser: send the screenshots in /process_batch requests")
+    args = parser.parse_args()
+
+    # skip the images annotated with bounding boxes
+    img_paths = sorted(p for p in glob(join(args.media_dir, "*.png")) if not p.endswith("-out.png"))
+    t0 = time()
+    for i in range(0, len(img_paths), CHUNK_SIZE):
+        chunk = img_paths[i:i + CHUNK_SIZE]
+        if args.service == "omniparser":
+            chunk_results = get_omniparser_client().process_batch(chunk)
+        else:
+            chunk_results = ocr_images_batched(chunk, batch_size=args.batch_size)
+        for img_path, results in zip(chunk, chunk_results):
+            # same format as ocr_img_by_ez_ocr
+            with open(img_path.replace(".png", "") + f"{args.service}.json", 'w') as f:
+                f.write(json.dumps({img_path: results}, indent=4, default=str))
+        print(f"{min(i + CHUNK_SIZE, len(img_paths))}/{len(img_paths)} screenshots")
+    print(f"OCRed {len(img_paths)} screenshots in {time() - t0:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Accuracy and speed of the int8 ONNX OCR engine against the stock easyocr reader.
+
+Runs both readers over a fixture set of screenshots. Accuracy is the text of
+the ONNX reader compared with the stock reader (character similarity of the
+sorted texts, and the share of stock texts found); with `--truth`, both are
+also scored against the expected texts. Speed is the per-screenshot latency
+at each onnxruntime thread count.
+
+USAGE:
+    python examples/ocr_onnx_benchmark/ocr_onnx_benchmark.py media_output
+    python examples/ocr_onnx_benchmark/ocr_onnx_benchmark.py fixtures --truth fixtures/truth.json --threads 1,2,4
+
+`truth.json` maps screenshot file names to the texts expected on them.
+"""
+# insert path. Can be removed if whisper_test is installed
+import sys
+from pathlib import Path
+
+root_dir = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(root_dir))
+
+import argparse
+import json
+import statistics
+from difflib import SequenceMatcher
+from glob import glob
+from os.path import basename, join
+from time import time
+
+from easyocr import Reader
+
+from whisper_test.common import EZ_OCR_LANGUAGES
+from whisper_test.ocr_onnx import attach_onnx_models, build_onnx_reader, onnx_model_paths, onnx_threads
+from whisper_test.screen_elements import normalize_caption
+
+
+def read_texts(reader: Reader, img_paths: list) -> tuple:
+    """OCR each screenshot; return the normalized texts and the latencies (after one warm-up run)."""
+    reader.readtext(img_paths[0])
+    texts, latencies = {}, []
+    for img_path in img_paths:
+        t0 = time()
+        detections = reader.readtext(img_path)
+        latencies.append(time() - t0)
+        texts[img_path] = [normalize_caption(detection[1]) for detection in detections]
+    return texts, latencies
+
+
+def char_similarity(texts: list, reference: list) -> float:
+    return SequenceMatcher(None, " ".join(sorted(texts)), " ".join(sorted(reference))).ratio()
+
+
+def recall(texts: list, reference: list) -> float:
+    """Share of the reference texts that were read exactly."""
+    if not reference:
+        return 1.0
+    found = set(texts)
+    return sum(text in found for text in reference) / len(reference)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the int8 ONNX OCR engine with the stock easyocr reader.")
+    parser.add_argument("fixtures_dir", nargs="?", default="media_output", help="Directory with the screenshots")
+    parser.add_argument("--truth", help="JSON file mapping screenshot file names to the expected texts")
+    parser.add_argument("--threads", default=str(onnx_threads()), help="Comma-separated onnxruntime thread counts")
+    args = parser.parse_args()
+
+    img_paths = sorted(p for p in glob(join(args.fixtures_dir, "*.png")) if not p.endswith("-out.png"))
+    if not img_paths:
+        print(f"No screenshots found in {args.fixtures_dir}")
+        return
+    truth = {}
+    if args.truth:
+        with open(args.truth) as f:
+            truth = {name: [normalize_caption(text) for text in texts] for name, texts in json.load(f).items()}
+
+    # the stock CPU configuration of easyocr: torch with int8 dynamic quantization of the LSTMs
+    stock_texts, stock_latencies = read_texts(Reader(EZ_OCR_LANGUAGES, gpu=False), img_paths)
+    # quantizes the models on first use, calibrated on the fixture screenshots
+    onnx_reader = build_onnx_reader(EZ_OCR_LANGUAGES, calibration_dir=args.fixtures_dir)
+    detector_path, recognizer_path = onnx_model_paths(onnx_reader)
+
+    print(f"{len(img_paths)} screenshots, stock easyocr: {statistics.median(stock_latencies):.3f} s per screenshot")
+    print(f"{'threads':>7s} {'latency p50':>12s} {'speedup':>8s} {'char sim':>9s} {'recall':>7s}"
+          + (f" {'truth recall (stock/onnx)':>26s}" if truth else ""))
+    for threads in (int(t) for t in args.threads.split(",")):
+        attach_onnx_models(onnx_reader, detector_path, recognizer_path, threads)
+        onnx_texts, onnx_latencies = read_texts(onnx_reader, img_paths)
+        latency = statistics.median(onnx_latencies)
+        similarity = statistics.mean(char_similarity(onnx_texts[p], stock_texts[p]) for p in img_paths)
+        stock_recall = statistics.mean(recall(onnx_texts[p], stock_texts[p]) for p in img_paths)
+        line = (f"{threads:7d} {latency:11.3f}s {statistics.median(stock_latencies) / latency:7.1f}x "
+                f"{similarity:9.3f} {stock_recall:7.3f}")
+        if truth:
+            scored = [p for p in img_paths if basename(p) in truth]
+            truth_stock = statistics.mean(recall(stock_texts[p], truth[basename(p)]) for p in scored)
+            truth_onnx = statistics.mean(recall(onnx_texts[p], truth[basename(p)]) for p in scored)
+            line += f" {truth_stock:12.3f} / {truth_onnx:.3f}"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
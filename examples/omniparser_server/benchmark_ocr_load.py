@@ -0,0 +1,145 @@
+"""Load benchmark of the Omniparser OCR path.
+
+Sends screenshots through `OmniparserClient` at increasing concurrency and
+reports the per-request latency, the latency of a navigation step (the
+before/after screenshot pair compared by `has_screen_changed`) and the
+throughput. Runs against a real Omniparser service or starts the local
+stand-in server (omniparser_server.py).
+
+USAGE:
+    python examples/omniparser_server/benchmark_ocr_load.py --start-server --latency 0.5
+    python examples/omniparser_server/benchmark_ocr_load.py --url http://gpu-box:5003/process media_output
+    python examples/omniparser_server/benchmark_ocr_load.py --start-server --upload-format png --upload-max-dim 0
+    python examples/omniparser_server/benchmark_ocr_load.py --start-server --model-slots 1 --batch-window 0.02
+"""
+# insert path. Can be removed if whisper_test is installed
+import sys
+from pathlib import Path
+
+root_dir = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(root_dir))
+
+import argparse
+import logging
+import statistics
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from glob import glob
+from os.path import join
+from tempfile import TemporaryDirectory
+from time import time
+
+from PIL import Image
+from werkzeug.serving import make_server
+
+from whisper_test.common import OMNIPARSER_UPLOAD_FORMAT, OMNIPARSER_UPLOAD_MAX_DIM, OMNIPARSER_BATCH_WINDOW
+from whisper_test.omniparser_client import OmniparserClient, OMNIPARSER_OCR_API_URL
+from whisper_test.voice_cmd_stats import _percentile
+
+from omniparser_server import create_app, FixturesBackend
+
+N_SYNTHETIC_SCREENSHOTS = 8
+IPHONE_SCREEN_SIZE = (1179, 2556)
+
+
+def make_synthetic_screenshots(out_dir: str) -> list:
+    """Write screenshot-sized PNGs, used when no screenshot directory is given."""
+    paths = []
+    for idx in range(N_SYNTHETIC_SCREENSHOTS):
+        path = join(out_dir, f"screen_{idx}.png")
+        Image.new("RGB", IPHONE_SCREEN_SIZE, (idx * 30 % 256, 120, 200)).save(path)
+        paths.append(path)
+    return paths
+
+
+def navigation_step(client: OmniparserClient, sc_before: str, sc_after: str) -> tuple:
+    """OCR a before/after pair as has_screen_changed does; return the step and request latencies."""
+    t0 = time()
+    future_before = client.submit(sc_before)
+    t_after = time()
+    client.process(sc_after)
+    latency_after = time() - t_after
+    future_before.result()
+    return time() - t0, latency_after
+
+
+def run_level(url: str, img_paths: list, concurrency: int, n_steps: int,
+              upload_format: str = OMNIPARSER_UPLOAD_FORMAT, upload_max_dim: int = OMNIPARSER_UPLOAD_MAX_DIM,
+              batch_window: float = OMNIPARSER_BATCH_WINDOW) -> dict:
+    """Run `n_steps` navigation steps, `concurrency` of them at a time."""
+    # two requests per step are in flight at once
+    client = OmniparserClient(url, pool_size=2 * concurrency, upload_format=upload_format,
+                              upload_max_dim=upload_max_dim, batch_window=batch_window)
+    pairs = [(img_paths[i % len(img_paths)], img_paths[(i + 1) % len(img_paths)]) for i in range(n_steps)]
+    t0 = time()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(lambda pair: navigation_step(client, *pair), pairs))
+    duration = time() - t0
+    client.close()
+    step_latencies = [step for step, _ in results]
+    request_latencies = [request for _, request in results]
+    return {
+        "concurrency": concurrency,
+        "request_p50": statistics.median(request_latencies),
+        "request_p95": _percentile(request_latencies, 95),
+        "step_p50": statistics.median(step_latencies),
+        "step_p95": _percentile(step_latencies, 95),
+        "requests_per_s": 2 * n_steps / duration,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load benchmark of the Omniparser OCR path.")
+    parser.add_argument("media_dir", nargs="?", help="Directory with screenshots (default: synthetic screenshots)")
+    parser.add_argument("--url", default=OMNIPARSER_OCR_API_URL, help="Omniparser /process endpoint")
+    parser.add_argument("--start-server", action="store_true", help="Start the local stand-in server")
+    parser.add_argument("--latency", type=float, default=0.5, help="Latency of the stand-in server in seconds")
+    parser.add_argument("--model-slots", type=int, default=0,
+                        help="Requests the stand-in server runs at once, as on one GPU (default 0: unlimited)")
+    parser.add_argument("--concurrency", default="1,2,4,8", help="Comma-separated concurrency levels")
+    parser.add_argument("--steps", type=int, default=16, help="Navigation steps per concurrency level")
+    parser.add_argument("--upload-format", choices=["jpeg", "webp", "png"], default=OMNIPARSER_UPLOAD_FORMAT)
+    parser.add_argument("--upload-max-dim", type=int, default=OMNIPARSER_UPLOAD_MAX_DIM,
+                        help="Longest side of the uploaded screenshots (0: full resolution)")
+    parser.add_argument("--batch-window", type=float, default=OMNIPARSER_BATCH_WINDOW,
+                        help="Seconds concurrent requests wait to share a /process_batch request (0: off)")
+    args = parser.parse_args()
+
+    # one log line per request would drown the results
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    logging.getLogger("urllib3").setLevel(logging.WARNING)
+    logging.getLogger("PIL").setLevel(logging.WARNING)
+    server = None
+    url = args.url
+    if args.start_server:
+        app = create_app(FixturesBackend(), latency=args.latency, jitter=args.latency / 10,
+                         model_slots=args.model_slots)
+        server = make_server("127.0.0.1", 0, app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_port}/process"
+
+    with TemporaryDirectory() as tmp_dir:
+        if args.media_dir:
+            img_paths = sorted(p for p in glob(join(args.media_dir, "*.png")) if not p.endswith("-out.png"))
+        else:
+            img_paths = make_synthetic_screenshots(tmp_dir)
+        if not img_paths:
+            print(f"No screenshots found in {args.media_dir}")
+            return
+        print(f"Benchmarking {url} with {len(img_paths)} screenshots "
+              f"({args.upload_format} uploads, max dim {args.upload_max_dim or 'full'}, "
+              f"batch window {args.batch_window} s)")
+        print(f"{'concurrency':>11s} {'request p50':>12s} {'request p95':>12s} "
+              f"{'step p50':>9s} {'step p95':>9s} {'requests/s':>11s}")
+        for concurrency in (int(c) for c in args.concurrency.split(",")):
+            r = run_level(url, img_paths, concurrency, args.steps, args.upload_format, args.upload_max_dim,
+                          args.batch_window)
+            print(f"{r['concurrency']:11d} {r['request_p50']:11.3f}s {r['request_p95']:11.3f}s "
+                  f"{r['step_p50']:8.3f}s {r['step_p95']:8.3f}s {r['requests_per_s']:11.1f}")
+
+    if server is not None:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
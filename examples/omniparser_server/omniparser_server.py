@@ -0,0 +1,200 @@
+"""Local stand-in for the Omniparser OCR service.
+
+Speaks the same `/process` contract as the real service (multipart `image`,
+`img_name` and `return_image` form fields; `structured_results` and
+`based64_image` in the response), plus `/process_batch` (repeated `images`
+and `img_names` fields; a `results` list with one such response, or an
+`error`, per image), so `ocr_img_by_omniparser`,
+`has_screen_changed` and the OCR navigation paths can be tested and
+benchmarked without it. Results come from easyocr or from canned fixtures,
+and a configurable latency emulates a remote GPU server.
+
+USAGE:
+    python examples/omniparser_server/omniparser_server.py --backend fixtures --latency 0.5
+    python examples/omniparser_server/omniparser_server.py --backend easyocr --port 5003
+    python examples/omniparser_server/omniparser_server.py --latency 0.5 --batch-item-latency 0.1
+"""
+# insert path. Can be removed if whisper_test is installed
+import sys
+from pathlib import Path
+
+root_dir = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(root_dir))
+
+import argparse
+import base64
+import hashlib
+import json
+import random
+import time
+from io import BytesIO
+from contextlib import nullcontext
+from threading import BoundedSemaphore, Lock
+from typing import Optional
+
+import numpy as np
+from flask import Flask, jsonify, request
+from PIL import Image, ImageDraw
+
+from whisper_test.omniparser_client import rescale_structured_results
+
+# returned by the fixtures backend for images that have no fixture (1179 x 2556 screen)
+DEFAULT_STRUCTURED_RESULTS = [
+    ["0", "text", "Continue", True, 120, 1800, 940, 120],
+    ["1", "text", "Not now", True, 120, 1950, 940, 100],
+    ["2", "icon", "Close button", True, 1040, 80, 80, 80],
+]
+
+
+class FixturesBackend:
+    """Canned results, keyed by image name or by the sha256 of the image bytes.
+
+    Fixture boxes are in the coordinates of a `screen_size` screenshot and are
+    scaled to the size of the uploaded image, as the real service reports
+    boxes of downscaled uploads.
+    """
+
+    def __init__(self, fixtures_path=None, screen_size=(1179, 2556)):
+        self.fixtures = {}
+        self.screen_size = screen_size
+        if fixtures_path:
+            with open(fixtures_path) as f:
+                self.fixtures = json.load(f)
+
+    def parse(self, image_bytes: bytes, img_name: str, image: Image.Image) -> list:
+        key = hashlib.sha256(image_bytes).hexdigest()
+        results = self.fixtures.get(img_name, self.fixtures.get(key, DEFAULT_STRUCTURED_RESULTS))
+        # fixtures captured from the service have string coordinates, with or without `interactive`
+        return rescale_structured_results(results, image.width / self.screen_size[0],
+                                          image.height / self.screen_size[1])
+
+
+class EasyOcrBackend:
+    """Text elements read by easyocr, in the Omniparser list format."""
+
+    def __init__(self):
+        from whisper_test.ocr_engine import get_ez_ocr_reader
+        self.reader = get_ez_ocr_reader()
+        self.lock = Lock()  # readtext is not thread safe
+
+    def parse(self, image_bytes: bytes, img_name: str, image: Image.Image) -> list:
+        from whisper_test.ocr_utils import get_detection_bounding_box
+        with self.lock:
+            detections = self.reader.readtext(np.array(image.convert("RGB")))
+        results = []
+        for idx, detection in enumerate(detections):
+            x, y, w, h = (int(v) for v in get_detection_bounding_box(detection))
+            results.append([str(idx), "text", detection[1], True, x, y, w, h])
+        return results
+
+
+def draw_labeled_image(image: Image.Image, structured_results: list) -> str:
+    """Draw the element boxes and ids on the image and return it as base64 PNG."""
+    image = image.convert("RGB")
+    draw = ImageDraw.Draw(image)
+    for element_id, _, _, _, x, y, w, h in structured_results:
+        draw.rectangle([x, y, x + w, y + h], outline=(255, 0, 0), width=3)
+        draw.text((x + 4, y + 4), str(element_id), fill=(255, 0, 0))
+    buffer = BytesIO()
+    image.save(buffer, format="PNG")
+    return base64.b64encode(buffer.getvalue()).decode("ascii")
+
+
+def create_app(backend, latency: float = 0.0, jitter: float = 0.0,
+               batch_item_latency: Optional[float] = None, model_slots: int = 0) -> Flask:
+    """Return the Flask app serving `/process` and `/process_batch` with the given backend and latency.
+
+    A batch takes `latency` plus `batch_item_latency` (default a quarter of
+    `latency`) per additional image, as a GPU model run on a batch would.
+    With `model_slots` > 0, at most that many requests run the model at once
+    and the others queue, as on a single GPU.
+    """
+    app = Flask(__name__)
+    if batch_item_latency is None:
+        batch_item_latency = latency / 4
+    model_slot = BoundedSemaphore(model_slots) if model_slots > 0 else nullcontext()
+
+    def decode(image_bytes: bytes) -> Image.Image:
+        image = Image.open(BytesIO(image_bytes))
+        image.load()
+        return image
+
+    def parse(image_bytes: bytes, img_name: str, image: Image.Image, return_image: bool) -> dict:
+        structured_results = backend.parse(image_bytes, img_name, image)
+        response = {"structured_results": structured_results}
+        if return_image:
+            response["based64_image"] = draw_labeled_image(image, structured_results)
+        return response
+
+    def wait_until(t0: float, duration: float) -> None:
+        # emulate the model latency of the real service
+        remaining = duration + random.uniform(-jitter, jitter) - (time.time() - t0)
+        if remaining > 0:
+            time.sleep(remaining)
+
+    @app.route("/process", methods=["POST"])
+    def process():
+        if "image" not in request.files:
+            return jsonify({"error": "no image"}), 400
+        image_bytes = request.files["image"].read()
+        img_name = request.form.get("img_name", "")
+        return_image = request.form.get("return_image", "true").lower() != "false"
+        try:
+            image = decode(image_bytes)
+        except OSError as e:
+            return jsonify({"error": f"cannot decode image: {e}"}), 400
+
+        with model_slot:
+            t0 = time.time()
+            response = parse(image_bytes, img_name, image, return_image)
+            wait_until(t0, latency)
+        return jsonify(response)
+
+    @app.route("/process_batch", methods=["POST"])
+    def process_batch():
+        files = request.files.getlist("images")
+        if not files:
+            return jsonify({"error": "no images"}), 400
+        img_names = request.form.getlist("img_names")
+        return_image = request.form.get("return_image", "true").lower() != "false"
+
+        images = []
+        for idx, file in enumerate(files):
+            image_bytes = file.read()
+            img_name = img_names[idx] if idx < len(img_names) else file.filename or ""
+            try:
+                images.append((image_bytes, img_name, decode(image_bytes)))
+            except OSError as e:
+                images.append(f"cannot decode image: {e}")
+        with model_slot:
+            t0 = time.time()
+            results = [{"error": image} if isinstance(image, str) else parse(*image, return_image)
+                       for image in images]
+            wait_until(t0, latency + batch_item_latency * (len(files) - 1))
+        return jsonify({"results": results})
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the Omniparser OCR service.")
+    parser.add_argument("--backend", choices=["fixtures", "easyocr"], default="fixtures")
+    parser.add_argument("--fixtures", help="JSON file mapping image names or sha256 hashes to structured_results")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds per request (default 0)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Uniform +/- jitter of the latency in seconds")
+    parser.add_argument("--batch-item-latency", type=float,
+                        help="Seconds each additional image adds to a /process_batch request (default latency / 4)")
+    parser.add_argument("--model-slots", type=int, default=0,
+                        help="Requests that run the model at once, the others queue (default 0: unlimited)")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=5003)
+    args = parser.parse_args()
+
+    backend = EasyOcrBackend() if args.backend == "easyocr" else FixturesBackend(args.fixtures)
+    app = create_app(backend, latency=args.latency, jitter=args.jitter,
+                     batch_item_latency=args.batch_item_latency, model_slots=args.model_slots)
+    app.run(host=args.host, port=args.port, threaded=True)
+
+
+if __name__ == "__main__":
+    main()
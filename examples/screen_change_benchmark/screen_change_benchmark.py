@@ -0,0 +1,165 @@
+"""OCR calls saved by the pixel-level screen change detector.
+
+`has_screen_changed` used to OCR both screenshots of every before/after pair.
+The pixel-level diff decides most pairs without OCR; only ambiguous pairs
+still need the two OCR calls. This replays recorded navigation screenshots
+(consecutive screenshots of the same app form a pair) or synthetic pairs and
+reports the verdicts, the OCR calls saved and the cost of the pixel diff next
+to the average-hash comparison it replaces. With `--ocr-service`, the previous
+OCR-based verdict is computed too and compared with the pixel verdicts.
+
+USAGE:
+    python examples/screen_change_benchmark/screen_change_benchmark.py
+    python examples/screen_change_benchmark/screen_change_benchmark.py media_output
+    python examples/screen_change_benchmark/screen_change_benchmark.py media_output --ocr-service omniparser
+"""
+# insert path. Can be removed if whisper_test is installed
+import sys
+from pathlib import Path
+
+root_dir = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(root_dir))
+
+import argparse
+import logging
+import statistics
+from collections import Counter
+from glob import glob
+from itertools import groupby
+from os.path import basename, join
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+import cv2
+import numpy as np
+
+from whisper_test.screen_change import diff_screens, load_screen, UNCHANGED, CHANGED, AMBIGUOUS
+from whisper_test.utils import are_images_different
+from whisper_test.voice_cmd_stats import _percentile
+
+IPHONE_SCREEN_SIZE = (1179, 2556)
+
+
+def recorded_pairs(media_dir: str) -> list:
+    """Consecutive screenshots of the same app (`<app_id>_<date>_<time>.png`)."""
+    img_paths = sorted(p for p in glob(join(media_dir, "*.png")) if not p.endswith("-out.png"))
+    pairs = []
+    for _, group in groupby(img_paths, key=lambda p: basename(p).rsplit("_", 2)[0]):
+        group = list(group)
+        pairs.extend(zip(group, group[1:]))
+    return pairs
+
+
+def _screen(title: str, rows: list, background=(242, 242, 247)) -> np.ndarray:
+    width, height = IPHONE_SCREEN_SIZE
+    img = np.full((height, width, 3), background, dtype=np.uint8)
+    cv2.putText(img, "9:41", (120, 90), cv2.FONT_HERSHEY_SIMPLEX, 2, (0, 0, 0), 4)
+    cv2.putText(img, title, (60, 330), cv2.FONT_HERSHEY_SIMPLEX, 3, (0, 0, 0), 6)
+    for idx, row in enumerate(rows):
+        y = 520 + idx * 180
+        cv2.rectangle(img, (40, y - 110), (width - 40, y + 50), (255, 255, 255), -1)
+        cv2.putText(img, row, (80, y), cv2.FONT_HERSHEY_SIMPLEX, 2, (0, 0, 0), 4)
+    return img
+
+
+def synthetic_pairs(out_dir: str) -> list:
+    """Before/after pairs of the cases navigation meets: no effect, status bar only, toggle,
+    popover, new screen and scrolled list."""
+    rows = ["Notifications", "Privacy", "Sounds", "Display", "Battery", "General", "Accessibility"]
+    base = _screen("Settings", rows)
+    clock = base.copy()
+    cv2.rectangle(clock, (100, 20), (400, 120), (242, 242, 247), -1)
+    cv2.putText(clock, "9:42", (120, 90), cv2.FONT_HERSHEY_SIMPLEX, 2, (0, 0, 0), 4)
+    toggle = base.copy()
+    cv2.rectangle(toggle, (960, 440), (1100, 500), (89, 199, 52), -1)
+    popover = base.copy()
+    cv2.rectangle(popover, (300, 900), (1100, 1500), (255, 255, 255), -1)
+    cv2.putText(popover, "Allow", (450, 1250), cv2.FONT_HERSHEY_SIMPLEX, 2.5, (255, 122, 0), 5)
+    cases = {
+        "no_effect": base,
+        "status_bar": clock,
+        "toggle": toggle,
+        "popover": popover,
+        "new_screen": _screen("Privacy", ["Location Services", "Tracking", "Contacts", "Calendars"]),
+        "scrolled": _screen("Settings", rows[3:] + ["Camera", "Home Screen", "Siri", "Wallpaper"]),
+    }
+    before_path = join(out_dir, "before.png")
+    cv2.imwrite(before_path, base)
+    pairs = []
+    for name, img in cases.items():
+        path = join(out_dir, f"{name}.png")
+        cv2.imwrite(path, img)
+        pairs.append((before_path, path))
+    return pairs
+
+
+def ocr_verdict(ocr_service: str, sc_name_before: str, sc_name_after: str) -> bool:
+    """The verdict of the previous has_screen_changed: the text changed and the average hash differs."""
+    from whisper_test.ocr_utils import ocr_img_by_ez_ocr, ocr_img_by_omniparser, screen_text_changed
+    ocr = ocr_img_by_omniparser if ocr_service == "omniparser" else ocr_img_by_ez_ocr
+    data_before, data_after = ocr(sc_name_before), ocr(sc_name_after)
+    if data_before is None or data_after is None:
+        return False
+    if ocr_service == "ez_ocr":  # {img_path: [(text, x, y, w, h), ...]}
+        data_before = [[str(idx), "text", item[0]] for idx, item in enumerate(data_before[sc_name_before])]
+        data_after = [[str(idx), "text", item[0]] for idx, item in enumerate(data_after[sc_name_after])]
+    return screen_text_changed(data_before, data_after) and are_images_different(sc_name_before, sc_name_after)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OCR calls saved by the pixel-level screen change detector.")
+    parser.add_argument("media_dir", nargs="?", help="Directory with navigation screenshots (default: synthetic pairs)")
+    parser.add_argument("--ocr-service", choices=["ez_ocr", "omniparser"],
+                        help="Also compute the OCR-based verdict and compare")
+    args = parser.parse_args()
+
+    # are_images_different decodes with PIL, which logs every PNG chunk
+    logging.getLogger("PIL").setLevel(logging.WARNING)
+    with TemporaryDirectory() as tmp_dir:
+        pairs = recorded_pairs(args.media_dir) if args.media_dir else synthetic_pairs(tmp_dir)
+        if not pairs:
+            print(f"No screenshot pairs found in {args.media_dir}")
+            return
+
+        verdicts, decode_times, diff_times, hash_times = Counter(), [], [], []
+        agreement = Counter()
+        for sc_name_before, sc_name_after in pairs:
+            t0 = perf_counter()
+            img_before, img_after = load_screen(sc_name_before), load_screen(sc_name_after)
+            t1 = perf_counter()
+            diff = diff_screens(img_before, img_after) if img_before is not None and img_after is not None else None
+            decode_times.append(t1 - t0)
+            diff_times.append(perf_counter() - t1)
+            t0 = perf_counter()
+            are_images_different(sc_name_before, sc_name_after)
+            hash_times.append(perf_counter() - t0)
+            verdict = diff.verdict if diff is not None else "unreadable"
+            verdicts[verdict] += 1
+            line = f"{basename(sc_name_before):>40s} -> {basename(sc_name_after):40s} {verdict:>10s}"
+            if diff is not None:
+                line += f" {diff.changed_fraction:6.1%} changed, {len(diff.regions)} regions"
+            if args.ocr_service and diff is not None:
+                changed = ocr_verdict(args.ocr_service, sc_name_before, sc_name_after)
+                line += f", OCR: {'changed' if changed else 'unchanged'}"
+                if diff.verdict != AMBIGUOUS:
+                    agreement[(diff.verdict == CHANGED) == changed] += 1
+            print(line)
+
+    n_pairs = len(pairs)
+    ocr_calls_before = 2 * n_pairs
+    ocr_calls_after = 2 * verdicts[AMBIGUOUS]
+    print(f"\n{n_pairs} pairs: {verdicts[UNCHANGED]} unchanged, {verdicts[CHANGED]} changed, "
+          f"{verdicts[AMBIGUOUS]} ambiguous")
+    print(f"OCR calls: {ocr_calls_before} -> {ocr_calls_after} "
+          f"({ocr_calls_before - ocr_calls_after} saved, {1 - ocr_calls_after / ocr_calls_before:.0%})")
+    print(f"pixel diff: {1e6 * statistics.median(diff_times):.0f} us median, "
+          f"{1e6 * _percentile(diff_times, 95):.0f} us p95 per pair, after decoding both screenshots at 1/4 "
+          f"size in {1000 * statistics.median(decode_times):.1f} ms median")
+    print(f"average hash it replaces: {1000 * statistics.median(hash_times):.1f} ms median, "
+          f"{1000 * _percentile(hash_times, 95):.1f} ms p95 per pair")
+    if agreement:
+        print(f"pixel verdicts matching the OCR verdict: {agreement[True]} of {sum(agreement.values())}")
+
+
+if __name__ == "__main__":
+    main()
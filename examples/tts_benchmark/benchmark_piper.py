@@ -0,0 +1,64 @@
+# insert path. Can be removed if whisper_test is installed
+import sys
+from pathlib import Path
+
+root_dir = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(root_dir))
+
+import statistics
+from os.path import exists, join
+from tempfile import TemporaryDirectory
+from time import time
+
+from whisper_test.common import PIPER_MODELS
+from whisper_test.piper_backend import PiperProcess, synthesize_once
+from whisper_test.tts import TTSController
+
+
+# novel phrases, similar to the ones produced by LLM-based navigation
+BENCHMARK_PHRASES = [
+    "tap, Continue, ", "tap, Accept all cookies, ", "tap, Sign in later, ",
+    "tap, Not now, ", "tap, Allow while using app, ", "Scroll, down, ",
+    "tap, Skip, ", "tap, Get started, ", "tap, Close, ", "tap, I agree, ",
+]
+
+
+def benchmark(synthesize, out_dir: str, tag: str) -> list:
+    """Synthesize all benchmark phrases and return the per-phrase latencies."""
+    latencies = []
+    for idx, phrase in enumerate(BENCHMARK_PHRASES):
+        t0 = time()
+        synthesize(phrase, join(out_dir, f"{tag}_{idx}.wav"))
+        latencies.append(time() - t0)
+    return latencies
+
+
+def print_latencies(provider: str, mode: str, latencies: list) -> None:
+    # the first phrase includes loading the model
+    print(f"{provider:40s} {mode:10s} first={latencies[0]:.3f}s "
+          f"mean={statistics.mean(latencies[1:]):.3f}s max={max(latencies[1:]):.3f}s")
+
+
+def main():
+    for provider in sorted(PIPER_MODELS):
+        model_name = provider.split('piper_')[1]
+        model_path = join(TTSController.get_piper_root_dir(), f'{model_name}.onnx')
+        if not exists(model_path):
+            print(f"{provider:40s} skipped, model not found at {model_path}")
+            continue
+
+        with TemporaryDirectory() as out_dir:
+            one_shot = benchmark(
+                lambda text, path: synthesize_once(model_path, text, path), out_dir, "once")
+            print_latencies(provider, "spawn", one_shot)
+
+            piper_process = PiperProcess(model_path)
+            try:
+                persistent = benchmark(piper_process.synthesize, out_dir, "persistent")
+            finally:
+                piper_process.close()
+            print_latencies(provider, "persistent", persistent)
+
+
+if __name__ == "__main__":
+    main()
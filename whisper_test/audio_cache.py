@@ -0,0 +1,283 @@
+"""Content-addressed cache for synthesized voice command audio.
+
+Audio files are keyed by a hash of the TTS provider, the synthesis parameters
+and the exact text, so phrases that differ only in punctuation or case never
+share a file. A JSON manifest next to the audio files records the text, size,
+duration, hit count and last use of every entry; the least recently used
+entries are evicted when the cache grows beyond its size cap.
+
+Several processes can share the cache: the manifest is re-read and merged
+with this process's changes under a file lock before it is written.
+"""
+import argparse
+import atexit
+import hashlib
+import json
+import os
+import re
+import wave
+from contextlib import contextmanager
+from os.path import join, exists, getsize, isdir
+from threading import Lock
+from time import time
+from typing import Dict, List, Optional, Set
+
+from whisper_test.common import logger, TTS_AUDIO_CACHE_MAX_BYTES, TTS_AUDIO_ROOT_DIR
+
+try:
+    import fcntl
+except ImportError:  # Windows: the manifest is not locked across processes
+    fcntl = None
+
+# audio files named by their cache key, and their partial files during synthesis
+KEYED_AUDIO_FNAME = re.compile(r"^[0-9a-f]{32}\.")
+LEGACY_AUDIO_EXTS = ('.wav', '.mp3')
+
+
+class AudioCache:
+    """Audio files of all TTS providers under one root directory."""
+
+    MANIFEST_FNAME = 'manifest.json'
+    # save the manifest after this many hit count updates
+    SAVE_EVERY_N_UPDATES = 50
+
+    def __init__(self, root_dir: str, max_size_bytes: int = TTS_AUDIO_CACHE_MAX_BYTES):
+        self.root_dir = root_dir
+        self.max_size_bytes = max_size_bytes
+        self.manifest_path = join(root_dir, self.MANIFEST_FNAME)
+        self.entries: Dict[str, dict] = self._load_manifest()
+        # changes since the last save, merged into the manifest on disk:
+        # hits of entries used or added by this process, and entries removed by it
+        self._new_hits: Dict[str, int] = {}
+        self._removed: Set[str] = set()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._n_unsaved_updates = 0
+        self._lock = Lock()
+
+    @staticmethod
+    def make_key(provider: str, params: dict, text: str) -> str:
+        """Return the cache key for the exact text synthesized with the given parameters."""
+        key_data = json.dumps([provider, params, text], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(key_data.encode('utf-8')).hexdigest()[:32]
+
+    def path_for(self, provider: str, key: str, audio_file_ext: str = '.wav') -> str:
+        """Return the path where the audio for the key is stored."""
+        return join(self.root_dir, provider, key + audio_file_ext)
+
+    def _load_manifest(self) -> Dict[str, dict]:
+        """Load the manifest, ignoring a missing or corrupt file."""
+        try:
+            with open(self.manifest_path, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.error("❌ Error reading the audio cache manifest %s: %s", self.manifest_path, e)
+            return {}
+
+    @contextmanager
+    def _manifest_lock(self):
+        """Hold an exclusive lock on the manifest, shared with other processes."""
+        os.makedirs(self.root_dir, exist_ok=True)
+        with open(self.manifest_path + '.lock', 'w') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield
+
+    def _merge_manifest(self) -> None:
+        """Replace the entries by the manifest on disk plus the changes of this process."""
+        entries = self._load_manifest()
+        for key in self._removed:
+            entries.pop(key, None)
+        for key, new_hits in self._new_hits.items():
+            entry = self.entries.get(key)
+            if entry is None:
+                continue
+            saved = entries.get(key)
+            if saved is None:
+                entries[key] = entry
+            else:  # other processes may have used it too
+                saved["hits"] += new_hits
+                saved["last_used"] = max(saved["last_used"], entry["last_used"])
+        self.entries = entries
+
+    def save(self) -> None:
+        """Merge the changes into the manifest and write it atomically."""
+        with self._lock:
+            self._save()
+
+    def _save(self, keep_key: Optional[str] = None) -> None:
+        tmp_path = f"{self.manifest_path}.{os.getpid()}.tmp"
+        try:
+            with self._manifest_lock():
+                self._merge_manifest()
+                self._evict(keep_key=keep_key)
+                with open(tmp_path, 'w') as f:
+                    json.dump(self.entries, f, indent=1, ensure_ascii=False)
+                os.replace(tmp_path, self.manifest_path)
+            self._new_hits.clear()
+            self._removed.clear()
+            self._n_unsaved_updates = 0
+        except OSError as e:
+            logger.error("❌ Error writing the audio cache manifest %s: %s", self.manifest_path, e)
+
+    def lookup(self, key: str) -> Optional[str]:
+        """Return the audio path for the key if it is cached, updating its hit count."""
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None or not exists(join(self.root_dir, entry["file"])):
+                if entry is not None:  # deleted from disk
+                    del self.entries[key]
+                    self._removed.add(key)
+                    self._new_hits.pop(key, None)
+                self.misses += 1
+                return None
+            self.hits += 1
+            entry["hits"] += 1
+            entry["last_used"] = time()
+            self._new_hits[key] = self._new_hits.get(key, 0) + 1
+            self._n_unsaved_updates += 1
+            if self._n_unsaved_updates >= self.SAVE_EVERY_N_UPDATES:
+                self._save()
+            return join(self.root_dir, entry["file"])
+
+    def add(self, key: str, audio_file_path: str, text: str, provider: str, params: dict) -> None:
+        """Register a newly synthesized audio file and evict old entries if needed."""
+        with self._lock:
+            now = time()
+            self.entries[key] = {
+                "file": os.path.relpath(audio_file_path, self.root_dir),
+                "text": text,
+                "provider": provider,
+                "params": params,
+                "size": getsize(audio_file_path),
+                "duration": get_audio_duration(audio_file_path),
+                "hits": 0,
+                "created": now,
+                "last_used": now,
+            }
+            self._new_hits.setdefault(key, 0)
+            self._removed.discard(key)
+            # evicts with the entries of all processes sharing the cache
+            self._save(keep_key=key)
+
+    def _evict(self, keep_key: Optional[str] = None) -> None:
+        """Delete the least recently used entries until the cache fits its size cap."""
+        total_size = sum(entry["size"] for entry in self.entries.values())
+        if total_size <= self.max_size_bytes:
+            return
+        for key, entry in sorted(self.entries.items(), key=lambda kv: kv[1]["last_used"]):
+            if total_size <= self.max_size_bytes:
+                break
+            if key == keep_key:
+                continue
+            try:
+                os.remove(join(self.root_dir, entry["file"]))
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.error("❌ Error evicting %s from the audio cache: %s", entry["file"], e)
+                continue
+            total_size -= entry["size"]
+            del self.entries[key]
+            self._new_hits.pop(key, None)
+            self.evictions += 1
+
+    def legacy_files(self) -> List[str]:
+        """Return the audio files cached under sanitized phrase names, before the cache was keyed by hash.
+
+        Their names lost the punctuation and case of the phrases, so they cannot
+        be migrated and are no longer read.
+        """
+        paths = []
+        for provider_dir in os.scandir(self.root_dir) if isdir(self.root_dir) else []:
+            if not provider_dir.is_dir():
+                continue
+            for audio_file in os.scandir(provider_dir.path):
+                if (audio_file.is_file() and audio_file.name.endswith(LEGACY_AUDIO_EXTS)
+                        and not KEYED_AUDIO_FNAME.match(audio_file.name)):
+                    paths.append(audio_file.path)
+        return sorted(paths)
+
+    def remove_legacy_files(self) -> int:
+        """Delete the files returned by `legacy_files`; return the number of files deleted."""
+        n_removed = 0
+        for path in self.legacy_files():
+            try:
+                os.remove(path)
+                n_removed += 1
+            except OSError as e:
+                logger.error("❌ Error removing the old cached audio %s: %s", path, e)
+        logger.info("🧹 Removed %d audio files of the old audio cache layout", n_removed)
+        return n_removed
+
+    def stats(self) -> dict:
+        """Return hit/miss statistics of this session and the cache size."""
+        with self._lock:
+            n_lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / n_lookups if n_lookups else None,
+                "evictions": self.evictions,
+                "n_entries": len(self.entries),
+                "size_bytes": sum(entry["size"] for entry in self.entries.values()),
+            }
+
+
+def get_audio_duration(audio_file_path: str) -> Optional[float]:
+    """Return the duration of a wav file in seconds, None for other formats."""
+    try:
+        with wave.open(audio_file_path, 'rb') as wav_file:
+            return wav_file.getnframes() / wav_file.getframerate()
+    except (wave.Error, EOFError, OSError):
+        return None  # e.g. gTTS writes mp3 data
+
+
+_audio_caches: Dict[str, AudioCache] = {}
+_audio_caches_lock = Lock()
+
+
+def get_audio_cache(root_dir: str) -> AudioCache:
+    """Return the shared audio cache for the root directory."""
+    with _audio_caches_lock:
+        if root_dir not in _audio_caches:
+            _audio_caches[root_dir] = AudioCache(root_dir)
+            n_legacy = len(_audio_caches[root_dir].legacy_files())
+            if n_legacy:
+                logger.info("🧹 %d audio files in %s use the old cache layout and are no longer read; "
+                            "remove them with: python -m whisper_test.audio_cache --remove-legacy",
+                            n_legacy, root_dir)
+        return _audio_caches[root_dir]
+
+
+@atexit.register
+def save_audio_caches() -> None:
+    """Persist the hit counts of all audio caches."""
+    with _audio_caches_lock:
+        for audio_cache in _audio_caches.values():
+            audio_cache.save()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect the TTS audio cache.")
+    parser.add_argument("--root-dir", default=TTS_AUDIO_ROOT_DIR, help="Audio cache root directory")
+    parser.add_argument("--remove-legacy", action="store_true",
+                        help="Delete the audio files of the old, sanitized-filename cache layout")
+    args = parser.parse_args()
+    audio_cache = AudioCache(args.root_dir)
+    print(f"{len(audio_cache.entries)} cached phrases, "
+          f"{sum(entry['size'] for entry in audio_cache.entries.values()) / 1e6:.1f} MB")
+    legacy_files = audio_cache.legacy_files()
+    for path in legacy_files:
+        print(f"Old cache layout: {path}")
+    if args.remove_legacy:
+        print(f"Removed {audio_cache.remove_legacy_files()} files")
+    elif legacy_files:
+        print(f"{len(legacy_files)} files of the old cache layout, delete them with --remove-legacy")
+
+
+if __name__ == "__main__":
+    main()
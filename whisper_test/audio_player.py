@@ -0,0 +1,236 @@
+"""Low-latency playback of voice command audio.
+
+`playsound` decodes the file and opens a new audio device for every utterance.
+`AudioPlayer` keeps decoded PCM buffers of recently played phrases in memory
+and plays them through a single output stream that stays open. Every `play`
+call returns a future that resolves to the time the playback ended.
+"""
+import wave
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from threading import Lock, Timer
+from time import time
+from typing import Callable, List, Optional, Union
+
+import numpy as np
+
+from whisper_test.common import (
+    logger, AUDIO_PLAYER_MAX_CACHED_BUFFERS, TTS_SILENCE_THRESHOLD, TTS_SILENCE_PADDING)
+from whisper_test.exceptions import AudioStreamError
+
+try:
+    import sounddevice
+except (ImportError, OSError):  # Not required for all users, needs PortAudio
+    sounddevice = None
+
+
+class AudioBuffer:
+    """Decoded 16-bit PCM audio."""
+
+    def __init__(self, pcm: np.ndarray, sample_rate: int):
+        # shape: (n_frames, n_channels)
+        self.pcm = pcm if pcm.ndim == 2 else pcm.reshape(-1, 1)
+        self.sample_rate = sample_rate
+
+    @property
+    def channels(self) -> int:
+        return self.pcm.shape[1]
+
+    @property
+    def duration(self) -> float:
+        return len(self.pcm) / self.sample_rate
+
+
+def load_wav(audio_file_path: str) -> AudioBuffer:
+    """Decode a 16-bit PCM wav file."""
+    with wave.open(audio_file_path, 'rb') as wav_file:
+        if wav_file.getsampwidth() != 2:
+            raise ValueError(f"Only 16-bit wav files are supported: {audio_file_path}")
+        frames = wav_file.readframes(wav_file.getnframes())
+        pcm = np.frombuffer(frames, dtype=np.int16).reshape(-1, wav_file.getnchannels())
+        return AudioBuffer(pcm, wav_file.getframerate())
+
+
+def save_wav(buffer: AudioBuffer, audio_file_path: str) -> None:
+    """Write the audio as a 16-bit PCM wav file."""
+    with wave.open(audio_file_path, 'wb') as wav_file:
+        wav_file.setnchannels(buffer.channels)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(buffer.sample_rate)
+        wav_file.writeframes(buffer.pcm.astype(np.int16).tobytes())
+
+
+def trim_silence(buffer: AudioBuffer, threshold: int = TTS_SILENCE_THRESHOLD,
+                 padding_seconds: float = TTS_SILENCE_PADDING) -> AudioBuffer:
+    """Remove the leading and trailing silence, keeping `padding_seconds` around the speech."""
+    amplitude = np.abs(buffer.pcm.astype(np.int32)).max(axis=1)
+    loud = np.flatnonzero(amplitude > threshold)
+    if not len(loud):
+        return buffer  # all silence, leave it to the caller
+    padding = int(padding_seconds * buffer.sample_rate)
+    start = max(0, loud[0] - padding)
+    end = min(len(buffer.pcm), loud[-1] + 1 + padding)
+    return AudioBuffer(buffer.pcm[start:end], buffer.sample_rate)
+
+
+def concatenate_buffers(buffers: List[AudioBuffer], gap_seconds: float = 0.0) -> AudioBuffer:
+    """Join the buffers into one, with `gap_seconds` of silence between them."""
+    sample_rate, channels = buffers[0].sample_rate, buffers[0].channels
+    if any(b.sample_rate != sample_rate or b.channels != channels for b in buffers):
+        raise ValueError("Cannot concatenate audio with different sample rates or channels")
+    gap = np.zeros((int(gap_seconds * sample_rate), channels), dtype=np.int16)
+    parts = []
+    for idx, buffer in enumerate(buffers):
+        if idx:
+            parts.append(gap)
+        parts.append(buffer.pcm)
+    return AudioBuffer(np.concatenate(parts), sample_rate)
+
+
+class _PlaybackItem:
+    def __init__(self, buffer: AudioBuffer, future: Future):
+        self.buffer = buffer
+        self.future = future
+        self.position = 0
+
+
+class AudioPlayer:
+    """Play PCM buffers through one persistent output stream."""
+
+    def __init__(self, max_cached_buffers: int = AUDIO_PLAYER_MAX_CACHED_BUFFERS):
+        if sounddevice is None:
+            raise ImportError("sounddevice is not installed")
+        self.max_cached_buffers = max_cached_buffers
+        self._buffers: OrderedDict = OrderedDict()
+        self._buffers_lock = Lock()
+        # the stream callback only takes the queue lock, never the stream lock
+        self._queue: deque = deque()
+        self._current: Optional[_PlaybackItem] = None
+        self._queue_lock = Lock()
+        self._stream = None
+        self._stream_rate = None
+        self._stream_latency = 0.0
+        self._stream_lock = Lock()
+
+    def load(self, audio_file_path: str) -> AudioBuffer:
+        """Return the decoded audio, from memory if it was played recently."""
+        with self._buffers_lock:
+            if audio_file_path in self._buffers:
+                self._buffers.move_to_end(audio_file_path)
+                return self._buffers[audio_file_path]
+        buffer = load_wav(audio_file_path)
+        with self._buffers_lock:
+            self._buffers[audio_file_path] = buffer
+            while len(self._buffers) > self.max_cached_buffers:
+                self._buffers.popitem(last=False)
+        return buffer
+
+    def play(self, audio: Union[str, AudioBuffer],
+             on_done: Optional[Callable[[Future], None]] = None) -> Future:
+        """Queue the audio for playback.
+
+        Returns a future that resolves to the time the playback ended. Raises
+        AudioStreamError if the output stream cannot be opened.
+        """
+        buffer = self.load(audio) if isinstance(audio, str) else audio
+        future = Future()
+        if on_done is not None:
+            future.add_done_callback(on_done)
+        with self._stream_lock:
+            self._ensure_stream(buffer)
+            with self._queue_lock:
+                self._queue.append(_PlaybackItem(buffer, future))
+        return future
+
+    def play_blocking(self, audio: Union[str, AudioBuffer], timeout: Optional[float] = None) -> float:
+        """Play the audio and return the time the playback ended."""
+        buffer = self.load(audio) if isinstance(audio, str) else audio
+        if timeout is None:
+            timeout = buffer.duration + 5
+        return self.play(buffer).result(timeout=timeout)
+
+    def _ensure_stream(self, buffer: AudioBuffer) -> None:
+        """Open the output stream, reopening it if the audio format changed."""
+        if self._stream is not None:
+            if (self._stream_rate == buffer.sample_rate and
+                    self._stream.channels == buffer.channels):
+                return
+            # different format, let the queued audio finish first
+            self._wait_until_idle()
+            self._close_stream()
+        logger.info("🔈 Opening audio output stream (%d Hz, %d channels)",
+                    buffer.sample_rate, buffer.channels)
+        stream = None
+        try:
+            stream = sounddevice.OutputStream(
+                samplerate=buffer.sample_rate, channels=buffer.channels,
+                dtype='int16', callback=self._callback)
+            self._stream_rate = buffer.sample_rate
+            self._stream_latency = stream.latency
+            stream.start()
+        except Exception as e:  # sounddevice.PortAudioError: no device, unsupported format
+            if stream is not None:
+                stream.close()
+            raise AudioStreamError(f"Cannot open the audio output stream: {e}") from e
+        self._stream = stream
+
+    def _wait_until_idle(self) -> None:
+        """Block until all queued audio has been played."""
+        with self._queue_lock:
+            pending = [item.future for item in self._queue]
+            if self._current is not None:
+                pending.append(self._current.future)
+        for future in pending:
+            future.result()
+
+    def _callback(self, outdata, frames, time_info, status) -> None:
+        """Stream callback: copy the queued audio into the output buffer, silence when idle."""
+        written = 0
+        with self._queue_lock:
+            while written < frames:
+                if self._current is None:
+                    if not self._queue:
+                        break
+                    self._current = self._queue.popleft()
+                item = self._current
+                n = min(frames - written, len(item.buffer.pcm) - item.position)
+                outdata[written:written + n] = item.buffer.pcm[item.position:item.position + n]
+                item.position += n
+                written += n
+                if item.position >= len(item.buffer.pcm):
+                    # the last samples leave the speaker after the output latency
+                    delay = written / self._stream_rate + self._stream_latency
+                    Timer(delay, self._finish, args=(item.future,)).start()
+                    self._current = None
+        outdata[written:] = 0
+
+    @staticmethod
+    def _finish(future: Future) -> None:
+        if not future.done():
+            future.set_result(time())
+
+    def _close_stream(self) -> None:
+        if self._stream is not None:
+            self._stream.stop()
+            self._stream.close()
+            self._stream = None
+
+    def close(self) -> None:
+        """Close the output stream."""
+        with self._stream_lock:
+            self._close_stream()
+
+
+_audio_player: Optional[AudioPlayer] = None
+_audio_player_lock = Lock()
+
+
+def get_audio_player() -> Optional[AudioPlayer]:
+    """Return the process-wide audio player, None if sounddevice is not available."""
+    global _audio_player
+    if sounddevice is None:
+        return None
+    with _audio_player_lock:
+        if _audio_player is None:
+            _audio_player = AudioPlayer()
+        return _audio_player
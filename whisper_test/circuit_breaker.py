@@ -0,0 +1,82 @@
+"""Circuit breaker for remote services such as Omniparser.
+
+After `failure_threshold` consecutive failures the breaker opens and calls
+fail fast instead of waiting on a service that is down or overloaded. Once
+`reset_timeout` seconds have passed it is half-open: a single probe request
+goes through, and its outcome closes the breaker again or re-opens it.
+"""
+from threading import Lock
+from time import time
+from typing import Optional
+
+from whisper_test.common import logger, OCR_BREAKER_FAILURES, OCR_BREAKER_RESET_AFTER
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Closed, open or half-open state of one service."""
+
+    def __init__(self, name: str, failure_threshold: int = OCR_BREAKER_FAILURES,
+                 reset_timeout: float = OCR_BREAKER_RESET_AFTER):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0  # consecutive failures
+        self.rejected = 0  # calls failed fast while open
+        self._opened_at: Optional[float] = None
+        self._probe_in_flight = False
+        self._lock = Lock()
+
+    def _state(self) -> str:
+        if self._opened_at is None:
+            return CLOSED
+        if time() - self._opened_at >= self.reset_timeout:
+            return HALF_OPEN
+        return OPEN
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state()
+
+    def is_available(self) -> bool:
+        """Return True if a call would be let through now."""
+        with self._lock:
+            state = self._state()
+            return state == CLOSED or (state == HALF_OPEN and not self._probe_in_flight)
+
+    def allow_request(self) -> bool:
+        """Return True if the call may go to the service; half-open, only the first caller probes.
+
+        Every allowed call must be followed by `record_success` or `record_failure`.
+        """
+        with self._lock:
+            state = self._state()
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                logger.info("🔌 Probing %s after %.0f s", self.name, time() - self._opened_at)
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._opened_at is not None:
+                logger.info("🔌 %s is back, closing the circuit breaker", self.name)
+            self.failures = 0
+            self._opened_at = None
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self._probe_in_flight or (self._opened_at is None and self.failures >= self.failure_threshold):
+                logger.error("🔌 %s failed %d times in a row, failing fast for %.0f s",
+                             self.name, self.failures, self.reset_timeout)
+                self._opened_at = time()
+            self._probe_in_flight = False
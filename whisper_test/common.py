@@ -45,13 +45,105 @@ _config = load_config()
 
 ########### TTS root dir to store the audio files ###########
 TTS_AUDIO_ROOT_DIR = _config.get('tts_audio_root_dir', join(dirname(dirname(__file__)), 'vc_cmd_audio_files'))
+TTS_AUDIO_CACHE_MAX_BYTES = _config.get('tts_audio_cache_max_mb', 1024) * 1024 * 1024
 ########### Other TTS config ###########
 DEFAULT_TTS_PROVIDER = TTS_PROVIDER_PIPER_EN_US_AMY_MEDIUM
 MAX_N_VOICE_CMD_TRIES = 3  # max number of tries to send a voice command
+# keep one Piper process per voice model alive instead of spawning one per phrase
+PIPER_PERSISTENT_PROCESS = _config.get('piper_persistent_process', True)
+PIPER_SYNTHESIS_TIMEOUT = 30  # seconds to wait for a phrase from the persistent process
+TTS_SYNTHESIS_WORKERS = _config.get('tts_synthesis_workers', 2)  # phrases synthesized ahead of playback
+TTS_PREFETCH_MAX_CANDIDATES = 8  # "tap, <caption>" phrases prefetched per screen
+TTS_PREFETCH_MAX_CAPTION_LEN = 40  # longer texts are paragraphs, not buttons
+PIPER_LENGTH_SCALE = _config.get('piper_length_scale', 1.0)  # < 1.0: faster speech
+TTS_TRIM_SILENCE = _config.get('tts_trim_silence', False)
+TTS_SILENCE_THRESHOLD = 500  # 16-bit amplitude below which audio counts as silence
+TTS_SILENCE_PADDING = 0.03  # seconds of silence kept before and after the speech
+# play audio through one persistent output stream (requires sounddevice) instead of playsound
+AUDIO_PLAYBACK_STREAM = _config.get('audio_playback_stream', True)
+AUDIO_PLAYER_MAX_CACHED_BUFFERS = 256  # decoded phrases kept in memory
 
 ########### LLM config ###########
 MODEL_NAME = _config.get('model_name', "qwen2.5:14b")
 
+########### OCR engines ###########
+EZ_OCR_LANGUAGES = ['en']
+# worker processes with a warm easyocr reader each (0: one reader in this process)
+EZ_OCR_WORKERS = _config.get('ez_ocr_workers', 0)
+EZ_OCR_BATCH_SIZE = _config.get('ez_ocr_batch_size', 16)  # text boxes recognized per batch
+# "torch": stock easyocr models; "onnx": int8-quantized models in onnxruntime (CPU only, see ocr_onnx.py)
+EZ_OCR_ENGINE = _config.get('ez_ocr_engine', 'torch')
+EZ_OCR_ONNX_DIR = _config.get('ez_ocr_onnx_dir', join('cache', 'onnx_models'))
+EZ_OCR_ONNX_THREADS = _config.get('ez_ocr_onnx_threads', 0)  # 0: the CPU cores divided among the OCR workers
+# screenshots the int8 quantization is calibrated on
+EZ_OCR_ONNX_CALIBRATION_DIR = _config.get('ez_ocr_onnx_calibration_dir', _config.get('media_path', 'media_output'))
+EZ_OCR_ONNX_CALIBRATION_IMAGES = 8
+
+########### OCR output ###########
+# draw the text boxes and write <screenshot>-out.png during OCR (or render them later with ocr_annotations.py)
+OCR_ANNOTATE = _config.get('ocr_annotate', False)
+OCR_RESULTS_LOG_PATH = _config.get('ocr_results_log_path', join(_config.get('media_path', 'media_output'), 'ocr_results.jsonl'))
+OCR_RESULTS_LOG_FLUSH_EVERY = 20  # results buffered before they are appended to the log
+
+########### OCR result cache ###########
+OCR_CACHE_ENABLED = _config.get('ocr_cache', True)
+OCR_CACHE_PATH = _config.get('ocr_cache_path', join(dirname(dirname(__file__)), 'cache', 'ocr_cache.sqlite'))
+OCR_CACHE_MEMORY_ENTRIES = 512  # results kept in memory, all results are kept on disk
+# bump when the Omniparser server changes, so cached results are not reused
+OMNIPARSER_VERSION = _config.get('omniparser_version', '1')
+
+########### Delta OCR ###########
+# easyocr only re-reads the regions that changed since the previous screenshot
+OCR_DELTA = _config.get('ocr_delta', False)
+OCR_DELTA_TILE_SIZE = 64  # pixels
+OCR_DELTA_PIXEL_THRESHOLD = 24  # per channel, smaller differences are ignored
+OCR_DELTA_PADDING = 16  # pixels around changed tiles, so text at their border is not cut
+OCR_DELTA_MAX_CHANGED_FRACTION = 0.5  # above this, the whole frame is OCRed
+OCR_DELTA_MAX_STEPS = 10  # delta frames before a full OCR
+
+########### Screen change detection ###########
+# pixel diff of downsampled screenshots before the OCR-based text comparison
+SCREEN_CHANGE_REDUCE = 4  # screenshots are compared at 1/4 of their size (1, 2, 4 or 8)
+SCREEN_CHANGE_TILE_SIZE = 16  # pixels of the downsampled screenshot
+SCREEN_CHANGE_PIXEL_THRESHOLD = 24  # gray levels, smaller differences are ignored
+# changed fraction of the screen above which it changed without asking OCR
+SCREEN_CHANGE_CHANGED_FRACTION = _config.get('screen_change_changed_fraction', 0.25)
+SCREEN_CHANGE_CHANGED_REGIONS = 4  # separate changed regions (a new screen, a scroll) above which it changed
+SCREEN_CHANGE_STATUS_BAR = 0.06  # top fraction of the screen (clock, battery) that is ignored
+
+########### OCR backend router ###########
+# route OCR requests to the fastest healthy backend and fail over to the other one
+OCR_ROUTER = _config.get('ocr_router', True)
+OCR_LATENCY_BUDGET = _config.get('ocr_latency_budget', 20)  # seconds per OCR call before failing over
+OCR_ROUTER_WINDOW = 20  # recent calls per backend used for the latency and error rate
+OCR_ROUTER_MAX_ERROR_RATE = 0.5
+OCR_ROUTER_RETRY_AFTER = 60  # seconds before an unhealthy backend is tried again
+
+########### OCR prefetch ###########
+# start OCR in the background as soon as a navigation screenshot is taken
+OCR_PREFETCH = _config.get('ocr_prefetch', True)
+OCR_PREFETCH_WORKERS = 2
+OCR_PREFETCH_MAX_FRAMES = 8  # recent frames whose OCR futures are kept for reuse
+
+########### Omniparser client ###########
+OMNIPARSER_CONNECT_TIMEOUT = 3  # seconds
+OMNIPARSER_READ_TIMEOUT = _config.get('omniparser_read_timeout', 30)  # seconds
+OMNIPARSER_MAX_RETRIES = 2  # on connection errors and 502/503/504
+OMNIPARSER_POOL_SIZE = 4  # connections kept alive, also the number of requests in flight
+# screenshots are downscaled and re-encoded before upload; the boxes are scaled back to screen coordinates
+OMNIPARSER_UPLOAD_FORMAT = _config.get('omniparser_upload_format', 'jpeg')  # jpeg, webp or png
+OMNIPARSER_UPLOAD_MAX_DIM = _config.get('omniparser_upload_max_dim', 1280)  # pixels, 0: full resolution
+OMNIPARSER_UPLOAD_QUALITY = _config.get('omniparser_upload_quality', 85)  # jpeg/webp quality
+OMNIPARSER_BATCH_SIZE = _config.get('omniparser_batch_size', 8)  # screenshots per /process_batch request
+# seconds concurrent requests wait to be sent in one batch request (0: no micro-batching)
+OMNIPARSER_BATCH_WINDOW = _config.get('omniparser_batch_window', 0)
+
+########### OCR circuit breaker ###########
+# fail fast while the OCR service is down instead of waiting on every request
+OCR_BREAKER_FAILURES = _config.get('ocr_breaker_failures', 3)  # consecutive failures that open the breaker
+OCR_BREAKER_RESET_AFTER = _config.get('ocr_breaker_reset_after', 30)  # seconds open before a probe request
+OCR_STEP_DEADLINE = _config.get('ocr_step_deadline', 60)  # seconds per OCR section of a navigation step, 0: no deadline
+
 ########### Timeout for app navigation ###########
 TIMEOUT_FOR_APP_NAVIGATION = _config.get('timeout_app_navigation', 200)
 
@@ -65,6 +157,25 @@ SLEEP_AFTER_CMD = 5
 SYSLOG_SCAN_AFTER_VOICE_CMD = 2
 SLEEP_AFTER_CUSTOM_CMD = 10
 SYSLOG_MSG_VOICE_CMD_RECOGNIZED = "Recognized text is a command"
+SYSLOG_MSG_VOICE_CMD_MATCHED_GRAMMAR = "Matched Grammar"  # iOS 18.1.1+
+SYSLOG_MSG_APP_FOREGROUND = "Scene lifecycle state did change: Foreground"
+
+########### Voice command latency stats ###########
+VOICE_CMD_STATS_PATH = _config.get('voice_cmd_stats_path', join(dirname(dirname(__file__)), 'stats', 'voice_cmd_latency.jsonl'))
+LATENCY_HISTOGRAM_BIN_SIZE = 0.25  # seconds
+LATENCY_HISTOGRAM_MAX = 10  # seconds, larger latencies go to the last bin
+
+########### Timing auto-tuning ###########
+# learn the waits after voice commands and app launches from the latency stats
+TIMING_AUTO_TUNE = _config.get('timing_auto_tune', True)
+TIMING_MIN_SAMPLES = 20  # per device model and iOS version, before a wait is tuned
+TIMING_LATENCY_PERCENTILE = 95
+TIMING_SAFETY_FACTOR = 1.5  # applied to the latency percentile
+TIMING_SAFETY_MARGINS = {  # seconds, added on top of the scaled percentile
+    "syslog_wait_after_cmd": 1.0,
+    "sleep_after_launch_app": 8.0,  # the app is in the foreground before its content is loaded
+}
+TIMING_MIN_WAIT = 1.0  # seconds
 
 ########### Custom commands ###########
 CUSTOM_CMD = "continue with password"
@@ -100,6 +211,7 @@ DEFAULT_DEVICE_INFO_KEYS = [
 ########### System log search strings ###########
 SYSLOG_SEARCH_STRINGS = [
     'Recognized text is a command',
+    'Matched Grammar', # voice command confirmation on iOS 18.1.1+
     'Scene lifecycle state did change: Foreground',
     'Received install progress: 1.00', # to detect the installation progress
     'Starting purchase for client', # tap get button
@@ -155,4 +267,6 @@ RULE_BASED_ACTION_MAPPINGS = {
 }
 
 ########### Element types extracted from a11y data ###########
-ELEMENT_TYPES = ['Button', 'Tab', 'Header', 'Image', 'Link', 'ap_ra_pc_password_missing_alert', 'Adjustable', 'Selected', 'Toggle', 'Taste', 'Einstellungen', 'Bild', 'Einstellbar']
\ No newline at end of file
+ELEMENT_TYPES = ['Button', 'Tab', 'Header', 'Image', 'Link', 'ap_ra_pc_password_missing_alert', 'Adjustable', 'Selected', 'Toggle', 'Taste', 'Einstellungen', 'Bild', 'Einstellbar']
+# a11y element types that can be tapped
+INTERACTIVE_ELEMENT_TYPES = ['Button', 'Tab', 'Link', 'Adjustable', 'Toggle', 'Taste', 'Einstellbar']
\ No newline at end of file
@@ -158,6 +158,7 @@ class DataCollector:
         pcap_file_path = f"{self.media_path}/{app_id}_{get_timestamp()}.pcap"
         self.device.start_pcap_capture(pcap_file_path)
 
+        launched_at = time()
         if not self.device.launch_app(app_id):
             self.device.stop_pcap_capture()
             return False
@@ -166,7 +167,8 @@ class DataCollector:
             self.device.stop_pcap_capture()
             return False
 
-        sleep(SLEEP_AFTER_LAUNCH_APP)
+        sleep(self.device.timing.sleep_after_launch_app)
+        self.device.record_app_launch_latency(app_id, launched_at)
 
         try:
             self.device.navigation.navigate_app_with_fallback(app_id=app_id)
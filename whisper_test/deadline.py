@@ -0,0 +1,44 @@
+"""Deadline of the OCR section of a navigation step.
+
+`deadline` runs a block (reading the screen, checking whether it changed) with
+a deadline stored in a context variable. The OCR calls in the block read
+`remaining_time()` to shorten their timeouts, or give up once the deadline
+has passed, instead of each waiting its full timeout. Work handed to
+a thread pool sees the deadline when run with `contextvars.copy_context().run`.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import time
+from typing import Optional
+
+_deadline: ContextVar[Optional[float]] = ContextVar("deadline", default=None)
+
+
+def _expires_at(seconds: Optional[float]) -> Optional[float]:
+    return None if seconds is None or seconds <= 0 else time() + seconds
+
+
+def set_deadline(seconds: Optional[float]) -> None:
+    """Set the deadline `seconds` from now; None or 0 clears it."""
+    _deadline.set(_expires_at(seconds))
+
+
+@contextmanager
+def deadline(seconds: Optional[float]):
+    """Run the block with a deadline `seconds` from now."""
+    token = _deadline.set(_expires_at(seconds))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def get_deadline() -> Optional[float]:
+    """Return the deadline as a timestamp, None if there is none."""
+    return _deadline.get()
+
+
+def remaining_time() -> Optional[float]:
+    """Return the seconds left until the deadline (0 once it has passed), None without a deadline."""
+    expires_at = _deadline.get()
+    return None if expires_at is None else max(0.0, expires_at - time())
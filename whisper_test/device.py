@@ -17,9 +17,9 @@ from whisper_test.exceptions import (
 from whisper_test.syslog_monitor import SyslogMonitor
 from whisper_test.common import (
     logger, DEFAULT_TTS_PROVIDER, SYSLOG_SEARCH_STRINGS,
-    TIMEOUT_FOR_APP_INSTALLATION, CUSTOM_CMD, SLEEP_AFTER_CMD,
-    SYSLOG_SCAN_AFTER_VOICE_CMD, SLEEP_AFTER_CUSTOM_CMD,
-    SYSLOG_MSG_VOICE_CMD_RECOGNIZED)
+    TIMEOUT_FOR_APP_INSTALLATION, CUSTOM_CMD, TIMING_AUTO_TUNE,
+    SYSLOG_SCAN_AFTER_VOICE_CMD, SYSLOG_MSG_APP_FOREGROUND,
+    SYSLOG_MSG_VOICE_CMD_RECOGNIZED, SYSLOG_MSG_VOICE_CMD_MATCHED_GRAMMAR, OCR_ROUTER, OCR_DELTA)
 
 from whisper_test.utils import (
     get_active_tunnel_conn, take_screenshot_dvt, save_processed_app_index,
@@ -31,9 +31,14 @@ from whisper_test.app_utils import (
     open_app_url, open_html_file_to_download_apps)
 from whisper_test.a11y_utils import axServices
 from whisper_test.tts import TTSController
+from whisper_test.timing_profile import TimingProfile
+from whisper_test.voice_cmd_stats import APP_LAUNCH_SAMPLE
 from whisper_test.ocr_utils import (
     ocr_img_by_ez_ocr, ocr_img_by_omniparser, get_matching_grid_number)
 from whisper_test.rule_based_app_navigation import find_next_action_rule_based
+from whisper_test.screen_elements import ScreenElements
+from whisper_test.ocr_router import get_ocr_router
+from whisper_test.ocr_delta import get_delta_ocr
 from whisper_test.navigation import NavigationController
 
 
@@ -64,6 +69,7 @@ class WhisperTestDevice():
         self.pcapd_service: PcapdService = None
         self.pcap_thread: threading.Thread = None
         self.tts = TTSController(tts_provider=self.tts_provider, verify_func=self.confirm_voice_cmd_in_syslog)
+        self.timing: TimingProfile = TimingProfile()
         if not connect_to_device:
             return
         self.connect_to_device()
@@ -71,8 +77,16 @@ class WhisperTestDevice():
         self.pcap_stop_event: threading.Event = threading.Event()
         self.a11y: axServices = axServices()
         self.populate_device_info()
+        # store the device model and iOS version with every voice command latency sample
+        self.tts.latency_stats.context.update({
+            "hardware_model": self.hardware_model,
+            "product_version": self.product_version,
+        })
+        if TIMING_AUTO_TUNE:
+            self.timing = TimingProfile.load(self.hardware_model, self.product_version)
         self.service_provider: LockdownClient = asyncio.run(self.get_service_provider())
         self.media_path = MEDIA_PATH
+        self.last_ocr_backend = None  # OCR backend that served the last screenshot
         self.navigation = NavigationController(self, MEDIA_PATH)
 
 
@@ -296,7 +310,7 @@ class WhisperTestDevice():
         if not open_app_url(self.tts, self.syslog, screen_elements, self.a11y, app_index, html_file_name):
             logger.info("❌ Failed to open the app URL.")
             return False
-        sleep(SLEEP_AFTER_CMD)
+        sleep(self.timing.sleep_after_cmd)
         screen_elements = self.get_screen_content_by_a11y(max_items=10)
 
         result = install_app_from_app_store(screen_elements, self.tts, self.syslog, timeout=TIMEOUT_FOR_APP_INSTALLATION)
@@ -395,6 +409,9 @@ class WhisperTestDevice():
     def launch_app(self, bundle_id: str, fail_silently=False) -> None:
         """Launch the app with the specified bundle ID."""
         if self.service_provider:
+            if OCR_DELTA:
+                # the next screenshot shows another app, nothing to carry over
+                get_delta_ocr().reset()
             return launch_app(bundle_id, self.service_provider)
         else:
             logger.error("❌ Cannot launch app. No active tunnel connection.")
@@ -406,7 +423,15 @@ class WhisperTestDevice():
         return self.a11y.get_ax_list_items(max_items=max_items)
 
     def get_screen_content_by_ocr(self, img_path: str, ocr_service: str = "omniparser"):
-        """Get the screen content using OCR."""
+        """Get the screen content using OCR.
+
+        With `ocr_router` enabled, `ocr_service` is the preferred backend; the
+        request goes to the fastest healthy backend and fails over to the other.
+        """
+        if OCR_ROUTER and ocr_service in ("ez_ocr", "omniparser"):
+            ocr_results, self.last_ocr_backend = get_ocr_router().ocr(img_path, preferred=ocr_service)
+            return ocr_results
+        self.last_ocr_backend = ocr_service
         if ocr_service == "ez_ocr":
             try:
                 ocr_results = ocr_img_by_ez_ocr(img_path)
@@ -435,38 +460,23 @@ class WhisperTestDevice():
         return
 
     def _get_screen_data(self, app_id, sc_name=None, use_ocr=False, ocr_service=None, timestamp=None):
-        """Retrieve screen data based on the selected mode (accessibility or OCR (omniparser))."""
+        """Retrieve screen data based on the selected mode (accessibility or OCR (omniparser)).
+
+        Returns the ScreenElements of the screen, None if OCR failed.
+        """
         if use_ocr:
             screen_data = self.get_screen_content_by_ocr(sc_name, ocr_service=ocr_service)
-            # Convert the list format to a more readable dictionary format
-            if screen_data and isinstance(screen_data, list):
-                formatted_data = []
-                for item in screen_data:
-                    # omniparse data format
-                    if len(item) >= 8:
-                        formatted_data.append({
-                            "id": item[0],
-                            "type": item[1],
-                            "text": item[2],
-                            "interactive": item[3],
-                            "x": item[4],
-                            "y": item[5],
-                            "width": item[6],
-                            "height": item[7]
-                        })
-                    else:
-                        # Handle any items that don't match the expected format
-                        formatted_data.append({"raw_data": item})
-            else:
-                formatted_data = screen_data
+            if screen_data is None:
+                return None
+            screen_elements = ScreenElements.from_screen_data(screen_data, is_ocr=True)
             with open(f"{MEDIA_PATH}/{app_id}_ocr_{timestamp}.json", "w") as f:
-                json.dump(formatted_data, f, indent=2)
-            return screen_data  # Return original data to avoid breaking existing functionality
+                json.dump(screen_elements.to_records(), f, indent=2)
+            return screen_elements
         else:
-            screen_elements = self.get_screen_content_by_a11y(max_items=15)
+            captions = self.get_screen_content_by_a11y(max_items=15)
             with open(f"{MEDIA_PATH}/{app_id}_a11y_{timestamp}.txt", "w") as f:
-                f.write(str(screen_elements))
-            return screen_elements
+                f.write(str(captions))
+            return ScreenElements.from_a11y(captions)
 
     def click_coordinates(self, interaction_coordinates, sc_path=None):
         """Click on specific coordinates using grid method.
@@ -483,6 +493,11 @@ class WhisperTestDevice():
             self.take_screenshot(sc_path)
         matching_number, matching_sub_cell, matching_finer_sub_cell, landscape = get_matching_grid_number(sc_path, interaction_coordinates)
         grid_command = "Show grid with 15 columns and 10 rows" if landscape else "show grid with 10 columns and 15 rows"
+        # synthesize the cell numbers while the grid command is played and verified
+        self.tts.prefetch([f"{number}" for number in (matching_number, matching_sub_cell)
+                           if number is not None])
+        if matching_finer_sub_cell is not None:
+            self.tts.prefetch(f"Tap, {matching_finer_sub_cell}")
 
         if not self.tts.say(grid_command):
             logger.error("❌ Failed to execute grid command: %s", grid_command)
@@ -512,7 +527,7 @@ class WhisperTestDevice():
         custom_cmd_executed = self.tts.say(custom_cmd)
         if custom_cmd_executed:
             logger.info("🚀 Custom command executed successfully.")
-            sleep(SLEEP_AFTER_CUSTOM_CMD)
+            sleep(self.timing.sleep_after_custom_cmd)
         return custom_cmd_executed
 
     def execute_navigation_command(self, command, coordinates, sc_name=None):
@@ -534,12 +549,28 @@ class WhisperTestDevice():
 
         if success:
             logger.info(f"🚀 Command executed successfully: {command}")
-            sleep(SLEEP_AFTER_CMD)
+            sleep(self.timing.sleep_after_cmd)
         else:
             logger.error(f"❌ Failed to execute command: {command}")
 
         return success
 
+    def record_app_launch_latency(self, app_id: str, launched_at: float):
+        """Record how long it took the launched app to reach the foreground.
+
+        Returns:
+            float: The latency in seconds, None if the foreground message was not seen
+        """
+        if self.syslog is None:
+            return None
+        syslog_entry = self.syslog.find_recent([SYSLOG_MSG_APP_FOREGROUND, app_id], since=launched_at)
+        if syslog_entry is None:
+            return None
+        latency = syslog_entry.received_at - launched_at
+        logger.info("⏱️ %s reached the foreground %.2f s after launch", app_id, latency)
+        self.tts.latency_stats.record_event(APP_LAUNCH_SAMPLE, latency, app_id=app_id)
+        return latency
+
     def check_app_background_status(self, app_id):
         """Check if the app has entered the background.
         
@@ -607,26 +638,37 @@ class WhisperTestDevice():
             bool: True if command was recognized, False otherwise
             
         Note:
-            On iOS 18.1.1+, "Matched Grammar" can also be used as confirmation
+            On iOS 18.1.1+, "Matched Grammar" can also be used as confirmation.
+            iOS may log both lines for one command, so confirmations logged
+            before the command was played belong to an earlier command and are skipped.
         """
-        sleep(SLEEP_AFTER_CMD)
+        playback_start = self.tts.last_playback_start
+        sleep(self.timing.syslog_wait_after_cmd)
         t0 = time()
         while time() - t0 < SYSLOG_SCAN_AFTER_VOICE_CMD:
             try:
                 syslog_entry = self.get_device_syslogs()
                 if print_syslog:
                     logger.info("syslog_entry: %s", syslog_entry)
-                    if "Matched Grammar" in syslog_entry:
-                        logger.info("✅🗣🗣 Matched Grammar in syslog for command '%s': %s",
-                                    command, syslog_entry)
-                if syslog_entry and (SYSLOG_MSG_VOICE_CMD_RECOGNIZED in syslog_entry):
-                    logger.info("✅🗣🗣 '%s' found in syslog for command '%s': %s",
-                                SYSLOG_MSG_VOICE_CMD_RECOGNIZED, command, syslog_entry)
-                    return True
                 if syslog_entry is None:
                     logger.error("❌ '%s' not found in syslog for command '%s'.",
                                  SYSLOG_MSG_VOICE_CMD_RECOGNIZED, command)
                     return False
+                if (SYSLOG_MSG_VOICE_CMD_RECOGNIZED in syslog_entry or
+                        SYSLOG_MSG_VOICE_CMD_MATCHED_GRAMMAR in syslog_entry):
+                    # time the entry arrived on the host, not the time we read it from the queue
+                    recognized_at = getattr(syslog_entry, 'received_at', time())
+                    if playback_start is not None and recognized_at < playback_start:
+                        logger.info("Skipping a confirmation logged before command '%s' was played: %s",
+                                    command, syslog_entry)
+                        continue
+                    logger.info("✅🗣🗣 Voice command confirmation found in syslog for command '%s': %s",
+                                command, syslog_entry)
+                    latency = self.tts.latency_stats.record_recognition(recognized_at)
+                    if latency is not None:
+                        logger.info("⏱️ Voice command '%s' recognized %.2f s after playback end",
+                                    command, latency)
+                    return True
             except Empty:
                 logger.error("🛑 No more syslog entries in the queue for command '%s'.", command)
                 break
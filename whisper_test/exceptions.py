@@ -10,3 +10,9 @@ class NoDeviceConnectedError(Exception):
 
 class MultipleDevicesConnectedError(Exception):
     pass
+
+class PiperProcessError(Exception):
+    pass
+
+class AudioStreamError(Exception):
+    pass
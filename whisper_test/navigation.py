@@ -8,10 +8,14 @@ except ImportError:
     print("❌ ad_template_matching not found.")
     perform_template_matching = None
 
-from whisper_test.common import TIMEOUT_FOR_APP_NAVIGATION
+from whisper_test.common import (
+    TIMEOUT_FOR_APP_NAVIGATION, TTS_PREFETCH_MAX_CANDIDATES, TTS_PREFETCH_MAX_CAPTION_LEN, OCR_PREFETCH,
+    OCR_STEP_DEADLINE)
+from whisper_test.deadline import deadline
 from whisper_test.rule_based_app_navigation import find_next_action_rule_based, create_rule_based_command
 from whisper_test.llm_based_app_navigation import find_next_action_llm_based
-from whisper_test.ocr_utils import get_coords_from_ocr, has_screen_changed
+from whisper_test.ocr_utils import get_coords_from_ocr, has_screen_changed, prefetch_ocr, is_ocr_available
+from whisper_test.screen_elements import ScreenElements
 from whisper_test.utils import get_timestamp, add_action_to_history, check_last_action_history
 
 logger = logging.getLogger(__name__)
@@ -26,6 +30,28 @@ class NavigationController:
         self.consent_mode = device.consent_mode
         print(f"💡 Consent mode: {self.consent_mode}")
 
+    @staticmethod
+    def get_candidate_phrases(screen_data, is_ocr: bool) -> List[str]:
+        """Return the "tap, <caption>" commands for the elements of the screen."""
+        if not screen_data:
+            return []
+        elements = ScreenElements.from_screen_data(screen_data, is_ocr)
+        if 'Direct Interaction' in elements:
+            return []
+        phrases = []
+        for text in elements.texts:
+            text = str(text).replace('[', '').replace(']', '').strip()
+            if text and len(text) <= TTS_PREFETCH_MAX_CAPTION_LEN:
+                phrases.append(create_rule_based_command(text))
+        return list(dict.fromkeys(phrases))[:TTS_PREFETCH_MAX_CANDIDATES]
+
+    def prefetch_candidate_phrases(self, screen_data, is_ocr: bool) -> None:
+        """Synthesize the commands for the screen elements while the next action is decided."""
+        phrases = self.get_candidate_phrases(screen_data, is_ocr)
+        if phrases:
+            logger.info("🔮 Prefetching %d candidate phrases", len(phrases))
+            self.device.tts.prefetch(phrases)
+
     def process_rule_based_commands(self, screen_data, use_ocr: bool, 
                                   sc_name_before: str, sc_name_after: str,
                                   handle_native: bool = True, handle_cookie: bool = False, 
@@ -51,7 +77,9 @@ class NavigationController:
             return False, rule_based_element
 
         self.device.take_screenshot(sc_name_after)
-        if has_screen_changed(sc_name_before, sc_name_after):
+        with deadline(OCR_STEP_DEADLINE):
+            screen_changed = has_screen_changed(sc_name_before, sc_name_after)
+        if screen_changed:
             logger.info("🚀 Screen changed")
             return True, rule_based_element
         logger.info("🚀 Screen did not change")
@@ -66,8 +94,13 @@ class NavigationController:
         if (not use_image) and (screen_data is None or len(screen_data) < 1 or 'Direct Interaction' in screen_data):
             llm_based_command, llm_output = "no option available", None
         else:
+            # the LLM service receives the data as returned by the a11y or OCR service
+            if isinstance(screen_data, ScreenElements):
+                screen_data_for_llm = screen_data.raw
+            else:
+                screen_data_for_llm = screen_data
             llm_based_command, llm_output = find_next_action_llm_based(
-                screen_data, app_id, use_accessibility=use_accessibility,
+                screen_data_for_llm, app_id, use_accessibility=use_accessibility,
                 use_ocr=use_ocr, use_image=use_image, image=sc_name_before,
                 action_history=action_history, consent_mode=self.consent_mode)
 
@@ -86,17 +119,25 @@ class NavigationController:
                 return False, llm_based_commands, llm_output
 
             self.device.take_screenshot(sc_name_after)
-            if has_screen_changed(sc_name_before, sc_name_after):
+            with deadline(OCR_STEP_DEADLINE):
+                screen_changed = has_screen_changed(sc_name_before, sc_name_after)
+            if screen_changed:
                 logger.info("💡 Screen number changed!")
                 return True, llm_based_commands, llm_output
 
         return False, llm_based_commands, llm_output
 
-    def take_screenshots(self, app_id: str) -> str:
-         """Take a screenshot of the app screen."""
+    def take_screenshots(self, app_id: str, prefetch_ocr_service: Optional[str] = None) -> str:
+         """Take a screenshot of the app screen.
+
+         With `prefetch_ocr_service`, OCR of the screenshot starts in the background,
+         so it is ready if a11y-based navigation fails and OCR is used.
+         """
          timestamp = get_timestamp()
          sc_name = f"{self.media_path}/{app_id}_{timestamp}.png"
          self.device.take_screenshot(sc_name)
+         if prefetch_ocr_service and OCR_PREFETCH:
+             prefetch_ocr(sc_name, prefetch_ocr_service)
          return sc_name, timestamp
 
     def navigate_app(self, app_id: str, ocr_service: str = "omniparser",
@@ -119,10 +160,12 @@ class NavigationController:
                 break
 
             sc_name_before, timestamp = self.take_screenshots(app_id)
-            screen_data = self.device._get_screen_data(app_id, sc_name_before, 
-                                                     use_ocr=use_ocr, 
-                                                     ocr_service=ocr_service, 
-                                                     timestamp=timestamp)
+            with deadline(OCR_STEP_DEADLINE):
+                screen_data = self.device._get_screen_data(app_id, sc_name_before, 
+                                                         use_ocr=use_ocr, 
+                                                         ocr_service=ocr_service, 
+                                                         timestamp=timestamp)
+            self.prefetch_candidate_phrases(screen_data, is_ocr=use_ocr)
             sc_name_after = f"{self.media_path}/{app_id}_{get_timestamp()}.png"
 
             # Handle native dialogs
@@ -181,79 +224,100 @@ class NavigationController:
                 logger.info("⚠️⌛️ Timeout for app navigation reached.")
                 break
 
+            ocr_available = is_ocr_available(ocr_service)
+            if not ocr_available:
+                logger.warning("🔌 OCR service %s is unavailable, skipping the OCR-based approaches", ocr_service)
+            ocr_prefetch_service = ocr_service if ocr_available else None
+
             # Try rule-based approach with accessibility
-            sc_name_before, timestamp = self.take_screenshots(app_id)
+            # the OCR-based steps below see the same screen, start OCR now
+            sc_name_before, timestamp = self.take_screenshots(app_id, prefetch_ocr_service=ocr_prefetch_service)
             sc_name_after = f"{self.media_path}/{app_id}_{get_timestamp()}.png"
 
             logger.info("🚀 Navigating to app: %s using rule-based approach (a11y)", app_id)
             a11y_data = self.device._get_screen_data(app_id, use_ocr=False, timestamp=timestamp)
+            self.prefetch_candidate_phrases(a11y_data, is_ocr=False)
 
             # Handle native dialogs with accessibility
             logger.info("Handling native dialogs (a11y)...")
-            rule_native_success, _ = self.process_rule_based_commands(
+            rule_native_success, rule_native_element = self.process_rule_based_commands(
                 a11y_data, False, sc_name_before, sc_name_after, handle_native=True)
             if rule_native_success:
                 logger.info("✅ Rule-based (a11y-native) command executed")
                 continue
+            # without a command sent, the screen is the one whose OCR was prefetched
+            screen_touched = rule_native_element is not None
 
             # Try rule-based approach with OCR
-            logger.error("❌ Failed to find the next action using rule-based (a11y) approach, trying OCR-based (ocr) data")
-            sc_name_before, timestamp = self.take_screenshots(app_id)
-            ocr_data = self.device._get_screen_data(app_id, sc_name_before,
-                                                  use_ocr=True, ocr_service=ocr_service,
-                                                  timestamp=timestamp)
-            sc_name_after = f"{self.media_path}/{app_id}_{get_timestamp()}.png"
-
-            rule_ocr_success, rule_ocr_element = self.process_rule_based_commands(
-                ocr_data, True, sc_name_before, sc_name_after, 
-                handle_native=True, handle_cookie=False, handle_apple=True,
-                action_history=action_history_rule_based)
-
-            action_history_rule_based, rule_ocr_element = add_action_to_history(
-                action_history_rule_based, rule_ocr_element)
-
-            if rule_ocr_success:
-                logger.info("✅ Rule-based (ocr) command executed")
-                continue
+            if ocr_available:
+                logger.error("❌ Failed to find the next action using rule-based (a11y) approach, trying OCR-based (ocr) data")
+                if screen_touched:
+                    sc_name_before, timestamp = self.take_screenshots(app_id)
+                with deadline(OCR_STEP_DEADLINE):
+                    ocr_data = self.device._get_screen_data(app_id, sc_name_before,
+                                                          use_ocr=True, ocr_service=ocr_service,
+                                                          timestamp=timestamp)
+                self.prefetch_candidate_phrases(ocr_data, is_ocr=True)
+                sc_name_after = f"{self.media_path}/{app_id}_{get_timestamp()}.png"
+
+                rule_ocr_success, rule_ocr_element = self.process_rule_based_commands(
+                    ocr_data, True, sc_name_before, sc_name_after, 
+                    handle_native=True, handle_cookie=False, handle_apple=True,
+                    action_history=action_history_rule_based)
+                screen_touched = screen_touched or rule_ocr_element is not None
+
+                action_history_rule_based, rule_ocr_element = add_action_to_history(
+                    action_history_rule_based, rule_ocr_element)
+
+                if rule_ocr_success:
+                    logger.info("✅ Rule-based (ocr) command executed")
+                    continue
 
-            # Try image-based LLM approach
-            logger.error("💡 Trying image-based LLM approach...")
-            sc_name_before, timestamp = self.take_screenshots(app_id)
-            sc_name_after = f"{self.media_path}/{app_id}_{get_timestamp()}.png"
+            # Try image-based LLM approach; the breaker may have opened during this step
+            if is_ocr_available(ocr_service):
+                logger.error("💡 Trying image-based LLM approach...")
+                if screen_touched:
+                    sc_name_before, timestamp = self.take_screenshots(app_id)
+                sc_name_after = f"{self.media_path}/{app_id}_{get_timestamp()}.png"
 
-            ocr_data = self.device.get_screen_content_by_ocr(
-                sc_name_before, ocr_service=ocr_service)
+                with deadline(OCR_STEP_DEADLINE):
+                    ocr_data = self.device.get_screen_content_by_ocr(
+                        sc_name_before, ocr_service=ocr_service)
+                if ocr_data is not None:
+                    ocr_data = ScreenElements.from_screen_data(ocr_data, is_ocr=True)
+                self.prefetch_candidate_phrases(ocr_data, is_ocr=True)
 
-            llm_success_flag, llm_based_commands, llm_output = self.process_llm_based_commands(
-                app_id, ocr_data, sc_name_before, sc_name_after,
-                use_accessibility=False, use_ocr=False,
-                llm_based_commands=llm_based_commands,
-                action_history=action_history_llm_based,
-                use_image=True)
+                llm_success_flag, llm_based_commands, llm_output = self.process_llm_based_commands(
+                    app_id, ocr_data, sc_name_before, sc_name_after,
+                    use_accessibility=False, use_ocr=False,
+                    llm_based_commands=llm_based_commands,
+                    action_history=action_history_llm_based,
+                    use_image=True)
 
-            if self.device.check_app_background_status(app_id):
-                logger.info("❌ App entered background, stopping navigation")
-                break
+                if self.device.check_app_background_status(app_id):
+                    logger.info("❌ App entered background, stopping navigation")
+                    break
 
-            action_history_image_based, llm_output = add_action_to_history(
-                action_history_image_based, llm_output,
-                deduplicate=False, command_success=llm_success_flag)
+                action_history_image_based, llm_output = add_action_to_history(
+                    action_history_image_based, llm_output,
+                    deduplicate=False, command_success=llm_success_flag)
 
-            if llm_success_flag:
-                logger.info("✅ LLM-based (image) command executed")
-                found, points = perform_template_matching(sc_name_after)
-                if found:
-                    logger.info("✅ Template matching found at points %s for appID: %s", points, app_id)
-                continue
-            else:
-                logger.error("❌ Failed to find the next action using image-based LLM-based approach")
+                if llm_success_flag:
+                    logger.info("✅ LLM-based (image) command executed")
+                    found, points = perform_template_matching(sc_name_after)
+                    if found:
+                        logger.info("✅ Template matching found at points %s for appID: %s", points, app_id)
+                    continue
+                else:
+                    logger.error("❌ Failed to find the next action using image-based LLM-based approach")
 
             # Try accessibility-based LLM approach
             logger.error("💡 Trying A11y-based LLM approach...")
-            sc_name_before, timestamp = self.take_screenshots(app_id)
+            sc_name_before, timestamp = self.take_screenshots(app_id, prefetch_ocr_service=ocr_prefetch_service)
             sc_name_after = f"{self.media_path}/{app_id}_{get_timestamp()}.png"
 
             a11y_data = self.device._get_screen_data(app_id, use_ocr=False, timestamp=timestamp)
+            self.prefetch_candidate_phrases(a11y_data, is_ocr=False)
             if a11y_data is not None and 'Direct Interaction' not in a11y_data:
                 logger.info("🚀 Navigating to app: %s using LLM-based approach (a11y)", app_id)
                 llm_success_flag, llm_based_commands, llm_output = self.process_llm_based_commands(
@@ -282,11 +346,15 @@ class NavigationController:
                 logger.error("❌ A11y data is not available for appID: %s", app_id)
 
             # Try OCR-based LLM approach
+            if not is_ocr_available(ocr_service):
+                continue
             logger.error("💡 Trying OCR-based LLM approach...")
             sc_name_before, timestamp = self.take_screenshots(app_id)
-            ocr_data = self.device._get_screen_data(app_id, sc_name_before,
-                                                  use_ocr=True, ocr_service=ocr_service,
-                                                  timestamp=timestamp)
+            with deadline(OCR_STEP_DEADLINE):
+                ocr_data = self.device._get_screen_data(app_id, sc_name_before,
+                                                      use_ocr=True, ocr_service=ocr_service,
+                                                      timestamp=timestamp)
+            self.prefetch_candidate_phrases(ocr_data, is_ocr=True)
             sc_name_after = f"{self.media_path}/{app_id}_{get_timestamp()}.png"
 
             llm_success_flag, llm_based_commands, llm_output = self.process_llm_based_commands(
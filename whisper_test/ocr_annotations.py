@@ -0,0 +1,126 @@
+"""OCR result log and on-demand rendering of annotated screenshots.
+
+OCR results are buffered and appended in batches to one JSONL log per media
+directory instead of one JSON file per screenshot. Annotated images (text
+boxes drawn on the screenshot) are only written during OCR if `ocr_annotate`
+is set; otherwise they can be rendered later from the logged boxes.
+
+USAGE:
+    python -m whisper_test.ocr_annotations media_output/com.example.app_2025-01-01_12-00-00.png
+    python -m whisper_test.ocr_annotations --all [--log media_output/ocr_results.jsonl]
+"""
+import argparse
+import atexit
+import json
+import os
+from os.path import dirname
+from threading import Lock
+from time import time
+from typing import Dict, List, Optional
+
+import cv2
+
+from whisper_test.common import logger, OCR_RESULTS_LOG_PATH, OCR_RESULTS_LOG_FLUSH_EVERY
+from whisper_test.screen_elements import ScreenElements
+
+
+class OcrResultLog:
+    """Buffered JSONL log of the OCR results of a session."""
+
+    def __init__(self, log_path: str = OCR_RESULTS_LOG_PATH,
+                 flush_every: int = OCR_RESULTS_LOG_FLUSH_EVERY):
+        self.log_path = log_path
+        self.flush_every = flush_every
+        self._buffer: List[str] = []
+        self._lock = Lock()
+
+    def add(self, img_path: str, backend: str, results) -> None:
+        """Log the OCR results of the screenshot; written with the next batch."""
+        record = {"img_path": img_path, "backend": backend, "time": time(), "results": results}
+        with self._lock:
+            self._buffer.append(json.dumps(record, default=str))
+            if len(self._buffer) >= self.flush_every:
+                self._flush()
+
+    def flush(self) -> None:
+        """Write the buffered results."""
+        with self._lock:
+            self._flush()
+
+    def _flush(self) -> None:
+        if not self._buffer:
+            return
+        try:
+            os.makedirs(dirname(self.log_path) or ".", exist_ok=True)
+            with open(self.log_path, 'a') as f:
+                f.write("\n".join(self._buffer) + "\n")
+        except OSError as e:
+            logger.error("❌ Error writing OCR results to %s: %s", self.log_path, e)
+        self._buffer = []
+
+
+def load_ocr_results(log_path: str = OCR_RESULTS_LOG_PATH) -> Dict[str, dict]:
+    """Return the last logged OCR record of each screenshot."""
+    records = {}
+    try:
+        with open(log_path, 'r') as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    record = json.loads(line)
+                    records[record["img_path"]] = record
+    except FileNotFoundError:
+        logger.info("No OCR results found at %s", log_path)
+    return records
+
+
+def render_annotations(img_path: str, results, out_path: Optional[str] = None) -> Optional[str]:
+    """Draw the OCR boxes on the screenshot and write it to `out_path` (default: `<img>-out.png`)."""
+    img = cv2.imread(img_path)
+    if img is None:
+        logger.error("❌ Cannot read image %s", img_path)
+        return None
+    elements = ScreenElements.from_screen_data(results, is_ocr=True)
+    for text, (x, y, w, h) in zip(elements.texts, elements.bboxes):
+        cv2.rectangle(img, (int(x), int(y)), (int(x + w), int(y + h)), (0, 255, 0), 2)
+        cv2.putText(img, str(text)[:40], (int(x), max(0, int(y) - 4)),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255), 1)
+    out_path = out_path or img_path.replace('.png', '-out.png')
+    cv2.imwrite(out_path, img)
+    return out_path
+
+
+_ocr_result_log: Optional[OcrResultLog] = None
+_ocr_result_log_lock = Lock()
+
+
+def get_ocr_result_log() -> OcrResultLog:
+    """Return the shared OCR result log."""
+    global _ocr_result_log
+    with _ocr_result_log_lock:
+        if _ocr_result_log is None:
+            _ocr_result_log = OcrResultLog()
+        return _ocr_result_log
+
+
+@atexit.register
+def flush_ocr_result_log() -> None:
+    """Write the OCR results that are still buffered."""
+    with _ocr_result_log_lock:
+        if _ocr_result_log is not None:
+            _ocr_result_log.flush()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Render annotated screenshots from the OCR result log.")
+    parser.add_argument("img_paths", nargs="*", help="Screenshots to annotate")
+    parser.add_argument("--all", action="store_true", help="Annotate every screenshot in the log")
+    parser.add_argument("--log", default=OCR_RESULTS_LOG_PATH, help="OCR result log (JSONL)")
+    args = parser.parse_args()
+
+    logged = load_ocr_results(args.log)
+    for path in (sorted(logged) if args.all else args.img_paths):
+        if path not in logged:
+            print(f"{path}: no OCR results in {args.log}")
+            continue
+        print(f"{path} -> {render_annotations(path, logged[path]['results'])}")
@@ -0,0 +1,168 @@
+"""Content-addressed cache of OCR results.
+
+Results are keyed by a hash of the image bytes, the OCR backend and its
+version, so a screenshot that was OCRed before (the same system dialog or
+home screen in another app, or the "before" screenshot compared by
+`has_screen_changed`) is never sent to the OCR backend again. Recent results
+are kept in an in-memory LRU; all results are stored in a SQLite database
+that persists across runs.
+"""
+import atexit
+import hashlib
+import json
+import os
+import sqlite3
+from collections import OrderedDict
+from os.path import dirname
+from threading import Lock
+from time import time
+from typing import Callable, Optional
+
+from whisper_test.common import logger, OCR_CACHE_PATH, OCR_CACHE_MEMORY_ENTRIES, OCR_CACHE_ENABLED
+
+
+def _to_builtin(obj):
+    """JSON fallback for numpy scalars in easyocr results."""
+    if hasattr(obj, 'item'):
+        return obj.item()
+    raise TypeError(f"Cannot serialize {type(obj)}")
+
+
+class OcrCache:
+    """OCR results keyed by image content, backend and backend version."""
+
+    def __init__(self, db_path: str = OCR_CACHE_PATH,
+                 max_memory_entries: int = OCR_CACHE_MEMORY_ENTRIES):
+        self.db_path = db_path
+        self.max_memory_entries = max_memory_entries
+        self._memory: OrderedDict = OrderedDict()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._lock = Lock()
+        if db_path != ":memory:":
+            os.makedirs(dirname(db_path), exist_ok=True)
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS ocr_results ("
+            "key TEXT PRIMARY KEY, backend TEXT, version TEXT, result TEXT, "
+            "created REAL, last_used REAL, hits INTEGER DEFAULT 0)")
+        self._db.commit()
+
+    @staticmethod
+    def make_key(img_path: str, backend: str, version: str) -> str:
+        """Return the cache key of the image content for the backend."""
+        sha256 = hashlib.sha256(f"{backend}\0{version}\0".encode('utf-8'))
+        with open(img_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                sha256.update(chunk)
+        return sha256.hexdigest()
+
+    def get(self, key: str):
+        """Return the cached result, None on a miss."""
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return self._memory[key]
+            row = self._db.execute(
+                "SELECT result FROM ocr_results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._db.execute(
+                "UPDATE ocr_results SET hits = hits + 1, last_used = ? WHERE key = ?",
+                (time(), key))
+            self._db.commit()
+            result = json.loads(row[0])
+            self._remember(key, result)
+            return result
+
+    def put(self, key: str, backend: str, version: str, result):
+        """Store the OCR result of an image and return it as a later hit will (tuples become lists)."""
+        result_json = json.dumps(result, default=_to_builtin)
+        now = time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO ocr_results "
+                "(key, backend, version, result, created, last_used) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, backend, version, result_json, now, now))
+            self._db.commit()
+            result = json.loads(result_json)
+            self._remember(key, result)
+        return result
+
+    def _remember(self, key: str, result) -> None:
+        self._memory[key] = result
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def get_or_compute(self, img_path: str, backend: str, version: str,
+                       ocr_func: Callable[[], object]):
+        """Return the cached result of the image, running `ocr_func` on a miss.
+
+        Failed OCR calls (None) are not cached. Hits and misses return the
+        same JSON types, so callers see lists where the OCR returned tuples.
+        """
+        try:
+            key = self.make_key(img_path, backend, version)
+        except OSError as e:
+            logger.error("❌ Cannot hash %s for the OCR cache: %s", img_path, e)
+            return ocr_func()
+        result = self.get(key)
+        if result is not None:
+            logger.info("💾 OCR cache hit (%s) for %s", backend, os.path.basename(img_path))
+            return result
+        result = ocr_func()
+        if result is not None:
+            result = self.put(key, backend, version, result)
+        return result
+
+    def stats(self) -> dict:
+        """Return the hit statistics of this session and the number of stored results."""
+        with self._lock:
+            n_lookups = self.memory_hits + self.disk_hits + self.misses
+            n_stored = self._db.execute("SELECT COUNT(*) FROM ocr_results").fetchone()[0]
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.memory_hits + self.disk_hits) / n_lookups if n_lookups else None,
+                "n_stored": n_stored,
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+_ocr_cache: Optional[OcrCache] = None
+_ocr_cache_lock = Lock()
+
+
+def get_ocr_cache() -> Optional[OcrCache]:
+    """Return the shared OCR cache, None if it is disabled in the config."""
+    global _ocr_cache
+    if not OCR_CACHE_ENABLED:
+        return None
+    with _ocr_cache_lock:
+        if _ocr_cache is None:
+            _ocr_cache = OcrCache()
+        return _ocr_cache
+
+
+@atexit.register
+def close_ocr_cache() -> None:
+    """Log the hit rate of this session and close the shared OCR cache."""
+    global _ocr_cache
+    with _ocr_cache_lock:
+        if _ocr_cache is not None:
+            stats = _ocr_cache.stats()
+            if stats["hit_rate"] is not None:
+                logger.info("💾 OCR cache: %d memory hits, %d disk hits, %d misses (hit rate %.0f%%)",
+                            stats["memory_hits"], stats["disk_hits"], stats["misses"],
+                            100 * stats["hit_rate"])
+            _ocr_cache.close()
+            _ocr_cache = None
@@ -0,0 +1,174 @@
+"""Incremental (delta) easyocr between consecutive screenshots.
+
+Consecutive navigation screenshots usually differ only in a small region,
+e.g. a dialog that appeared or a toggled button. The frame is split into
+tiles that are compared with the tiles of the previous frame; only the
+changed regions (padded so text at their border is not cut) are OCRed, and
+the text boxes of the unchanged regions are carried over from the previous
+frame. A full OCR is done for the first frame, after a change in size, when
+most of the screen changed, and every `OCR_DELTA_MAX_STEPS` frames so errors
+do not accumulate.
+"""
+from threading import Lock
+from typing import Callable, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from whisper_test.common import (
+    logger, OCR_DELTA_TILE_SIZE, OCR_DELTA_PIXEL_THRESHOLD, OCR_DELTA_PADDING,
+    OCR_DELTA_MAX_CHANGED_FRACTION, OCR_DELTA_MAX_STEPS)
+
+Box = Tuple[int, int, int, int]  # x, y, w, h
+
+
+def changed_tiles(img: np.ndarray, prev_img: np.ndarray, tile_size: int = OCR_DELTA_TILE_SIZE,
+                  pixel_threshold: int = OCR_DELTA_PIXEL_THRESHOLD) -> np.ndarray:
+    """Return a boolean (rows, columns) grid of the tiles that differ between the images."""
+    diff = cv2.absdiff(img, prev_img)
+    if diff.ndim == 3:
+        diff = diff.max(axis=2)
+    height, width = diff.shape
+    rows, columns = -(-height // tile_size), -(-width // tile_size)
+    padded = np.zeros((rows * tile_size, columns * tile_size), dtype=diff.dtype)
+    padded[:height, :width] = diff
+    tile_max = padded.reshape(rows, tile_size, columns, tile_size).max(axis=(1, 3))
+    return tile_max > pixel_threshold
+
+
+def _intersects(a: Box, b: Box) -> bool:
+    return a[0] < b[0] + b[2] and b[0] < a[0] + a[2] and a[1] < b[1] + b[3] and b[1] < a[1] + a[3]
+
+
+def _union(a: Box, b: Box) -> Box:
+    x1, y1 = min(a[0], b[0]), min(a[1], b[1])
+    x2, y2 = max(a[0] + a[2], b[0] + b[2]), max(a[1] + a[3], b[1] + b[3])
+    return x1, y1, x2 - x1, y2 - y1
+
+
+def changed_regions(tiles: np.ndarray, tile_size: int, padding: int, width: int, height: int,
+                    prev_boxes: Sequence[Box] = ()) -> List[Box]:
+    """Return the padded pixel regions of the connected groups of changed tiles.
+
+    Regions are grown to contain the previous text boxes they touch and merged
+    when they overlap, so no text line is OCRed in pieces.
+    """
+    n_labels, _, stats, _ = cv2.connectedComponentsWithStats(tiles.astype(np.uint8), connectivity=8)
+    regions = []
+    for x, y, w, h, _ in stats[1:n_labels]:  # label 0 is the unchanged background
+        x1, y1 = max(0, x * tile_size - padding), max(0, y * tile_size - padding)
+        x2 = min(width, (x + w) * tile_size + padding)
+        y2 = min(height, (y + h) * tile_size + padding)
+        regions.append((int(x1), int(y1), int(x2 - x1), int(y2 - y1)))
+
+    merged = True
+    while merged:
+        merged = False
+        for i, region in enumerate(regions):
+            for box in prev_boxes:
+                if _intersects(region, box) and _union(region, box) != region:
+                    region = _union(region, box)
+                    merged = True
+            regions[i] = region
+        for i in range(len(regions)):
+            for j in range(i + 1, len(regions)):
+                if _intersects(regions[i], regions[j]):
+                    regions[i] = _union(regions[i], regions.pop(j))
+                    merged = True
+                    break
+            if merged:
+                break
+    return regions
+
+
+class DeltaOcr:
+    """OCR of consecutive screenshots that only re-reads the changed regions."""
+
+    def __init__(self, full_ocr: Callable[[str], list],
+                 crop_ocr: Callable[[np.ndarray, Sequence[Box]], List[list]],
+                 tile_size: int = OCR_DELTA_TILE_SIZE,
+                 pixel_threshold: int = OCR_DELTA_PIXEL_THRESHOLD,
+                 padding: int = OCR_DELTA_PADDING,
+                 max_changed_fraction: float = OCR_DELTA_MAX_CHANGED_FRACTION,
+                 max_steps: int = OCR_DELTA_MAX_STEPS):
+        # full_ocr(img_path) and crop_ocr(img, boxes) return [(text, x, y, w, h), ...] in screenshot pixels
+        self.full_ocr = full_ocr
+        self.crop_ocr = crop_ocr
+        self.tile_size = tile_size
+        self.pixel_threshold = pixel_threshold
+        self.padding = padding
+        self.max_changed_fraction = max_changed_fraction
+        self.max_steps = max_steps
+        self._prev_img: Optional[np.ndarray] = None
+        self._prev_results: List[tuple] = []
+        self._n_delta_steps = 0
+        self._lock = Lock()
+        self.n_full = 0
+        self.n_delta = 0
+        self.n_tiles = 0
+        self.n_tiles_ocred = 0
+
+    def reset(self) -> None:
+        """Forget the previous frame, e.g. when another app is launched."""
+        with self._lock:
+            self._prev_img = None
+            self._prev_results = []
+
+    def _full(self, img_path: str, img: np.ndarray) -> List[tuple]:
+        results = [tuple(result) for result in self.full_ocr(img_path)]
+        self.n_full += 1
+        self._n_delta_steps = 0
+        self._prev_img, self._prev_results = img, results
+        return results
+
+    def ocr(self, img_path: str) -> List[tuple]:
+        """Return `[(text, x, y, w, h), ...]` of the screenshot."""
+        img = cv2.imread(img_path)
+        if img is None:
+            logger.error("❌ Cannot read image %s", img_path)
+            return []
+        with self._lock:
+            prev_img = self._prev_img
+            if (prev_img is None or prev_img.shape != img.shape
+                    or self._n_delta_steps >= self.max_steps):
+                return self._full(img_path, img)
+
+            tiles = changed_tiles(img, prev_img, self.tile_size, self.pixel_threshold)
+            n_changed = int(tiles.sum())
+            if n_changed > self.max_changed_fraction * tiles.size:
+                return self._full(img_path, img)
+
+            height, width = img.shape[:2]
+            prev_boxes = [tuple(int(v) for v in result[1:5]) for result in self._prev_results]
+            regions = changed_regions(tiles, self.tile_size, self.padding, width, height, prev_boxes)
+            kept = [result for result, box in zip(self._prev_results, prev_boxes)
+                    if not any(_intersects(box, region) for region in regions)]
+            new_results = []
+            if regions:
+                for region_results in self.crop_ocr(img, regions):
+                    new_results.extend(tuple(result) for result in region_results)
+            results = sorted(kept + new_results, key=lambda result: (result[2], result[1]))
+
+            self.n_delta += 1
+            self._n_delta_steps += 1
+            self.n_tiles += tiles.size
+            self.n_tiles_ocred += n_changed
+            logger.info("🧩 Delta OCR: %d of %d tiles changed, %d regions OCRed, %d text boxes kept",
+                        n_changed, tiles.size, len(regions), len(kept))
+            self._prev_img, self._prev_results = img, results
+            return results
+
+
+_delta_ocr: Optional[DeltaOcr] = None
+_delta_ocr_lock = Lock()
+
+
+def get_delta_ocr() -> DeltaOcr:
+    """Return the shared easyocr-based delta OCR."""
+    global _delta_ocr
+    with _delta_ocr_lock:
+        if _delta_ocr is None:
+            from whisper_test.ocr_engine import ez_ocr_image
+            from whisper_test.ocr_utils import ocr_element_crops
+            _delta_ocr = DeltaOcr(ez_ocr_image, ocr_element_crops)
+        return _delta_ocr
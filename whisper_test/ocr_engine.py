@@ -0,0 +1,172 @@
+"""Reused easyocr engines.
+
+Creating an easyocr `Reader` loads the detection and recognition models, which
+takes seconds and hundreds of MB. The reader is created once per process and
+reused. Optionally (`ez_ocr_workers` > 0), OCR runs in a pool of worker
+processes that each keep a warm reader, so several screenshots can be
+processed in parallel without blocking the navigation thread.
+With `ez_ocr_engine: onnx`, the reader runs int8-quantized models in
+onnxruntime instead (see ocr_onnx.py).
+"""
+import atexit
+import multiprocessing
+from collections import defaultdict
+from concurrent.futures import Future, ProcessPoolExecutor
+from threading import Lock
+from typing import Dict, List, Optional, Sequence
+
+import easyocr
+import numpy as np
+from easyocr import Reader
+
+from whisper_test.common import (
+    logger, EZ_OCR_LANGUAGES, EZ_OCR_WORKERS, EZ_OCR_BATCH_SIZE, EZ_OCR_ENGINE, OCR_ANNOTATE)
+from whisper_test.ocr_cache import get_ocr_cache
+
+
+_readers: Dict[tuple, Reader] = {}
+_readers_lock = Lock()
+# readtext is not safe to call from several threads at once
+_readtext_lock = Lock()
+
+
+def get_ez_ocr_reader(languages: Sequence[str] = EZ_OCR_LANGUAGES) -> Reader:
+    """Return the easyocr reader of this process, loading the models on first use."""
+    key = tuple(languages)
+    with _readers_lock:
+        if key not in _readers:
+            logger.info("🔤 Loading the easyocr models for %s", list(languages))
+            if EZ_OCR_ENGINE == "onnx":
+                from whisper_test.ocr_onnx import build_onnx_reader
+                _readers[key] = build_onnx_reader(languages)
+            else:
+                _readers[key] = Reader(list(languages))
+        return _readers[key]
+
+
+def ocr_in_process(img_path: str, languages: Sequence[str] = EZ_OCR_LANGUAGES) -> list:
+    """OCR the image with the reader of this process."""
+    from whisper_test.ocr_utils import ocr_image
+    reader = get_ez_ocr_reader(languages)
+    with _readtext_lock:
+        return ocr_image(img_path, reader, draw_bbox=OCR_ANNOTATE)
+
+
+def ocr_batch_in_process(images: List[np.ndarray], batch_size: int = EZ_OCR_BATCH_SIZE,
+                         languages: Sequence[str] = EZ_OCR_LANGUAGES) -> List[list]:
+    """Return the raw easyocr detections of each image, using the reader of this process.
+
+    Images of the same size go through `readtext_batched` together; text boxes
+    are recognized `batch_size` at a time.
+    """
+    reader = get_ez_ocr_reader(languages)
+    same_size = defaultdict(list)
+    for idx, image in enumerate(images):
+        same_size[image.shape[:2]].append(idx)
+
+    detections: List[list] = [[] for _ in images]
+    with _readtext_lock:
+        for indices in same_size.values():
+            if len(indices) > 1:
+                batch_detections = reader.readtext_batched(
+                    [images[idx] for idx in indices], batch_size=batch_size)
+            else:
+                batch_detections = [reader.readtext(images[indices[0]], batch_size=batch_size)]
+            for idx, image_detections in zip(indices, batch_detections):
+                detections[idx] = image_detections
+    return detections
+
+
+def _init_worker(languages: Sequence[str]) -> None:
+    """Load the reader when the worker process starts."""
+    get_ez_ocr_reader(languages)
+
+
+def _worker_ready() -> bool:
+    return True
+
+
+class EzOcrWorkerPool:
+    """Worker processes that each hold a warm easyocr reader."""
+
+    def __init__(self, n_workers: int, languages: Sequence[str] = EZ_OCR_LANGUAGES):
+        self.n_workers = n_workers
+        self.languages = list(languages)
+        # spawn: torch does not survive a fork after it has been initialized
+        self._executor = ProcessPoolExecutor(
+            max_workers=n_workers, mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker, initargs=(self.languages,))
+
+    def warm_up(self) -> None:
+        """Start all workers and wait until their readers are loaded."""
+        futures = [self._executor.submit(_worker_ready) for _ in range(self.n_workers)]
+        for future in futures:
+            future.result()
+
+    def submit(self, img_path: str) -> Future:
+        """OCR the image in a worker; the future resolves to the detections."""
+        return self._executor.submit(ocr_in_process, img_path, self.languages)
+
+    def submit_batch(self, images: List[np.ndarray], batch_size: int = EZ_OCR_BATCH_SIZE) -> Future:
+        """OCR the images in a worker; the future resolves to the raw detections of each image."""
+        return self._executor.submit(ocr_batch_in_process, images, batch_size, self.languages)
+
+    def ocr(self, img_path: str) -> list:
+        """OCR the image in a worker and wait for the detections."""
+        return self.submit(img_path).result()
+
+    def close(self) -> None:
+        """Stop the worker processes."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_ez_ocr_pool: Optional[EzOcrWorkerPool] = None
+_ez_ocr_pool_lock = Lock()
+
+
+def get_ez_ocr_pool(n_workers: int = EZ_OCR_WORKERS) -> Optional[EzOcrWorkerPool]:
+    """Return the shared worker pool, None if OCR runs in this process."""
+    global _ez_ocr_pool
+    if n_workers <= 0:
+        return None
+    with _ez_ocr_pool_lock:
+        if _ez_ocr_pool is None:
+            if EZ_OCR_ENGINE == "onnx":
+                # quantize the models once here rather than in every worker
+                get_ez_ocr_reader()
+            logger.info("🔤 Starting %d easyocr worker processes", n_workers)
+            _ez_ocr_pool = EzOcrWorkerPool(n_workers)
+        return _ez_ocr_pool
+
+
+def ez_ocr_version(languages: Sequence[str] = EZ_OCR_LANGUAGES) -> str:
+    """Return the easyocr version, languages and engine, part of the OCR cache key."""
+    version = f"{getattr(easyocr, '__version__', '')}-{'+'.join(languages)}"
+    return version if EZ_OCR_ENGINE == "torch" else f"{version}-{EZ_OCR_ENGINE}"
+
+
+def ez_ocr_image(img_path: str) -> List[tuple]:
+    """OCR the image with a warm reader: `[(text, x, y, w, h), ...]`.
+
+    Results are cached by image content; cached boxes are lists, not tuples.
+    """
+    def run_ocr():
+        pool = get_ez_ocr_pool()
+        if pool is not None:
+            return pool.ocr(img_path)
+        return ocr_in_process(img_path)
+
+    ocr_cache = get_ocr_cache()
+    if ocr_cache is None:
+        return run_ocr()
+    return ocr_cache.get_or_compute(img_path, "ez_ocr", ez_ocr_version(), run_ocr)
+
+
+@atexit.register
+def close_ez_ocr_pool() -> None:
+    """Stop the shared worker pool."""
+    global _ez_ocr_pool
+    with _ez_ocr_pool_lock:
+        if _ez_ocr_pool is not None:
+            _ez_ocr_pool.close()
+            _ez_ocr_pool = None
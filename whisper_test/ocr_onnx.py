@@ -0,0 +1,228 @@
+"""Int8-quantized easyocr models running in onnxruntime, for CPU-only OCR.
+
+The CRAFT detector and the recognizer of an easyocr `Reader` are exported to
+ONNX once, quantized to int8 (static QDQ quantization, calibrated on real
+screenshots) and swapped into the reader. `readtext` keeps the easyocr pre-
+and post-processing, only the two models run in onnxruntime, with the thread
+count tuned to the number of OCR worker processes.
+
+Compare with the stock reader:
+    python examples/ocr_onnx_benchmark/ocr_onnx_benchmark.py media_output
+"""
+import inspect
+import os
+from glob import glob
+from os.path import exists, join
+from typing import List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+import torch
+from easyocr import Reader
+
+try:
+    import onnxruntime
+    from onnxruntime.quantization import CalibrationDataReader, QuantFormat, QuantType, quantize_static
+except ImportError:  # only needed with ez_ocr_engine: onnx
+    onnxruntime = None
+    CalibrationDataReader = object
+
+from whisper_test.common import (
+    logger, EZ_OCR_LANGUAGES, EZ_OCR_WORKERS, EZ_OCR_ONNX_DIR, EZ_OCR_ONNX_THREADS,
+    EZ_OCR_ONNX_CALIBRATION_DIR, EZ_OCR_ONNX_CALIBRATION_IMAGES)
+
+ONNX_OPSET = 17
+# longest side of the detector inputs used for calibration; the calibrator keeps every
+# activation of a run, which needs ~5 GB for one full-size screenshot
+CALIBRATION_MAX_SIDE = 640
+# the TorchScript exporter writes a single file; torch >= 2.9 defaults to the dynamo exporter
+_EXPORT_KWARGS = {"dynamo": False} if "dynamo" in inspect.signature(torch.onnx.export).parameters else {}
+
+
+def onnx_threads(threads: int = EZ_OCR_ONNX_THREADS, n_workers: int = EZ_OCR_WORKERS) -> int:
+    """Return the intra-op threads of a session: `threads`, or the CPU cores shared by the OCR workers."""
+    if threads > 0:
+        return threads
+    return max(1, (os.cpu_count() or 1) // max(1, n_workers))
+
+
+def make_onnx_session(model_path: str, threads: int) -> "onnxruntime.InferenceSession":
+    """Load the model on the CPU with `threads` intra-op threads."""
+    options = onnxruntime.SessionOptions()
+    options.intra_op_num_threads = threads
+    # the detector and recognizer graphs are sequential; more inter-op threads only add contention
+    options.inter_op_num_threads = 1
+    options.execution_mode = onnxruntime.ExecutionMode.ORT_SEQUENTIAL
+    options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+    return onnxruntime.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+
+
+class OnnxModule(torch.nn.Module):
+    """Runs an ONNX model where easyocr calls its torch detector or recognizer."""
+
+    def __init__(self, session, recorded_inputs: Optional[list] = None):
+        super().__init__()
+        self.session = session
+        self.input_name = session.get_inputs()[0].name
+        # calibration: the inputs easyocr feeds the model
+        self.recorded_inputs = recorded_inputs
+
+    def forward(self, image, *unused):
+        # the recognizer also gets a text tensor, which the CTC models ignore
+        image = image.detach().cpu().numpy()
+        if self.recorded_inputs is not None:
+            self.recorded_inputs.append(image)
+        outputs = tuple(torch.from_numpy(output) for output in self.session.run(None, {self.input_name: image}))
+        return outputs if len(outputs) > 1 else outputs[0]
+
+
+class RecognizerGraph(torch.nn.Module):
+    """The easyocr recognizer without the unused text input, exportable with a dynamic width.
+
+    `AdaptiveAvgPool2d((None, 1))` averages the feature height; it is written as a
+    mean since ONNX has no adaptive pooling with a dynamic output size.
+    """
+
+    def __init__(self, recognizer: torch.nn.Module):
+        super().__init__()
+        self.recognizer = recognizer
+
+    def forward(self, image):
+        model = self.recognizer
+        visual_feature = model.FeatureExtraction(image).permute(0, 3, 1, 2).mean(dim=3)
+        contextual_feature = model.SequenceModeling(visual_feature)
+        return model.Prediction(contextual_feature.contiguous())
+
+
+def _downscale(image: np.ndarray, max_side: int = CALIBRATION_MAX_SIDE) -> np.ndarray:
+    """Shrink an NCHW detector input so that its longest side is at most `max_side`."""
+    height, width = image.shape[2:]
+    scale = max_side / max(height, width)
+    if scale >= 1:
+        return image
+    size = (max(32, int(width * scale) // 32 * 32), max(32, int(height * scale) // 32 * 32))
+    return np.stack([cv2.resize(img.transpose(1, 2, 0), size, interpolation=cv2.INTER_AREA).transpose(2, 0, 1)
+                     for img in image])
+
+
+class _RecordedInputs(CalibrationDataReader):
+    """Feeds the recorded model inputs to the onnxruntime calibrator."""
+
+    def __init__(self, input_name: str, inputs: List[np.ndarray]):
+        self._inputs = iter({input_name: image} for image in inputs)
+
+    def get_next(self):
+        return next(self._inputs, None)
+
+
+def onnx_model_paths(reader: Reader, model_dir: str = EZ_OCR_ONNX_DIR, quantized: bool = True) -> Tuple[str, str]:
+    """Return the paths of the detector and recognizer models of the reader."""
+    suffix = "int8.onnx" if quantized else "onnx"
+    return (join(model_dir, f"craft_detector.{suffix}"),
+            join(model_dir, f"{reader.model_lang}_recognizer.{suffix}"))
+
+
+def export_onnx_models(reader: Reader, model_dir: str = EZ_OCR_ONNX_DIR) -> Tuple[str, str]:
+    """Export the float32 detector and recognizer of the reader to ONNX."""
+    detector_path, recognizer_path = onnx_model_paths(reader, model_dir, quantized=False)
+    os.makedirs(model_dir, exist_ok=True)
+    with torch.no_grad():
+        torch.onnx.export(reader.detector.eval(), (torch.zeros(1, 3, 640, 480),), detector_path,
+                          input_names=["image"], output_names=["y", "feature"], opset_version=ONNX_OPSET,
+                          dynamic_axes={"image": {0: "batch", 2: "height", 3: "width"}}, **_EXPORT_KWARGS)
+        torch.onnx.export(RecognizerGraph(reader.recognizer.eval()), (torch.zeros(2, 1, 64, 256),),
+                          recognizer_path, input_names=["image"], output_names=["preds"], opset_version=ONNX_OPSET,
+                          dynamic_axes={"image": {0: "batch", 2: "height", 3: "width"},
+                                        "preds": {0: "batch", 1: "length"}}, **_EXPORT_KWARGS)
+    return detector_path, recognizer_path
+
+
+def calibration_screenshots(calibration_dir: str = EZ_OCR_ONNX_CALIBRATION_DIR,
+                            max_images: int = EZ_OCR_ONNX_CALIBRATION_IMAGES) -> List[str]:
+    """Return up to `max_images` screenshots of the directory, spread over the sorted file names."""
+    img_paths = sorted(p for p in glob(join(calibration_dir, "*.png")) if not p.endswith("-out.png"))
+    step = max(1, len(img_paths) // max_images)
+    return img_paths[::step][:max_images]
+
+
+def quantize_onnx_models(reader: Reader, img_paths: Sequence[str],
+                         model_dir: str = EZ_OCR_ONNX_DIR) -> Tuple[str, str]:
+    """Export the models of the reader and quantize them to int8, calibrated on the screenshots."""
+    detector_fp32, recognizer_fp32 = export_onnx_models(reader, model_dir)
+    detector_int8, recognizer_int8 = onnx_model_paths(reader, model_dir)
+    # run the float32 models over the screenshots to record what easyocr feeds them
+    detector_inputs, recognizer_inputs = [], []
+    detector, recognizer = reader.detector, reader.recognizer
+    reader.detector = OnnxModule(make_onnx_session(detector_fp32, onnx_threads()), detector_inputs)
+    reader.recognizer = OnnxModule(make_onnx_session(recognizer_fp32, onnx_threads()), recognizer_inputs)
+    try:
+        for img_path in img_paths:
+            reader.readtext(img_path)
+    finally:
+        reader.detector, reader.recognizer = detector, recognizer
+
+    if not recognizer_inputs:
+        logger.warning("⚠️ No text found in the calibration screenshots; running the float32 ONNX models")
+        return detector_fp32, recognizer_fp32
+    logger.info("🔤 Quantizing the easyocr models to int8 (%d screenshots, %d text batches)",
+                len(detector_inputs), len(recognizer_inputs))
+    detector_inputs = [_downscale(image) for image in detector_inputs]
+    quantize_static(detector_fp32, detector_int8 + ".tmp", _RecordedInputs("image", detector_inputs),
+                    quant_format=QuantFormat.QDQ, activation_type=QuantType.QUInt8,
+                    weight_type=QuantType.QInt8)
+    # only the convolutions of the recognizer: int8 LSTMs cost more accuracy than they save time
+    quantize_static(recognizer_fp32, recognizer_int8 + ".tmp", _RecordedInputs("image", recognizer_inputs),
+                    quant_format=QuantFormat.QDQ, activation_type=QuantType.QUInt8,
+                    weight_type=QuantType.QInt8, op_types_to_quantize=["Conv"])
+    # several OCR workers may quantize at once; the last one wins
+    os.replace(detector_int8 + ".tmp", detector_int8)
+    os.replace(recognizer_int8 + ".tmp", recognizer_int8)
+    return detector_int8, recognizer_int8
+
+
+def ensure_onnx_models(reader: Reader, model_dir: str = EZ_OCR_ONNX_DIR,
+                       calibration_dir: str = EZ_OCR_ONNX_CALIBRATION_DIR) -> Tuple[str, str]:
+    """Return the int8 models of the reader, quantizing them on first use.
+
+    Without calibration screenshots, the float32 ONNX models are used.
+    """
+    detector_int8, recognizer_int8 = onnx_model_paths(reader, model_dir)
+    if exists(detector_int8) and exists(recognizer_int8):
+        return detector_int8, recognizer_int8
+    img_paths = calibration_screenshots(calibration_dir)
+    if img_paths:
+        return quantize_onnx_models(reader, img_paths, model_dir)
+    logger.warning("⚠️ No screenshots in %s to calibrate the int8 OCR models; "
+                   "running the float32 ONNX models", calibration_dir)
+    detector_fp32, recognizer_fp32 = onnx_model_paths(reader, model_dir, quantized=False)
+    if exists(detector_fp32) and exists(recognizer_fp32):
+        return detector_fp32, recognizer_fp32
+    return export_onnx_models(reader, model_dir)
+
+
+def attach_onnx_models(reader: Reader, detector_path: str, recognizer_path: str,
+                       threads: Optional[int] = None) -> Reader:
+    """Run the detector and recognizer of the reader in onnxruntime."""
+    threads = threads or onnx_threads()
+    reader.detector = OnnxModule(make_onnx_session(detector_path, threads))
+    reader.recognizer = OnnxModule(make_onnx_session(recognizer_path, threads))
+    return reader
+
+
+def build_onnx_reader(languages: Sequence[str] = EZ_OCR_LANGUAGES, threads: Optional[int] = None,
+                      model_dir: str = EZ_OCR_ONNX_DIR,
+                      calibration_dir: str = EZ_OCR_ONNX_CALIBRATION_DIR) -> Reader:
+    """Return an easyocr reader whose models run int8-quantized in onnxruntime.
+
+    Falls back to the stock reader if onnxruntime is not installed.
+    """
+    if onnxruntime is None:
+        logger.error("❌ onnxruntime package not found, using the stock easyocr models. "
+                     "Install it using 'pip install onnxruntime'")
+        return Reader(list(languages), gpu=False)
+    # the float32 torch models are exported; torch's own int8 modules cannot be
+    reader = Reader(list(languages), gpu=False, quantize=False)
+    detector_path, recognizer_path = ensure_onnx_models(reader, model_dir, calibration_dir)
+    threads = threads or onnx_threads()
+    logger.info("🔤 Running %s and %s in onnxruntime with %d threads", detector_path, recognizer_path, threads)
+    return attach_onnx_models(reader, detector_path, recognizer_path, threads)
@@ -0,0 +1,104 @@
+"""Speculative OCR of screenshots.
+
+Navigation tries the accessibility data first and only falls back to OCR when
+that fails. `OcrPrefetcher.submit` starts OCR in the background as soon as a
+screenshot is taken; a later OCR request for the same frame (same image
+content, even under another file name) waits for the in-flight result instead
+of sending the screenshot to the OCR backend again. The wait ends at the
+deadline of the current navigation step.
+"""
+import atexit
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from threading import Lock
+from typing import Callable, Optional
+
+from whisper_test.common import logger, OCR_PREFETCH_WORKERS, OCR_PREFETCH_MAX_FRAMES
+from whisper_test.deadline import remaining_time
+from whisper_test.ocr_cache import OcrCache
+
+
+class OcrPrefetcher:
+    """Background OCR of screenshots, deduplicated by image content."""
+
+    def __init__(self, n_workers: int = OCR_PREFETCH_WORKERS,
+                 max_frames: int = OCR_PREFETCH_MAX_FRAMES):
+        self.max_frames = max_frames
+        self._executor = ThreadPoolExecutor(max_workers=n_workers, thread_name_prefix="ocr_prefetch")
+        # (image content hash, backend) -> OCR future of the most recent frames
+        self._futures: OrderedDict = OrderedDict()
+        self._lock = Lock()
+
+    @staticmethod
+    def _frame_key(img_path: str, backend: str) -> Optional[str]:
+        try:
+            return OcrCache.make_key(img_path, backend, "")
+        except OSError as e:
+            logger.error("❌ Cannot read %s for OCR prefetch: %s", img_path, e)
+            return None
+
+    def submit(self, img_path: str, backend: str, ocr_func: Callable[[str], object]) -> Optional[Future]:
+        """Start OCR of the screenshot unless the same frame is already being OCRed.
+
+        Returns the future of the OCR result, None if the screenshot cannot be read.
+        """
+        key = self._frame_key(img_path, backend)
+        if key is None:
+            return None
+        with self._lock:
+            future = self._futures.get(key)
+            if future is None or self._is_failed(future):
+                future = self._executor.submit(ocr_func, img_path)
+                self._futures[key] = future
+            self._futures.move_to_end(key)
+            while len(self._futures) > self.max_frames:
+                self._futures.popitem(last=False)
+        return future
+
+    @staticmethod
+    def _is_failed(future: Future) -> bool:
+        """Return True for a finished OCR call that raised or returned nothing."""
+        if not future.done():
+            return False
+        return future.cancelled() or future.exception() is not None or future.result() is None
+
+    def result(self, img_path: str, backend: str, ocr_func: Callable[[str], object]):
+        """Return the OCR result of the screenshot, waiting for a prefetch of the same frame."""
+        key = self._frame_key(img_path, backend)
+        with self._lock:
+            future = self._futures.get(key) if key is not None else None
+        if future is not None and not self._is_failed(future):
+            if not future.done():
+                logger.info("⏳ Waiting for the OCR prefetch of %s", img_path)
+            try:
+                return future.result(timeout=remaining_time())
+            except FutureTimeoutError:
+                logger.error("❌ OCR prefetch of %s not done at the step deadline", img_path)
+                return None
+        return ocr_func(img_path)
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_ocr_prefetcher: Optional[OcrPrefetcher] = None
+_ocr_prefetcher_lock = Lock()
+
+
+def get_ocr_prefetcher() -> OcrPrefetcher:
+    """Return the shared OCR prefetcher."""
+    global _ocr_prefetcher
+    with _ocr_prefetcher_lock:
+        if _ocr_prefetcher is None:
+            _ocr_prefetcher = OcrPrefetcher()
+        return _ocr_prefetcher
+
+
+@atexit.register
+def close_ocr_prefetcher() -> None:
+    """Stop the prefetch threads."""
+    global _ocr_prefetcher
+    with _ocr_prefetcher_lock:
+        if _ocr_prefetcher is not None:
+            _ocr_prefetcher.close()
+            _ocr_prefetcher = None
@@ -0,0 +1,180 @@
+"""Latency-aware routing of OCR requests between backends.
+
+The router keeps a rolling window of latencies and failures per OCR backend
+(easyocr, Omniparser). Each screenshot goes to the fastest healthy backend;
+when it fails, returns nothing or exceeds the latency budget of the call, the
+request fails over to the next backend. A backend whose error rate is too high
+is skipped until `OCR_ROUTER_RETRY_AFTER` seconds after its last failure.
+No backend is waited on past the deadline of the current navigation step.
+"""
+import atexit
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from contextvars import copy_context
+from threading import Lock
+from time import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from whisper_test.common import (
+    logger, OCR_LATENCY_BUDGET, OCR_ROUTER_WINDOW, OCR_ROUTER_MAX_ERROR_RATE, OCR_ROUTER_RETRY_AFTER)
+from whisper_test.deadline import get_deadline
+
+
+class OcrBackendStats:
+    """Rolling latency and error rate of one backend."""
+
+    def __init__(self, window: int = OCR_ROUTER_WINDOW):
+        self.latencies = deque(maxlen=window)
+        self.outcomes = deque(maxlen=window)  # True for a successful call
+        self.last_failure: Optional[float] = None
+
+    def record(self, latency: float, success: bool) -> None:
+        self.outcomes.append(success)
+        if success:
+            self.latencies.append(latency)
+        else:
+            self.last_failure = time()
+
+    @property
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return 1 - sum(self.outcomes) / len(self.outcomes)
+
+    @property
+    def median_latency(self) -> Optional[float]:
+        if not self.latencies:
+            return None
+        return sorted(self.latencies)[len(self.latencies) // 2]
+
+    def is_healthy(self, max_error_rate: float = OCR_ROUTER_MAX_ERROR_RATE,
+                   retry_after: float = OCR_ROUTER_RETRY_AFTER) -> bool:
+        if self.error_rate <= max_error_rate:
+            return True
+        # probe the backend again once it has rested
+        return self.last_failure is not None and time() - self.last_failure >= retry_after
+
+
+class OcrRouter:
+    """Send OCR requests to the fastest healthy backend and fail over on errors."""
+
+    def __init__(self, backends: Dict[str, Callable[[str], object]],
+                 latency_budget: float = OCR_LATENCY_BUDGET,
+                 window: int = OCR_ROUTER_WINDOW,
+                 max_error_rate: float = OCR_ROUTER_MAX_ERROR_RATE,
+                 retry_after: float = OCR_ROUTER_RETRY_AFTER):
+        # backend name -> function returning the OCR results of a screenshot, None on failure
+        self.backends = backends
+        self.latency_budget = latency_budget
+        self.max_error_rate = max_error_rate
+        self.retry_after = retry_after
+        self.stats = {name: OcrBackendStats(window) for name in backends}
+        self.served = Counter()  # requests served per backend
+        self._lock = Lock()
+        # calls that exceed the budget keep running here while the request fails over
+        self._executor = ThreadPoolExecutor(max_workers=2 * len(backends), thread_name_prefix="ocr_router")
+
+    def ranked_backends(self, preferred: Optional[str] = None,
+                        latency_budget: Optional[float] = None) -> List[str]:
+        """Return the backends in the order they are tried.
+
+        Healthy backends come first, then those expected to finish within the
+        budget, fastest first. Backends without measurements are ranked right
+        after the preferred backend, before slower measured ones (first if the
+        preferred backend is not measured either).
+        """
+        budget = self.latency_budget if latency_budget is None else latency_budget
+
+        def rank(name: str):
+            stats = self.stats[name]
+            latency = stats.median_latency
+            healthy = stats.is_healthy(self.max_error_rate, self.retry_after)
+            within_budget = latency is None or latency <= budget
+            if latency is None:
+                latency = preferred_latency
+            return (not healthy, not within_budget, latency, name != preferred)
+
+        with self._lock:
+            preferred_latency = 0.0
+            if preferred in self.stats and self.stats[preferred].median_latency is not None:
+                preferred_latency = self.stats[preferred].median_latency
+            return sorted(self.backends, key=rank)
+
+    def ocr(self, img_path: str, preferred: Optional[str] = None,
+            latency_budget: Optional[float] = None) -> Tuple[object, Optional[str]]:
+        """OCR the screenshot; return the results and the name of the backend that served them.
+
+        Every backend but the last one gets the remaining latency budget of the call,
+        the last one the time left until the step deadline, if any.
+        Returns (None, None) if all backends failed.
+        """
+        budget = self.latency_budget if latency_budget is None else latency_budget
+        step_deadline = get_deadline()
+        deadline = time() + budget
+        if step_deadline is not None:
+            deadline = min(deadline, step_deadline)
+        ranked = self.ranked_backends(preferred, budget)
+        for idx, name in enumerate(ranked):
+            is_last = idx == len(ranked) - 1
+            t0 = time()
+            # the backend sees the step deadline and cuts its own requests short
+            future = self._executor.submit(copy_context().run, self.backends[name], img_path)
+            try:
+                if is_last:
+                    timeout = None if step_deadline is None else max(0.0, step_deadline - t0)
+                else:
+                    timeout = max(0.0, deadline - t0)
+                results = future.result(timeout=timeout)
+                error = None if results is not None else "no results"
+            except FutureTimeoutError:
+                results, error = None, "out of time"
+            except Exception as e:
+                results, error = None, str(e)
+            latency = time() - t0
+            with self._lock:
+                self.stats[name].record(latency, error is None)
+                if error is None:
+                    self.served[name] += 1
+            if error is None:
+                logger.info("🧭 OCR served by %s in %.2f s", name, latency)
+                return results, name
+            logger.error("❌ OCR backend %s failed (%s) after %.2f s%s", name, error, latency,
+                         "" if is_last else ", failing over")
+        return None, None
+
+    def report(self) -> Dict[str, dict]:
+        """Return the served count, median latency and error rate of each backend."""
+        with self._lock:
+            return {name: {"served": self.served[name],
+                           "median_latency": stats.median_latency,
+                           "error_rate": stats.error_rate}
+                    for name, stats in self.stats.items()}
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_ocr_router: Optional[OcrRouter] = None
+_ocr_router_lock = Lock()
+
+
+def get_ocr_router() -> OcrRouter:
+    """Return the shared router between the Omniparser and easyocr backends."""
+    global _ocr_router
+    with _ocr_router_lock:
+        if _ocr_router is None:
+            from whisper_test.ocr_utils import ocr_img_by_omniparser, ocr_img_by_ez_ocr
+            _ocr_router = OcrRouter({"omniparser": ocr_img_by_omniparser, "ez_ocr": ocr_img_by_ez_ocr})
+        return _ocr_router
+
+
+@atexit.register
+def close_ocr_router() -> None:
+    """Log which backends served the OCR requests of this session."""
+    global _ocr_router
+    with _ocr_router_lock:
+        if _ocr_router is not None:
+            for name, backend_report in _ocr_router.report().items():
+                logger.info("🧭 OCR backend %s: %s", name, backend_report)
+            _ocr_router.close()
+            _ocr_router = None
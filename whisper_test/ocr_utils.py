@@ -1,40 +1,35 @@
-import base64
 import cv2
-import json
 import os
-import requests
 import time
 import numpy as np
-from easyocr import Reader
-from io import BytesIO
+from concurrent.futures import Future, ThreadPoolExecutor
 from os.path import basename
 from PIL import Image
-from whisper_test.common import logger
-from whisper_test.utils import levenshtein_similarity, fuzzy_jaccard_similarity, normalize_text, are_images_different
+from typing import List, Optional, Sequence, Tuple, Union
+from whisper_test.common import logger, EZ_OCR_BATCH_SIZE, OCR_DELTA, OCR_ROUTER
+from whisper_test.ocr_engine import ez_ocr_image, ocr_batch_in_process, get_ez_ocr_pool
+# OMNIPARSER_OCR_API_URL was defined here before the client moved to omniparser_client
+from whisper_test.omniparser_client import get_omniparser_client, OMNIPARSER_OCR_API_URL  # noqa: F401
+from whisper_test.ocr_prefetch import get_ocr_prefetcher
+from whisper_test.ocr_delta import get_delta_ocr
+from whisper_test.screen_elements import ScreenElements
+from whisper_test.ocr_annotations import get_ocr_result_log
+from whisper_test.screen_change import compare_screenshots, AMBIGUOUS, CHANGED
+from whisper_test.utils import fuzzy_jaccard_similarity, normalize_text
 
 
 RESIZE_MAX_IMG_DIM = 800
 
-def get_omniparser_url():
-    """Get Omniparser API URL from config or use default."""
-    from whisper_test.common import _config
-    return _config.get('omniparser_api_url', "http://0.0.0.0:5003/process")
-
-# API endpoint for the Omniparser OCR service
-OMNIPARSER_OCR_API_URL = get_omniparser_url()
-
 def resize_image(img, max_dim=RESIZE_MAX_IMG_DIM):
     """Resize the image to have at most max_dim in any dimension."""
-    print(f"Original image dims: {img.shape}")
-    logger.info(f"Original image dims: {img.shape}")
+    # called for every Omniparser upload
+    logger.debug(f"Original image dims: {img.shape}")
     scale = max_dim / max(img.shape[:2])
     if scale < 1:
         img = cv2.resize(img, None, fx=scale, fy=scale)
-        print(f"Resized image dims: {img.shape}")
-        logger.info(f"Resized image dims: {img.shape}")
+        logger.debug(f"Resized image dims: {img.shape}")
     else:
-        print(f"Image dims are already within max_dim: {img.shape}")
-        logger.info(f"Image dims are already within max_dim: {img.shape}")
+        logger.debug(f"Image dims are already within max_dim: {img.shape}")
     return img
 
 
@@ -94,66 +89,140 @@ def ocr_image(img_path, reader, draw_bbox=False, out_prefix='out'):
         print(f"Text: {text}")
         logger.info(f"Bounding box: {x1, y1, w, h}")
         logger.info(f"Text: {text}")
-        draw_bounding_box(img, detection)
+        if draw_bbox:
+            draw_bounding_box(img, detection)
         results.append((text, x1, y1, w, h))
 
-    print("write image with bounding boxes to file")
-    logger.info("write image with bounding boxes to file")
-    out_img_path = img_path.replace('.png', f'-{out_prefix}.png')
-    cv2.imwrite(out_img_path, img)
-    # write detection results to json file
+    if draw_bbox:
+        print("write image with bounding boxes to file")
+        logger.info("write image with bounding boxes to file")
+        out_img_path = img_path.replace('.png', f'-{out_prefix}.png')
+        cv2.imwrite(out_img_path, img)
     return results
 
+def _ez_ocr_screenshot(img_path: str) -> List[tuple]:
+    """OCR a navigation screenshot, only re-reading its changed regions if `ocr_delta` is set."""
+    if OCR_DELTA:
+        return get_delta_ocr().ocr(img_path)
+    return ez_ocr_image(img_path)
+
 def ocr_img_by_ez_ocr(img_path: str):
-    """Read text from all images in a directory and write the results to a json file."""
+    """Read text from the image and add the results to the OCR result log."""
     results = {}
-    # initialize the OCR reader
-    reader = Reader(['en'])
-
-    results[img_path] = ocr_image(img_path, reader, draw_bbox=True)
-    # Write the results to a json file
-    result_json_path = img_path.replace(".png", "") + "ez_ocr.json"
-    with open(result_json_path, 'w') as f:
-        f.write(json.dumps(results, indent=4, default=str))
+    # the reader is loaded once and reused (in this process or in a worker process)
+    results[img_path] = get_ocr_prefetcher().result(img_path, "ez_ocr", _ez_ocr_screenshot)
+    get_ocr_result_log().add(img_path, "ez_ocr", results[img_path])
     return results
 
+def load_ocr_image(image: Union[str, np.ndarray]) -> Optional[np.ndarray]:
+    """Decode the image file (arrays are returned as they are)."""
+    if isinstance(image, np.ndarray):
+        return image
+    img = cv2.imread(image)
+    if img is None:
+        logger.error("❌ Cannot read image %s", image)
+    return img
+
+def _detections_to_results(detections) -> List[tuple]:
+    """Convert easyocr detections to (text, x, y, w, h) tuples."""
+    return [(detection[1], *get_detection_bounding_box(detection)) for detection in detections]
+
+def ocr_images_batched(images: Sequence[Union[str, np.ndarray]],
+                       batch_size: int = EZ_OCR_BATCH_SIZE,
+                       n_preprocess_workers: Optional[int] = None) -> List[List[tuple]]:
+    """OCR many screenshots or crops with easyocr: one `[(text, x, y, w, h), ...]` per image.
+
+    Images are decoded in parallel threads. Detection and recognition run in
+    batches, split across the OCR worker processes if `ez_ocr_workers` is set.
+    Unreadable images get an empty result.
+    """
+    if not images:
+        return []
+    with ThreadPoolExecutor(max_workers=n_preprocess_workers) as executor:
+        arrays = list(executor.map(load_ocr_image, images))
+    valid = [idx for idx, img in enumerate(arrays) if img is not None]
+    valid_arrays = [arrays[idx] for idx in valid]
+
+    t0 = time.time()
+    pool = get_ez_ocr_pool()
+    if pool is None:
+        detections = ocr_batch_in_process(valid_arrays, batch_size)
+    else:
+        # one chunk per worker
+        chunk_size = max(1, -(-len(valid_arrays) // pool.n_workers))
+        futures = [pool.submit_batch(valid_arrays[i:i + chunk_size], batch_size)
+                   for i in range(0, len(valid_arrays), chunk_size)]
+        detections = [d for future in futures for d in future.result()]
+    logger.info("OCR of %d images took: %.2f s", len(valid_arrays), time.time() - t0)
+
+    results: List[List[tuple]] = [[] for _ in images]
+    for idx, image_detections in zip(valid, detections):
+        results[idx] = _detections_to_results(image_detections)
+    return results
+
+def ocr_element_crops(img_path: Union[str, np.ndarray], boxes: Sequence[Tuple[int, int, int, int]],
+                      batch_size: int = EZ_OCR_BATCH_SIZE) -> List[List[tuple]]:
+    """OCR the (x, y, w, h) regions of a screenshot; coordinates are in screenshot pixels."""
+    img = load_ocr_image(img_path)
+    if img is None:
+        return [[] for _ in boxes]
+    height, width = img.shape[:2]
+    crops, origins = [], []
+    for x, y, w, h in boxes:
+        x1, y1 = max(0, int(x)), max(0, int(y))
+        x2, y2 = min(width, int(x + w)), min(height, int(y + h))
+        crops.append(img[y1:max(y1 + 1, y2), x1:max(x1 + 1, x2)])
+        origins.append((x1, y1))
+    results = ocr_images_batched(crops, batch_size=batch_size)
+    return [[(text, cx + ox, cy + oy, cw, ch) for text, cx, cy, cw, ch in crop_results]
+            for crop_results, (ox, oy) in zip(results, origins)]
+
 def ocr_img_by_omniparser(img_path: str):
     """Read text from an image using the Omniparser OCR service."""
-     # Path to the image you want to send
-    image_name = basename(img_path)
-    # Send the image as a POST request
-    with open(img_path, 'rb') as image_file:
-        response = requests.post(
-            OMNIPARSER_OCR_API_URL,
-            files={'image': image_file},  # Send the image file here
-            data={'img_name': image_name}  # Send additional form data here
-        )
-    # Check the response
-    print(f"Status code: {response.status_code}")
-    if response.status_code == 200:
-        data = response.json()
-        # Get the base64 image from the response
-        base64_image = data['based64_image']
-
-        # Decode the image
-        image_data = base64.b64decode(base64_image)
-        image = Image.open(BytesIO(image_data))
-
-        # Optionally, save the image locally
-        # image.save("processed_image.png")
-        return data["structured_results"]
-    else:
-        print(f"Failed to get a response. Status code: {response.status_code}")
-        print(response.text)
-        return None
+    results = get_ocr_prefetcher().result(img_path, "omniparser", get_omniparser_client().process)
+    if results is not None:
+        get_ocr_result_log().add(img_path, "omniparser", results)
+    return results
+
+def prefetch_ocr(img_path: str, ocr_service: str = "omniparser") -> Optional[Future]:
+    """Start OCR of the screenshot in the background; `ocr_img_by_*` later wait for the result."""
+    if ocr_service == "ez_ocr":
+        return get_ocr_prefetcher().submit(img_path, "ez_ocr", _ez_ocr_screenshot)
+    if ocr_service == "omniparser":
+        return get_ocr_prefetcher().submit(img_path, "omniparser", get_omniparser_client().process)
+    logger.error("❌ Invalid OCR service: %s", ocr_service)
+    return None
+
+def is_ocr_available(ocr_service: str = "omniparser") -> bool:
+    """Return False while OCR of `ocr_service` would fail fast: the Omniparser circuit
+    breaker is open and the router cannot fail over to easyocr."""
+    if ocr_service != "omniparser" or get_omniparser_client().breaker.is_available():
+        return True
+    return OCR_ROUTER
 
 def has_screen_changed(sc_name_before: str, sc_name_after: str, threshold: float = 0.85) -> bool:
     """Check if the screen has changed and return True if it has."""
     logger.info("🚀 Checking if screen has changed")
     try:
-        screen_data_before = ocr_img_by_omniparser(sc_name_before)
+        diff = compare_screenshots(sc_name_before, sc_name_after)
+        if diff is None:
+            return False
+        logger.info("🔍 %.1f%% of the screen changed in %d regions: %s",
+                    100 * diff.changed_fraction, len(diff.regions), diff.verdict)
+        if diff.verdict != AMBIGUOUS:
+            return diff.verdict == CHANGED
+        # a small change, e.g. a toggle or a spinner: did the text change?
+        if not get_omniparser_client().breaker.is_available():
+            logger.warning("🔌 Omniparser is unavailable, taking the pixel change as a screen change")
+            return True
+        # both screenshots are OCRed at once; the screenshot before may already be prefetched
+        prefetch_ocr(sc_name_before, "omniparser")
         screen_data_after = ocr_img_by_omniparser(sc_name_after)
-        if screen_text_changed(screen_data_before, screen_data_after, threshold=threshold) and are_images_different(sc_name_before, sc_name_after):
+        screen_data_before = ocr_img_by_omniparser(sc_name_before)
+        if screen_data_before is None or screen_data_after is None:
+            logger.warning("⚠️ OCR failed, taking the pixel change as a screen change")
+            return True
+        if screen_text_changed(screen_data_before, screen_data_after, threshold=threshold):
             logger.info("✅ Screen has changed")
             return True
         logger.info("❌ Screen has not changed")
@@ -189,61 +258,19 @@ def screen_text_changed(screen_data_before, screen_data_after, threshold=0.85):
 
 def extract_texts_from_ocr(data_list):
     """Separate 'Text' and 'icon' entries into different lists."""
-    text_entries = []
-    icon_entries = []
-
-    for item in data_list:
-        category = item[1]
-        text_value = item[2]
-
-        if category.lower() == "text":
-            text_entries.append(text_value)
-        elif category.lower() == "icon":
-            icon_entries.append(text_value)
-
-    return text_entries, icon_entries
+    elements = ScreenElements.from_screen_data(data_list, is_ocr=True)
+    return elements.texts_of_type("text"), elements.texts_of_type("icon")
 
 def process_ocr_data(ocr_data):
     """Process OCR data to extract text and coordinates."""
-    text_coords_list = []
-    captions = []
-    # Determine the data format based on the first element
-    if isinstance(ocr_data, dict):
-        # ez_ocr format: {'ocr_test.png': [('text', x1, y1, x2, y2), ...]}
-        for value in ocr_data.values():
-            for item in value:
-                text, coords = item[0], item[1:]
-                lower_text = text.lower().replace(',', '').strip()
-                text_coords_list.append((lower_text, coords))
-                captions.append(lower_text)
-    elif isinstance(ocr_data, list):
-        # Check if this is the new dictionary format or the old list format
-        if ocr_data and isinstance(ocr_data[0], dict) and "text" in ocr_data[0]:
-            # New dictionary format
-            for item in ocr_data:
-                text = item["text"]
-                coords = (int(item["x"]), int(item["y"]), int(item["width"]), int(item["height"]))
-                lower_text = text.lower().replace(',', '').strip()
-                text_coords_list.append((lower_text, coords))
-                captions.append(lower_text)
-        else:
-            # Old Omniparser format: [['index', 'type', 'text', 'interactivity' x1, y1, x2, y2], ...]
-            for item in ocr_data:
-                text, coords = item[2], tuple(map(int, item[4:]))
-                lower_text = text.lower().replace(',', '').strip()
-                text_coords_list.append((lower_text, coords))
-                captions.append(lower_text)
-
-    return text_coords_list, captions
+    elements = ScreenElements.from_screen_data(ocr_data, is_ocr=True)
+    return elements.text_coords(), elements.norm_texts.tolist()
 
 def get_coords_from_ocr(command, screen_data):
+    """Return the (x, y, w, h) of the OCR element matching the command."""
     print(f"💡 Command: {command}")
     print(f"💡 Screen data: {screen_data}")
-    text_coords_list, _ = process_ocr_data(screen_data)
-    for lower_text, coords in text_coords_list:
-        if levenshtein_similarity(lower_text, command):
-            return coords
-    return None
+    return ScreenElements.from_screen_data(screen_data, is_ocr=True).find(command)
 
 ######################## grid method utils #########################
 def get_matching_grid_number(image_path, detection_coordinates):
@@ -0,0 +1,413 @@
+"""HTTP client for the Omniparser OCR service.
+
+A `requests.Session` keeps the connections to the server alive between
+screenshots. Requests have connect/read timeouts and are retried a bounded
+number of times on connection errors and gateway errors, not on read timeouts. The labeled image
+that Omniparser returns as base64 is only requested and decoded on demand.
+`submit` and `process_async` allow several requests to be in flight at once.
+Screenshots are downscaled and sent as JPEG or WebP (`omniparser_upload_*`);
+the returned boxes are scaled back to the coordinates of the screenshot.
+`process_batch` sends several screenshots per `/process_batch` request; with
+`omniparser_batch_window` set, concurrent `process` calls are micro-batched.
+A circuit breaker fails requests fast while the service is down, and requests
+are cut short at the deadline of the current navigation step.
+"""
+import asyncio
+import base64
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from contextvars import copy_context
+from functools import partial
+from io import BytesIO
+from os.path import basename
+from threading import Condition, Lock, Thread
+from time import time
+from typing import Callable, List, Optional, Sequence, Tuple
+
+import cv2
+import requests
+from PIL import Image
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from whisper_test.common import (
+    logger, OMNIPARSER_CONNECT_TIMEOUT, OMNIPARSER_READ_TIMEOUT,
+    OMNIPARSER_MAX_RETRIES, OMNIPARSER_POOL_SIZE, OMNIPARSER_VERSION,
+    OMNIPARSER_UPLOAD_FORMAT, OMNIPARSER_UPLOAD_MAX_DIM, OMNIPARSER_UPLOAD_QUALITY,
+    OMNIPARSER_BATCH_SIZE, OMNIPARSER_BATCH_WINDOW)
+from whisper_test.circuit_breaker import CircuitBreaker
+from whisper_test.deadline import remaining_time
+from whisper_test.ocr_cache import OcrCache, get_ocr_cache
+
+
+def get_omniparser_url():
+    """Get Omniparser API URL from config or use default."""
+    from whisper_test.common import _config
+    return _config.get('omniparser_api_url', "http://0.0.0.0:5003/process")
+
+
+def get_omniparser_batch_url(api_url: str) -> str:
+    """Get the batch endpoint from config, or `/process_batch` next to `api_url`."""
+    from whisper_test.common import _config
+    return _config.get('omniparser_batch_api_url', api_url.rsplit('/', 1)[0] + "/process_batch")
+
+# API endpoint for the Omniparser OCR service
+OMNIPARSER_OCR_API_URL = get_omniparser_url()
+
+_UPLOAD_ENCODINGS = {
+    "jpeg": (".jpg", "image/jpeg", cv2.IMWRITE_JPEG_QUALITY),
+    "webp": (".webp", "image/webp", cv2.IMWRITE_WEBP_QUALITY),
+    "png": (".png", "image/png", None),
+}
+
+
+def encode_screenshot(img_path: str, upload_format: str = OMNIPARSER_UPLOAD_FORMAT,
+                      max_dim: int = OMNIPARSER_UPLOAD_MAX_DIM,
+                      quality: int = OMNIPARSER_UPLOAD_QUALITY) -> Tuple[bytes, str, float, float]:
+    """Return the upload bytes, their MIME type and the x/y factors from upload to screen coordinates.
+
+    PNG screenshots within `max_dim` (or with `max_dim` 0) are sent unchanged.
+    """
+    from whisper_test.ocr_utils import resize_image
+    ext, mime_type, quality_flag = _UPLOAD_ENCODINGS[upload_format]
+    if upload_format == "png" and max_dim <= 0:
+        with open(img_path, 'rb') as f:
+            return f.read(), mime_type, 1.0, 1.0
+    img = cv2.imread(img_path, cv2.IMREAD_COLOR)
+    if img is None:
+        raise OSError(f"cannot read image {img_path}")
+    height, width = img.shape[:2]
+    if max_dim > 0:
+        img = resize_image(img, max_dim)
+    params = [quality_flag, quality] if quality_flag is not None else []
+    ok, buffer = cv2.imencode(ext, img, params)
+    if not ok:
+        raise OSError(f"cannot encode {img_path} as {upload_format}")
+    return buffer.tobytes(), mime_type, width / img.shape[1], height / img.shape[0]
+
+
+def rescale_structured_results(results: Optional[list], scale_x: float, scale_y: float) -> Optional[list]:
+    """Scale the boxes of the structured results from upload to screen coordinates.
+
+    Handles `[id, type, text, interactive, x, y, w, h]`, the same without
+    `interactive` and dicts with `x`, `y`, `width` and `height`. The service
+    may send the coordinates as strings.
+    """
+    if not results or (scale_x == 1 and scale_y == 1):
+        return results
+    scales = (scale_x, scale_y, scale_x, scale_y)
+    rescaled = []
+    for item in results:
+        if isinstance(item, dict):
+            item = dict(item)
+            for key, scale in zip(("x", "y", "width", "height"), scales):
+                item[key] = round(float(item[key]) * scale)
+        elif len(item) >= 7:
+            item = list(item)
+            start = 4 if len(item) >= 8 else 3
+            for idx, scale in zip(range(start, start + 4), scales):
+                item[idx] = round(float(item[idx]) * scale)
+        rescaled.append(item)
+    return rescaled
+
+
+class _MicroBatcher:
+    """Collects concurrent requests for `window` seconds (or until `max_batch`) and sends them together."""
+
+    def __init__(self, send_batch: Callable[[List[str]], List[Optional[list]]],
+                 window: float, max_batch: int, n_senders: int):
+        self.send_batch = send_batch
+        self.window = window
+        self.max_batch = max_batch
+        self._pending: List[Tuple[str, Future]] = []
+        self._first_at = 0.0
+        self._closed = False
+        self._cond = Condition()
+        # batches are sent from their own threads, several can be in flight
+        self._senders = ThreadPoolExecutor(max_workers=n_senders, thread_name_prefix="omniparser_batch")
+        self._thread = Thread(target=self._run, name="omniparser_batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, img_path: str) -> Future:
+        future = Future()
+        with self._cond:
+            if not self._pending:
+                self._first_at = time()
+            self._pending.append((img_path, future))
+            self._cond.notify()
+        return future
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+                while len(self._pending) < self.max_batch and not self._closed:
+                    remaining = self._first_at + self.window - time()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch, self._pending = self._pending[:self.max_batch], self._pending[self.max_batch:]
+                self._first_at = time()
+            self._senders.submit(self._send, batch)
+
+    def _send(self, batch: List[Tuple[str, Future]]) -> None:
+        try:
+            results = self.send_batch([img_path for img_path, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join(timeout=1)
+        self._senders.shutdown(wait=False)
+
+
+class OmniparserClient:
+    """Pooled, retrying client for the Omniparser `/process` endpoint."""
+
+    def __init__(self, api_url: str = OMNIPARSER_OCR_API_URL,
+                 connect_timeout: float = OMNIPARSER_CONNECT_TIMEOUT,
+                 read_timeout: float = OMNIPARSER_READ_TIMEOUT,
+                 max_retries: int = OMNIPARSER_MAX_RETRIES,
+                 pool_size: int = OMNIPARSER_POOL_SIZE,
+                 ocr_cache: Optional[OcrCache] = None,
+                 upload_format: str = OMNIPARSER_UPLOAD_FORMAT,
+                 upload_max_dim: int = OMNIPARSER_UPLOAD_MAX_DIM,
+                 upload_quality: int = OMNIPARSER_UPLOAD_QUALITY,
+                 batch_api_url: Optional[str] = None,
+                 batch_size: int = OMNIPARSER_BATCH_SIZE,
+                 batch_window: float = OMNIPARSER_BATCH_WINDOW,
+                 breaker: Optional[CircuitBreaker] = None):
+        if upload_format not in _UPLOAD_ENCODINGS:
+            raise ValueError(f"Unsupported upload format: {upload_format}")
+        self.api_url = api_url
+        self.batch_api_url = batch_api_url or get_omniparser_batch_url(api_url)
+        self.batch_size = batch_size
+        # set to False when the server has no batch endpoint
+        self.batch_supported = True
+        self.ocr_cache = ocr_cache
+        self.upload_format = upload_format
+        self.upload_max_dim = upload_max_dim
+        self.upload_quality = upload_quality
+        # the upload settings change the results, so they are part of the cache key
+        self.version = f"{OMNIPARSER_VERSION}-{upload_format}-{upload_max_dim}-{upload_quality}"
+        self.timeout = (connect_timeout, read_timeout)
+        self.breaker = breaker or CircuitBreaker("Omniparser")
+        # a read timeout is not retried: the server may still be working on the
+        # request, and every retry would wait the full read timeout again
+        retry = Retry(total=max_retries, connect=max_retries, read=0, status=max_retries,
+                      backoff_factor=0.5, status_forcelist=(502, 503, 504),
+                      allowed_methods=frozenset({"POST"}))
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._executor = ThreadPoolExecutor(max_workers=pool_size,
+                                            thread_name_prefix="omniparser")
+        # the batcher's threads must not wait on the executor, whose threads wait on the batcher
+        self._batcher = (_MicroBatcher(self._process_batch, batch_window, batch_size, pool_size)
+                         if batch_window > 0 else None)
+
+    def _send(self, url: str, description: str, read_timeout: float, **kwargs) -> Optional[requests.Response]:
+        """POST to the service unless the circuit breaker is open or the step deadline has passed;
+        return the response, None on failure."""
+        connect_timeout = self.timeout[0]
+        remaining = remaining_time()
+        if remaining is not None:
+            if remaining <= 0:
+                logger.error("❌ Omniparser %s skipped, the step deadline has passed", description)
+                return None
+            connect_timeout, read_timeout = min(connect_timeout, remaining), min(read_timeout, remaining)
+        if not self.breaker.allow_request():
+            logger.warning("🔌 Omniparser is unavailable, failing the %s fast", description)
+            return None
+        try:
+            response = self.session.post(url, timeout=(connect_timeout, read_timeout), **kwargs)
+        except requests.RequestException as e:
+            self.breaker.record_failure()
+            logger.error("❌ Omniparser %s failed: %s", description, e)
+            return None
+        # 4xx: the service is up but rejected the request
+        if response.status_code >= 500:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        return response
+
+    def _post(self, img_path: str, return_image: bool) -> Tuple[Optional[dict], float, float]:
+        """Send the screenshot; return the decoded JSON response (None on failure)
+        and the x/y factors from upload to screen coordinates."""
+        try:
+            image_bytes, mime_type, scale_x, scale_y = encode_screenshot(
+                img_path, self.upload_format, self.upload_max_dim, self.upload_quality)
+        except OSError as e:
+            logger.error("❌ Cannot prepare %s for Omniparser: %s", basename(img_path), e)
+            return None, 1.0, 1.0
+        response = self._send(
+            self.api_url, f"request for {basename(img_path)}", self.timeout[1],
+            files={'image': (basename(img_path), image_bytes, mime_type)},
+            # servers that do not know return_image still send the image, it is ignored
+            data={'img_name': basename(img_path), 'return_image': str(return_image).lower()})
+        if response is None:
+            return None, scale_x, scale_y
+        if response.status_code != 200:
+            logger.error("❌ Omniparser returned status %d for %s: %s",
+                         response.status_code, basename(img_path), response.text[:200])
+            return None, scale_x, scale_y
+        try:
+            return response.json(), scale_x, scale_y
+        except ValueError as e:
+            logger.error("❌ Invalid Omniparser response for %s: %s", basename(img_path), e)
+            return None, scale_x, scale_y
+
+    def _post_batch(self, img_paths: Sequence[str]) -> Optional[List[Optional[list]]]:
+        """Send the screenshots in one request; return the structured results of each
+        (None for failed images), or None if the request failed."""
+        files, data, scales, sent = [], [('return_image', 'false')], [], []
+        for idx, img_path in enumerate(img_paths):
+            try:
+                image_bytes, mime_type, scale_x, scale_y = encode_screenshot(
+                    img_path, self.upload_format, self.upload_max_dim, self.upload_quality)
+            except OSError as e:
+                logger.error("❌ Cannot prepare %s for Omniparser: %s", basename(img_path), e)
+                continue
+            files.append(('images', (basename(img_path), image_bytes, mime_type)))
+            data.append(('img_names', basename(img_path)))
+            scales.append((scale_x, scale_y))
+            sent.append(idx)
+        results: List[Optional[list]] = [None] * len(img_paths)
+        if not sent:
+            return results
+        response = self._send(self.batch_api_url, f"batch request for {len(sent)} screenshots",
+                              self.timeout[1] * len(sent), files=files, data=data)
+        if response is None:
+            return None
+        if response.status_code in (404, 405):
+            logger.warning("⚠️ %s has no batch endpoint, sending screenshots one by one", self.batch_api_url)
+            self.batch_supported = False
+            return None
+        if response.status_code != 200:
+            logger.error("❌ Omniparser returned status %d for a batch of %d screenshots: %s",
+                         response.status_code, len(sent), response.text[:200])
+            return None
+        try:
+            items = response.json()["results"]
+        except (ValueError, KeyError) as e:
+            logger.error("❌ Invalid Omniparser batch response: %s", e)
+            return None
+        for idx, (scale_x, scale_y), item in zip(sent, scales, items):
+            if item.get("error"):
+                logger.error("❌ Omniparser failed on %s: %s", basename(img_paths[idx]), item["error"])
+                continue
+            results[idx] = rescale_structured_results(item.get("structured_results"), scale_x, scale_y)
+        return results
+
+    def _process_batch(self, img_paths: Sequence[str],
+                       executor: Optional[ThreadPoolExecutor] = None) -> List[Optional[list]]:
+        """Uncached results of the screenshots: one batch request, or one request per
+        screenshot (in parallel on `executor`) if the server has no batch endpoint."""
+        if len(img_paths) > 1 and self.batch_supported:
+            results = self._post_batch(img_paths)
+            if results is not None:
+                return results
+            if self.batch_supported:  # the batch request failed
+                return [None] * len(img_paths)
+        if executor is None:
+            return [self._process(img_path) for img_path in img_paths]
+        return list(executor.map(self._process, img_paths))
+
+    def _micro_batched(self, img_path: str) -> Optional[list]:
+        try:
+            return self._batcher.submit(img_path).result(timeout=remaining_time())
+        except FutureTimeoutError:
+            logger.error("❌ Omniparser request for %s cut at the step deadline", basename(img_path))
+            return None
+
+    def process(self, img_path: str) -> Optional[list]:
+        """Return the structured results (screen elements) of the screenshot."""
+        if self._batcher is not None and self.batch_supported:
+            compute = partial(self._micro_batched, img_path)
+        else:
+            compute = partial(self._process, img_path)
+        if self.ocr_cache is not None:
+            return self.ocr_cache.get_or_compute(img_path, "omniparser", self.version, compute)
+        return compute()
+
+    def process_batch(self, img_paths: Sequence[str]) -> List[Optional[list]]:
+        """Return the structured results of each screenshot, `batch_size` screenshots per request."""
+        results: List[Optional[list]] = [None] * len(img_paths)
+        keys = [None] * len(img_paths)
+        misses = []
+        for idx, img_path in enumerate(img_paths):
+            if self.ocr_cache is not None:
+                try:
+                    keys[idx] = OcrCache.make_key(img_path, "omniparser", self.version)
+                    results[idx] = self.ocr_cache.get(keys[idx])
+                except OSError as e:
+                    logger.error("❌ Cannot hash %s for the OCR cache: %s", img_path, e)
+            if results[idx] is None:
+                misses.append(idx)
+        for start in range(0, len(misses), self.batch_size):
+            chunk = misses[start:start + self.batch_size]
+            chunk_results = self._process_batch([img_paths[idx] for idx in chunk], self._executor)
+            for idx, result in zip(chunk, chunk_results):
+                if result is not None and keys[idx] is not None:
+                    result = self.ocr_cache.put(keys[idx], "omniparser", self.version, result)
+                results[idx] = result
+        return results
+
+    def _process(self, img_path: str) -> Optional[list]:
+        data, scale_x, scale_y = self._post(img_path, return_image=False)
+        if data is None:
+            return None
+        return rescale_structured_results(data.get("structured_results"), scale_x, scale_y)
+
+    def process_with_image(self, img_path: str) -> Tuple[Optional[list], Optional[Image.Image]]:
+        """Return the structured results and the labeled image of the screenshot.
+
+        The labeled image has the size of the upload, the results are in screen coordinates.
+        """
+        data, scale_x, scale_y = self._post(img_path, return_image=True)
+        if data is None:
+            return None, None
+        image = None
+        if data.get("based64_image"):
+            image = Image.open(BytesIO(base64.b64decode(data["based64_image"])))
+        return rescale_structured_results(data.get("structured_results"), scale_x, scale_y), image
+
+    def submit(self, img_path: str) -> Future:
+        """Send the screenshot in the background; the future resolves to the structured results."""
+        # the request runs with the deadline of the calling step
+        return self._executor.submit(copy_context().run, self.process, img_path)
+
+    async def process_async(self, img_path: str) -> Optional[list]:
+        """Awaitable `process`, for sending several screenshots concurrently."""
+        return await asyncio.wrap_future(self.submit(img_path))
+
+    def close(self) -> None:
+        """Close the pooled connections."""
+        if self._batcher is not None:
+            self._batcher.close()
+        self._executor.shutdown(wait=False)
+        self.session.close()
+
+
+_omniparser_client: Optional[OmniparserClient] = None
+_omniparser_client_lock = Lock()
+
+
+def get_omniparser_client() -> OmniparserClient:
+    """Return the shared Omniparser client."""
+    global _omniparser_client
+    with _omniparser_client_lock:
+        if _omniparser_client is None:
+            _omniparser_client = OmniparserClient(ocr_cache=get_ocr_cache())
+        return _omniparser_client
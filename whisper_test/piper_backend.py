@@ -0,0 +1,207 @@
+"""Piper speech synthesis backends.
+
+Spawning `piper` for every phrase reloads the ONNX voice model each time.
+`PiperProcess` keeps one piper process alive per voice model and feeds it
+phrases over stdin using piper's JSON input mode. Processes are shared by all
+`TTSController` instances through `get_piper_pool`, which can run several
+processes of the same model in parallel (e.g. to warm up the audio cache).
+"""
+import atexit
+import json
+import shutil
+import subprocess
+import tempfile
+from queue import Queue, Empty
+from threading import Lock, Thread
+from typing import Dict, List, Optional
+
+from whisper_test.common import logger, PIPER_SYNTHESIS_TIMEOUT
+from whisper_test.exceptions import PiperProcessError
+
+
+PIPER_BINARY = "piper"
+# deterministic output: no noise, no silence between sentences
+PIPER_SYNTHESIS_ARGS = [
+    "--noise_scale", "0",
+    "--noise_w", "0",
+    "--sentence_silence", "0",
+]
+
+
+def length_scale_args(length_scale: float) -> List[str]:
+    """Return the piper arguments for the speech rate (< 1.0: faster)."""
+    if length_scale == 1.0:
+        return []
+    return ["--length_scale", str(length_scale)]
+
+
+def synthesize_once(model_path: str, text: str, audio_file_path: str,
+                    extra_args: Optional[List[str]] = None) -> None:
+    """Synthesize a single phrase by spawning a new piper process."""
+    subprocess.run(
+        [
+            PIPER_BINARY,
+            "--model", model_path,
+            "--output_file", audio_file_path,
+            *PIPER_SYNTHESIS_ARGS,
+            *(extra_args or []),
+        ],
+        input=text,
+        capture_output=True, text=True, check=True
+    )
+
+
+class PiperProcess:
+    """A long-running piper process that synthesizes phrases sent over stdin."""
+
+    def __init__(self, model_path: str, extra_args: Optional[List[str]] = None,
+                 timeout: float = PIPER_SYNTHESIS_TIMEOUT):
+        self.model_path = model_path
+        self.extra_args = extra_args or []
+        self.timeout = timeout
+        self.process: Optional[subprocess.Popen] = None
+        # piper needs an output directory in JSON mode; each request names its own output file
+        self._output_dir: Optional[str] = None
+        self._stdout_lines: Queue = Queue()
+        self._lock = Lock()
+
+    def start(self) -> None:
+        """Start the piper process and the thread reading its output."""
+        logger.info("🚀 Starting persistent piper process for %s", self.model_path)
+        if self._output_dir is None:
+            self._output_dir = tempfile.mkdtemp(prefix="piper_")
+        try:
+            self.process = subprocess.Popen(
+                [
+                    PIPER_BINARY,
+                    "--model", self.model_path,
+                    "--json-input",
+                    "--output_dir", self._output_dir,
+                    *PIPER_SYNTHESIS_ARGS,
+                    *self.extra_args,
+                ],
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL, text=True, bufsize=1
+            )
+        except OSError as e:  # e.g. piper is not on the PATH
+            raise PiperProcessError(f"Cannot start piper: {e}") from e
+        self._stdout_lines = Queue()
+        Thread(target=self._read_stdout, args=(self.process, self._stdout_lines),
+               daemon=True).start()
+
+    @staticmethod
+    def _read_stdout(process: subprocess.Popen, lines: Queue) -> None:
+        """Thread target: forward the paths piper prints for each synthesized phrase."""
+        for line in process.stdout:
+            lines.put(line.strip())
+        lines.put(None)  # process exited
+
+    def is_alive(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+    def synthesize(self, text: str, audio_file_path: str) -> None:
+        """Synthesize the text to the given wav file."""
+        with self._lock:
+            if not self.is_alive():
+                self.start()
+            request = json.dumps({"text": text, "output_file": audio_file_path})
+            try:
+                self.process.stdin.write(request + "\n")
+                self.process.stdin.flush()
+                output_path = self._stdout_lines.get(timeout=self.timeout)
+            except (BrokenPipeError, OSError, Empty) as e:
+                self._stop()
+                raise PiperProcessError(f"Piper did not synthesize '{text}': {e!r}") from e
+            if output_path is None:
+                self._stop()
+                raise PiperProcessError(f"Piper process exited while synthesizing '{text}'")
+
+    def _stop(self) -> None:
+        """Terminate the piper process."""
+        if self.process is None:
+            return
+        try:
+            self.process.stdin.close()
+            self.process.terminate()
+            self.process.wait(timeout=5)
+        except (OSError, subprocess.TimeoutExpired):
+            self.process.kill()
+        self.process = None
+
+    def close(self) -> None:
+        """Stop the piper process and remove its output directory."""
+        with self._lock:
+            self._stop()
+            if self._output_dir is not None:
+                shutil.rmtree(self._output_dir, ignore_errors=True)
+                self._output_dir = None
+
+
+class PiperProcessPool:
+    """Piper processes for one voice model, used in parallel by several threads.
+
+    Processes are started on demand, up to `max_processes`.
+    """
+
+    def __init__(self, model_path: str, extra_args: Optional[List[str]] = None,
+                 max_processes: int = 1):
+        self.model_path = model_path
+        self.extra_args = extra_args or []
+        self.max_processes = max_processes
+        self._processes: List[PiperProcess] = []
+        self._idle: Queue = Queue()
+        self._lock = Lock()
+
+    def resize(self, max_processes: int) -> None:
+        """Allow up to `max_processes` processes to run in parallel."""
+        with self._lock:
+            self.max_processes = max(self.max_processes, max_processes)
+
+    def _acquire(self) -> PiperProcess:
+        """Return an idle process, starting a new one if the pool is not full."""
+        try:
+            return self._idle.get_nowait()
+        except Empty:
+            pass
+        with self._lock:
+            if len(self._processes) < self.max_processes:
+                piper_process = PiperProcess(self.model_path, self.extra_args)
+                self._processes.append(piper_process)
+                return piper_process
+        return self._idle.get()
+
+    def synthesize(self, text: str, audio_file_path: str) -> None:
+        """Synthesize the text to the given wav file using an idle process."""
+        piper_process = self._acquire()
+        try:
+            piper_process.synthesize(text, audio_file_path)
+        finally:
+            self._idle.put(piper_process)
+
+    def close(self) -> None:
+        """Stop all processes of the pool."""
+        with self._lock:
+            for piper_process in self._processes:
+                piper_process.close()
+
+
+_piper_pools: Dict[tuple, PiperProcessPool] = {}
+_piper_pools_lock = Lock()
+
+
+def get_piper_pool(model_path: str, extra_args: Optional[List[str]] = None) -> PiperProcessPool:
+    """Return the shared piper process pool for the model, creating it if needed."""
+    key = (model_path, tuple(extra_args or []))
+    with _piper_pools_lock:
+        if key not in _piper_pools:
+            _piper_pools[key] = PiperProcessPool(model_path, extra_args)
+        return _piper_pools[key]
+
+
+@atexit.register
+def close_piper_processes() -> None:
+    """Stop all shared piper processes."""
+    with _piper_pools_lock:
+        for piper_pool in _piper_pools.values():
+            piper_pool.close()
+        _piper_pools.clear()
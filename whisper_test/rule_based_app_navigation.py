@@ -1,5 +1,5 @@
-from whisper_test.utils import levenshtein_similarity, read_text_file, filter_element_types
-from whisper_test.ocr_utils import process_ocr_data, get_coords_from_ocr
+from whisper_test.utils import levenshtein_similarity, read_text_file
+from whisper_test.screen_elements import ScreenElements, A11Y_SOURCE
 from whisper_test.common import logger, RULE_BASED_ACTION_MAPPINGS, KEYWORDS_FILE_PATH
 
 def is_dialog_present_from_mappings(screen_text_list, dialog_mappings):
@@ -78,11 +78,10 @@ def click_single_button(screen_text_list):
 def find_next_action_rule_based(data, consent_mode='accept', handle_native=False,
                     handle_cookie=False, handle_apple=False, is_ocr=False):
     """Decide what action to take based on the elements_text or OCR data."""
-    if is_ocr:
-        text_coords_list, screen_text_list = process_ocr_data(data)
-    else:
-        screen_text_list = data
-        text_coords_list = None
+    elements = ScreenElements.from_screen_data(data, is_ocr)
+    screen_text_list = elements.captions.tolist()
+    # the a11y captions without their element types ("Allow, Button" -> "Allow")
+    screen_labels = elements.texts.tolist() if elements.source == A11Y_SOURCE else screen_text_list
 
     if not screen_text_list or screen_text_list == ['Direct Interaction']:
         logger.info("No accessibility data found, skipping the rest of the processing.")
@@ -105,36 +104,27 @@ def find_next_action_rule_based(data, consent_mode='accept', handle_native=False
         if command:
             # command = f"Tap, {command}"
             logger.info(f"Command identified: {command}")
-            if is_ocr:
-                coords = get_coords_from_ocr(command, text_coords_list)
-                return command, coords
-            return (command, None)
+            return command, elements.find(command)
 
     if handle_cookie:
-        command = handle_cookie_dialog(filter_element_types(screen_text_list), KEYWORDS_FILE_PATH, consent_mode)
+        command = handle_cookie_dialog(screen_labels, KEYWORDS_FILE_PATH, consent_mode)
         if command:
             # command = f"Tap, {command}"
             logger.info(f"Command identified: {command}")
-            if is_ocr:
-                coords = get_coords_from_ocr(command, text_coords_list)
-                return command, coords
-            return (command, None)
+            return command, elements.find(command)
 
     if handle_apple:
-        command = handle_apple_authentication(filter_element_types(screen_text_list))
+        command = handle_apple_authentication(screen_labels)
         if command:
             logger.info(f"Command identified: {command}")
             # if is_ocr:
-            #     coords = get_coords_from_ocr(command, text_coords_list)
+            #     coords = elements.find(command)
             #     return command, coords
             return (command, None)
 
     click_button = click_single_button(screen_text_list)
     if click_button:
-        if is_ocr:
-            coords = get_coords_from_ocr(click_button, text_coords_list)
-            return click_button, coords
-        return (click_button, None)
+        return click_button, elements.find(click_button)
 
     return (None, None)
 
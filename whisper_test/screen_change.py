@@ -0,0 +1,79 @@
+"""Pixel-level detection of screen changes after a navigation command.
+
+`has_screen_changed` first compares grayscale screenshots, decoded at a
+fraction of their size, tile by tile. If no tile changed, the screen did not
+change; if a large part of it or many separate regions changed (a new screen,
+a scrolled list), it did. Only the ambiguous cases in between (a toggled
+switch, a spinner, a popover) need the OCR-based text comparison. The status
+bar (clock, battery) is ignored.
+
+Count the OCR calls saved on recorded screenshots:
+    python examples/screen_change_benchmark/screen_change_benchmark.py media_output
+"""
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from whisper_test.common import (
+    logger, SCREEN_CHANGE_REDUCE, SCREEN_CHANGE_TILE_SIZE, SCREEN_CHANGE_PIXEL_THRESHOLD,
+    SCREEN_CHANGE_CHANGED_FRACTION, SCREEN_CHANGE_CHANGED_REGIONS, SCREEN_CHANGE_STATUS_BAR)
+from whisper_test.ocr_delta import changed_tiles, changed_regions
+
+UNCHANGED = "unchanged"
+CHANGED = "changed"
+AMBIGUOUS = "ambiguous"
+
+_REDUCED_GRAYSCALE = {1: cv2.IMREAD_GRAYSCALE, 2: cv2.IMREAD_REDUCED_GRAYSCALE_2,
+                      4: cv2.IMREAD_REDUCED_GRAYSCALE_4, 8: cv2.IMREAD_REDUCED_GRAYSCALE_8}
+
+
+class ScreenDiff:
+    """Verdict, changed fraction and changed regions (x, y, w, h in screenshot pixels)."""
+
+    def __init__(self, verdict: str, changed_fraction: float, regions: List[Tuple[int, int, int, int]]):
+        self.verdict = verdict
+        self.changed_fraction = changed_fraction
+        self.regions = regions
+
+    def __repr__(self):
+        return f"ScreenDiff({self.verdict}, {self.changed_fraction:.1%} changed, {len(self.regions)} regions)"
+
+
+def load_screen(img_path: str, reduce: int = SCREEN_CHANGE_REDUCE) -> Optional[np.ndarray]:
+    """Decode the screenshot as grayscale at 1/`reduce` of its size."""
+    return cv2.imread(img_path, _REDUCED_GRAYSCALE[reduce])
+
+
+def diff_screens(img_before: np.ndarray, img_after: np.ndarray, reduce: int = SCREEN_CHANGE_REDUCE,
+                 tile_size: int = SCREEN_CHANGE_TILE_SIZE,
+                 pixel_threshold: int = SCREEN_CHANGE_PIXEL_THRESHOLD,
+                 changed_fraction: float = SCREEN_CHANGE_CHANGED_FRACTION,
+                 changed_regions_count: int = SCREEN_CHANGE_CHANGED_REGIONS,
+                 status_bar: float = SCREEN_CHANGE_STATUS_BAR) -> ScreenDiff:
+    """Compare two screenshots loaded by `load_screen`."""
+    height, width = img_after.shape[:2]
+    if img_before.shape != img_after.shape:  # rotated
+        return ScreenDiff(CHANGED, 1.0, [(0, 0, width * reduce, height * reduce)])
+    top = int(height * status_bar)
+    tiles = changed_tiles(img_after[top:], img_before[top:], tile_size, pixel_threshold)
+    fraction = float(tiles.mean()) if tiles.size else 0.0
+    regions = [(x * reduce, (y + top) * reduce, w * reduce, h * reduce)
+               for x, y, w, h in changed_regions(tiles, tile_size, 0, width, height - top)]
+    if not regions:
+        verdict = UNCHANGED
+    elif fraction >= changed_fraction or len(regions) >= changed_regions_count:
+        verdict = CHANGED
+    else:
+        verdict = AMBIGUOUS
+    return ScreenDiff(verdict, fraction, regions)
+
+
+def compare_screenshots(sc_name_before: str, sc_name_after: str,
+                        reduce: int = SCREEN_CHANGE_REDUCE) -> Optional[ScreenDiff]:
+    """Return the pixel-level difference of the screenshots, None if one cannot be read."""
+    img_before, img_after = load_screen(sc_name_before, reduce), load_screen(sc_name_after, reduce)
+    if img_before is None or img_after is None:
+        logger.error("❌ Cannot read %s", sc_name_before if img_before is None else sc_name_after)
+        return None
+    return diff_screens(img_before, img_after, reduce)
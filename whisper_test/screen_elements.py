@@ -0,0 +1,163 @@
+"""Columnar representation of the elements of a screen.
+
+The accessibility service returns captions such as "Allow, Button", easyocr
+returns `{img_path: [(text, x, y, w, h), ...]}` and Omniparser returns
+`[[id, type, text, interactive, x, y, w, h], ...]` (or the same as dicts).
+`ScreenElements.from_screen_data` converts any of them once per screen into
+NumPy columns that the rule engine, coordinate lookup, grid matching and
+serialization use without re-parsing the captions.
+"""
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from whisper_test.common import ELEMENT_TYPES, INTERACTIVE_ELEMENT_TYPES
+from whisper_test.utils import levenshtein_similarity
+
+A11Y_SOURCE = "a11y"
+EZ_OCR_SOURCE = "ez_ocr"
+OMNIPARSER_SOURCE = "omniparser"
+
+
+def normalize_caption(text: str) -> str:
+    """Lower-case the text and drop commas, as the rule engine compares captions."""
+    return text.lower().replace(',', '').strip()
+
+
+def split_a11y_caption(caption: str) -> Tuple[str, str]:
+    """Split an a11y caption ("Allow, Button") into its text and element type."""
+    parts = caption.split(',')
+    for i, part in enumerate(parts):
+        if part.strip() in ELEMENT_TYPES:
+            return ', '.join(p.strip() for p in parts[:i]), part.strip()
+    return ', '.join(p.strip() for p in parts), ""
+
+
+class ScreenElements:
+    """The elements of one screen, one row per element.
+
+    Columns: `ids`, `texts` (the element text), `norm_texts` (lower-cased, without
+    commas), `types`, `interactive` (bool) and `bboxes` (int32 x, y, w, h;
+    zeros for a11y elements, which have no coordinates). `captions` is what
+    the rule engine matches against: the full a11y caption, including the
+    element type, or the normalized OCR text.
+    """
+
+    def __init__(self, texts: Sequence[str], types: Sequence[str], interactive: Sequence[bool],
+                 bboxes: Optional[Sequence[Sequence[int]]] = None, captions: Optional[Sequence[str]] = None,
+                 source: str = OMNIPARSER_SOURCE, raw=None, ids: Optional[Sequence[str]] = None):
+        n = len(texts)
+        self.ids = np.array(ids if ids is not None else [str(idx) for idx in range(n)], dtype=object).reshape(n)
+        self.texts = np.array(texts, dtype=object).reshape(n)
+        self.norm_texts = np.array([normalize_caption(text) for text in texts], dtype=object).reshape(n)
+        self.types = np.array(types, dtype=object).reshape(n)
+        self.interactive = np.array(interactive, dtype=bool).reshape(n)
+        if bboxes is None:
+            self.bboxes = np.zeros((n, 4), dtype=np.int32)
+        else:
+            self.bboxes = np.array(bboxes, dtype=np.float64).reshape(n, 4).round().astype(np.int32)
+        self.captions = (np.array(captions, dtype=object).reshape(n) if captions is not None
+                         else self.norm_texts)
+        self.source = source
+        # the data as returned by the service, sent to the LLM-based navigation unchanged
+        self.raw = raw
+
+    @property
+    def has_bboxes(self) -> bool:
+        return self.source != A11Y_SOURCE
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def __contains__(self, caption: str) -> bool:
+        return caption in self.captions.tolist()
+
+    def __repr__(self):
+        return f"ScreenElements({self.source}, {len(self)} elements)"
+
+    @classmethod
+    def from_a11y(cls, captions: Iterable[str]) -> "ScreenElements":
+        captions = [str(caption) if caption is not None else "" for caption in captions]
+        texts, types = [], []
+        for caption in captions:
+            text, element_type = split_a11y_caption(caption)
+            texts.append(text)
+            types.append(element_type)
+        return cls(texts, types, [element_type in INTERACTIVE_ELEMENT_TYPES for element_type in types],
+                   captions=captions, source=A11Y_SOURCE, raw=captions)
+
+    @classmethod
+    def from_ez_ocr(cls, ocr_data) -> "ScreenElements":
+        """From `{img_path: [(text, x, y, w, h), ...]}` or the list of one image."""
+        items = ([item for items in ocr_data.values() for item in items]
+                 if isinstance(ocr_data, dict) else list(ocr_data))
+        return cls([str(item[0]) for item in items], ["text"] * len(items), [True] * len(items),
+                   bboxes=[item[1:5] for item in items], source=EZ_OCR_SOURCE, raw=ocr_data)
+
+    @classmethod
+    def from_omniparser(cls, ocr_data: list) -> "ScreenElements":
+        """From `[[id, type, text, interactive, x, y, w, h], ...]`, the same without
+        `interactive`, or the dicts written by `to_records`."""
+        ids, texts, types, interactive, bboxes = [], [], [], [], []
+        for item in ocr_data:
+            if isinstance(item, dict):
+                ids.append(str(item.get("id", len(ids))))
+                texts.append(str(item["text"]))
+                types.append(str(item.get("type", "text")))
+                interactive.append(bool(item.get("interactive", True)))
+                bboxes.append((item["x"], item["y"], item["width"], item["height"]))
+            elif len(item) >= 8:
+                ids.append(str(item[0]))
+                texts.append(str(item[2]))
+                types.append(str(item[1]))
+                interactive.append(item[3] in (True, "True", "true", 1))
+                bboxes.append(item[4:8])
+            elif len(item) == 7:
+                ids.append(str(item[0]))
+                texts.append(str(item[2]))
+                types.append(str(item[1]))
+                interactive.append(True)
+                bboxes.append(item[3:7])
+        return cls(texts, types, interactive, bboxes=bboxes, source=OMNIPARSER_SOURCE, raw=ocr_data, ids=ids)
+
+    @classmethod
+    def from_screen_data(cls, screen_data, is_ocr: bool) -> "ScreenElements":
+        """Detect the format of the screen data and convert it."""
+        if isinstance(screen_data, ScreenElements):
+            return screen_data
+        if not screen_data:
+            return cls([], [], [], source=EZ_OCR_SOURCE if is_ocr else A11Y_SOURCE, raw=screen_data)
+        if not is_ocr:
+            return cls.from_a11y(screen_data)
+        if isinstance(screen_data, dict):
+            return cls.from_ez_ocr(screen_data)
+        first = screen_data[0]
+        if not isinstance(first, dict) and len(first) == 5:
+            return cls.from_ez_ocr(screen_data)
+        return cls.from_omniparser(screen_data)
+
+    def find(self, command: str) -> Optional[Tuple[int, int, int, int]]:
+        """Return the (x, y, w, h) of the first element whose text matches the command."""
+        if not self.has_bboxes:
+            return None
+        for idx, norm_text in enumerate(self.norm_texts):
+            if levenshtein_similarity(norm_text, command):
+                return tuple(int(v) for v in self.bboxes[idx])
+        return None
+
+    def texts_of_type(self, element_type: str) -> List[str]:
+        """Return the texts of the elements of the type (case-insensitive)."""
+        mask = np.array([t.lower() == element_type.lower() for t in self.types], dtype=bool)
+        return self.texts[mask].tolist() if len(self) else []
+
+    def text_coords(self) -> List[Tuple[str, Tuple[int, int, int, int]]]:
+        """Return `(normalized text, (x, y, w, h))` for each element."""
+        return [(norm_text, tuple(int(v) for v in bbox))
+                for norm_text, bbox in zip(self.norm_texts, self.bboxes)]
+
+    def to_records(self) -> List[dict]:
+        """Return one JSON-serializable dict per element."""
+        return [{"id": element_id, "type": element_type, "text": text, "interactive": bool(interactive),
+                 "x": int(x), "y": int(y), "width": int(w), "height": int(h)}
+                for element_id, text, element_type, interactive, (x, y, w, h)
+                in zip(self.ids, self.texts, self.types, self.interactive, self.bboxes)]
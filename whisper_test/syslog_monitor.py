@@ -1,11 +1,23 @@
 from threading import Thread
+from collections import deque
 from queue import Queue
 from threading import Thread, Event
 from ssl import SSLError
+from time import time
 from pymobiledevice3.services.syslog import SyslogService
 
 
 DEFAULT_QUEUE_READ_TIMEOUT = 3
+N_RECENT_LINES = 1000  # matched lines kept for non-consuming lookups
+
+
+class SyslogLine(str):
+    """A syslog line that remembers when it was received on the host."""
+
+    def __new__(cls, line, received_at=None):
+        obj = super().__new__(cls, line)
+        obj.received_at = time() if received_at is None else received_at
+        return obj
 
 
 class SyslogMonitor:
@@ -14,6 +26,8 @@ class SyslogMonitor:
         self.lockdown = lockdown
         self.syslog_search_strings = syslog_search_strings
         self.stop_event = Event()
+        # copy of the recently matched lines, searching it does not consume the queue
+        self.recent_lines = deque(maxlen=N_RECENT_LINES)
         self.thread, self.queue = self.start()
 
     def start(self):
@@ -40,6 +54,13 @@ class SyslogMonitor:
         print("Syslog monitoring started. Thread alive:", self.thread.is_alive())
         return self.thread, self.queue
 
+    def find_recent(self, texts, since=0.0):
+        """Return the first recent line received after `since` that contains all texts."""
+        for line in list(self.recent_lines):
+            if line.received_at >= since and all(text in line for text in texts):
+                return line
+        return None
+
     def stop(self):
         if self.thread is not None and self.thread.is_alive():
             self.stop_event.set()
@@ -71,6 +92,8 @@ class SyslogMonitor:
                         continue
 
                     if queue_:
+                        line = SyslogLine(line)
+                        self.recent_lines.append(line)
                         queue_.put(line)
                     else:
                         print('syslog_live: ', line, flush=True)
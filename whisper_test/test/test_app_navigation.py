@@ -36,3 +36,27 @@ class TestApps:
         """Test app navigation using LLM-based method."""
         command = test_device.find_next_action_llm_based(screen_text_list, screen_number, screen_name, consent_mode, use_accessibility, use_ocr)
         assert command == expected_command, f"Expected command to be '{expected_command}', but got {command}"
+
+
+@pytest.mark.parametrize("screen_data, is_ocr, expected_phrases", [
+    (['“ntv” Would Like to Send You Notifications', 'Don’t Allow, Button', 'Allow, Button'],
+     False, ['tap, Don’t Allow', 'tap, Allow']),  # the title is longer than TTS_PREFETCH_MAX_CAPTION_LEN
+    ([["1", "Text", "We need your permission to use your data and provide", "39", "456", "1029", "48"],
+      ["20", "Text", "Accept", "701", "1431", "133", "55"],
+      ["21", "Text", "Accept", "917", "1435", "122", "46"]],
+     True, ['tap, Accept']),
+    (['Direct Interaction'], False, []),
+])
+def test_get_candidate_phrases(screen_data, is_ocr, expected_phrases):
+    """Test the phrases prefetched for the screen elements."""
+    from whisper_test.navigation import NavigationController
+    assert NavigationController.get_candidate_phrases(screen_data, is_ocr) == expected_phrases
+
+
+def test_candidate_caption_length_limit():
+    """Captions up to TTS_PREFETCH_MAX_CAPTION_LEN characters are prefetched, longer ones are not."""
+    from whisper_test.common import TTS_PREFETCH_MAX_CAPTION_LEN
+    from whisper_test.navigation import NavigationController
+    longest, too_long = "a" * TTS_PREFETCH_MAX_CAPTION_LEN, "b" * (TTS_PREFETCH_MAX_CAPTION_LEN + 1)
+    phrases = NavigationController.get_candidate_phrases([f"{longest}, Button", f"{too_long}, Button"], False)
+    assert phrases == [f"tap, {longest}"]
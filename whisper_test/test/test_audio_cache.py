@@ -0,0 +1,99 @@
+"""Tests for the TTS audio cache."""
+import unittest
+from os import makedirs
+from os.path import dirname, exists, join
+from tempfile import TemporaryDirectory
+
+from whisper_test.audio_cache import AudioCache, get_audio_cache
+
+
+def write_audio(path: str, size: int) -> None:
+    makedirs(dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(b'\0' * size)
+
+
+class TestAudioCache(unittest.TestCase):
+
+    def test_keys_do_not_collide(self):
+        keys = {AudioCache.make_key("gTTS", {}, text)
+                for text in ("Tap, 1, ", "Tap 1, ", "tap, 1, ", "Tap, 1")}
+        assert len(keys) == 4
+        assert AudioCache.make_key("gTTS", {}, "Tap") != AudioCache.make_key("piper", {}, "Tap")
+        assert AudioCache.make_key("gTTS", {"a": 1}, "Tap") != AudioCache.make_key("gTTS", {"a": 2}, "Tap")
+
+    def test_lookup_and_manifest(self):
+        with TemporaryDirectory() as root_dir:
+            cache = AudioCache(root_dir)
+            key = cache.make_key("gTTS", {}, "Tap, ")
+            assert cache.lookup(key) is None
+
+            path = cache.path_for("gTTS", key)
+            write_audio(path, 100)
+            cache.add(key, path, text="Tap, ", provider="gTTS", params={})
+            assert cache.lookup(key) == path
+            assert cache.stats()["hits"] == 1
+            assert cache.stats()["misses"] == 1
+
+            cache.save()
+            reloaded = AudioCache(root_dir)
+            assert reloaded.entries[key]["text"] == "Tap, "
+            assert reloaded.entries[key]["hits"] == 1
+            assert reloaded.entries[key]["duration"] is None  # not a wav file
+
+    def test_lru_eviction(self):
+        with TemporaryDirectory() as root_dir:
+            cache = AudioCache(root_dir, max_size_bytes=250)
+            paths = {}
+            for text in ("one", "two", "three"):
+                key = cache.make_key("gTTS", {}, text)
+                paths[text] = cache.path_for("gTTS", key)
+                write_audio(paths[text], 100)
+                cache.add(key, paths[text], text=text, provider="gTTS", params={})
+                if text == "two":
+                    # use "one" again so "two" becomes the least recently used
+                    assert cache.lookup(cache.make_key("gTTS", {}, "one"))
+
+            assert exists(paths["one"])
+            assert not exists(paths["two"])
+            assert exists(paths["three"])
+            assert cache.stats()["evictions"] == 1
+            assert cache.stats()["size_bytes"] == 200
+
+    def test_processes_sharing_the_manifest(self):
+        with TemporaryDirectory() as root_dir:
+            # two processes load the cache before either adds a phrase
+            cache_a, cache_b = AudioCache(root_dir), AudioCache(root_dir)
+            keys = {}
+            for cache, text in ((cache_a, "one"), (cache_b, "two")):
+                keys[text] = cache.make_key("gTTS", {}, text)
+                path = cache.path_for("gTTS", keys[text])
+                write_audio(path, 100)
+                cache.add(keys[text], path, text=text, provider="gTTS", params={})
+
+            assert set(AudioCache(root_dir).entries) == set(keys.values())
+            assert cache_b.lookup(keys["one"])  # seen when cache_b merged the manifest
+            assert cache_a.lookup(keys["one"])
+            cache_a.save()
+            cache_b.save()
+            assert AudioCache(root_dir).entries[keys["one"]]["hits"] == 2
+
+    def test_remove_legacy_files(self):
+        with TemporaryDirectory() as root_dir:
+            cache = AudioCache(root_dir)
+            key = cache.make_key("gTTS", {}, "Tap, Cancel, ")
+            keyed_path = cache.path_for("gTTS", key)
+            partial_path = join(root_dir, "gTTS", f"{key}.1234.part.wav")
+            legacy_paths = [join(root_dir, "gTTS", "tap_cancel.wav"),
+                            join(root_dir, "piper_en_US-ryan-high", "tap,_1.wav")]
+            for path in [keyed_path, partial_path] + legacy_paths:
+                write_audio(path, 10)
+            cache.add(key, keyed_path, text="Tap, Cancel, ", provider="gTTS", params={})
+
+            # opening the shared cache only reports the old files
+            assert get_audio_cache(root_dir).legacy_files() == sorted(legacy_paths)
+            assert all(exists(path) for path in legacy_paths)
+            assert cache.remove_legacy_files() == 2
+            assert exists(keyed_path) and exists(partial_path)
+            assert not any(exists(path) for path in legacy_paths)
+            assert cache.lookup(key) == keyed_path
@@ -0,0 +1,143 @@
+"""Tests for decoding audio for the playback engine."""
+import unittest
+import wave
+from os.path import join
+from tempfile import TemporaryDirectory
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import numpy as np
+
+from whisper_test.audio_player import (
+    AudioBuffer, AudioPlayer, concatenate_buffers, load_wav, save_wav, trim_silence)
+from whisper_test.common import TTS_PROVIDER_GTTS
+from whisper_test.exceptions import AudioStreamError
+from whisper_test.tts import TTSController
+
+
+class FakeOutputStream:
+    """sounddevice.OutputStream that is driven by calling its callback from the test."""
+
+    def __init__(self, samplerate, channels, dtype, callback):
+        self.samplerate = samplerate
+        self.channels = channels
+        self.callback = callback
+        self.latency = 0.0
+        self.started = self.closed = False
+
+    def start(self):
+        self.started = True
+
+    def stop(self):
+        self.started = False
+
+    def close(self):
+        self.closed = True
+
+
+class FailingOutputStream(FakeOutputStream):
+
+    def start(self):
+        raise OSError("Error querying device -1")
+
+
+def fake_sounddevice(output_stream=FakeOutputStream):
+    return SimpleNamespace(OutputStream=output_stream)
+
+
+class TestAudioPlayer(unittest.TestCase):
+
+    def test_load_wav(self):
+        with TemporaryDirectory() as tmp_dir:
+            wav_path = join(tmp_dir, "tap.wav")
+            samples = (np.arange(2205) % 100).astype(np.int16)
+            with wave.open(wav_path, 'wb') as wav_file:
+                wav_file.setnchannels(1)
+                wav_file.setsampwidth(2)
+                wav_file.setframerate(22050)
+                wav_file.writeframes(samples.tobytes())
+
+            buffer = load_wav(wav_path)
+            assert buffer.sample_rate == 22050
+            assert buffer.channels == 1
+            assert abs(buffer.duration - 0.1) < 1e-6
+            assert np.array_equal(buffer.pcm[:, 0], samples)
+
+    def test_concatenate_buffers(self):
+        first = AudioBuffer(np.ones(100, dtype=np.int16), 1000)
+        second = AudioBuffer(np.full(50, 2, dtype=np.int16), 1000)
+        combined = concatenate_buffers([first, second], gap_seconds=0.01)
+        assert len(combined.pcm) == 160
+        assert np.all(combined.pcm[100:110] == 0)
+        assert np.all(combined.pcm[110:] == 2)
+
+        with self.assertRaises(ValueError):
+            concatenate_buffers([first, AudioBuffer(np.ones(10, dtype=np.int16), 2000)])
+
+    def test_trim_silence(self):
+        pcm = np.zeros(1000, dtype=np.int16)
+        pcm[300:600] = 2000
+        trimmed = trim_silence(AudioBuffer(pcm, 1000), threshold=500, padding_seconds=0.01)
+        assert len(trimmed.pcm) == 320
+        assert np.all(trimmed.pcm[10:310] == 2000)
+
+        with TemporaryDirectory() as tmp_dir:
+            wav_path = join(tmp_dir, "trimmed.wav")
+            save_wav(trimmed, wav_path)
+            assert np.array_equal(load_wav(wav_path).pcm, trimmed.pcm)
+
+
+class TestAudioPlayerStream(unittest.TestCase):
+    """Playback through a fake output stream."""
+
+    def pull(self, stream, frames):
+        outdata = np.full((frames, stream.channels), -1, dtype=np.int16)
+        stream.callback(outdata, frames, None, None)
+        return outdata
+
+    def test_play_queues_audio_for_the_callback(self):
+        with patch("whisper_test.audio_player.sounddevice", fake_sounddevice()):
+            player = AudioPlayer()
+            first = AudioBuffer(np.full(150, 1, dtype=np.int16), 1000)
+            second = AudioBuffer(np.full(30, 2, dtype=np.int16), 1000)
+            first_done, second_done = player.play(first), player.play(second)
+            stream = player._stream
+            assert stream.started and stream.samplerate == 1000
+
+            outdata = self.pull(stream, 100)
+            assert np.all(outdata == 1)
+            assert not first_done.done()
+            # the callback moves on to the queued buffer and pads the rest with silence
+            outdata = self.pull(stream, 100)
+            assert np.all(outdata[:50] == 1) and np.all(outdata[50:80] == 2) and np.all(outdata[80:] == 0)
+            assert first_done.result(timeout=1) <= second_done.result(timeout=1)
+            assert np.all(self.pull(stream, 10) == 0)
+
+            # the open stream is reused for audio of the same format
+            player.play(AudioBuffer(np.ones(10, dtype=np.int16), 1000))
+            assert player._stream is stream
+            player.close()
+            assert stream.closed and player._stream is None
+
+    def test_play_raises_if_stream_cannot_be_opened(self):
+        with patch("whisper_test.audio_player.sounddevice", fake_sounddevice(FailingOutputStream)):
+            player = AudioPlayer()
+            with self.assertRaises(AudioStreamError):
+                player.play(AudioBuffer(np.ones(10, dtype=np.int16), 1000))
+            assert player._stream is None
+
+    def test_tts_falls_back_to_playsound(self):
+        with TemporaryDirectory() as tmp_dir, \
+                patch("whisper_test.audio_player.sounddevice", fake_sounddevice(FailingOutputStream)), \
+                patch("whisper_test.tts.playsound") as playsound:
+            wav_path = join(tmp_dir, "tap.wav")
+            save_wav(AudioBuffer(np.ones(100, dtype=np.int16), 1000), wav_path)
+            tts = TTSController(tts_provider=TTS_PROVIDER_GTTS, tts_audio_root_dir=tmp_dir)
+            tts.audio_player = AudioPlayer()
+
+            assert tts.play_audio(wav_path, "Tap")
+            playsound.assert_called_once_with(wav_path)
+            # the player is disabled after the stream failed
+            assert tts.audio_player is None
+            assert tts.play_audio(wav_path, "Tap")
+            assert playsound.call_count == 2
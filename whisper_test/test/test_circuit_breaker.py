@@ -0,0 +1,43 @@
+"""Tests for the circuit breaker and the step deadline."""
+from time import sleep
+
+from whisper_test.circuit_breaker import CircuitBreaker, CLOSED, OPEN, HALF_OPEN
+from whisper_test.deadline import deadline, get_deadline, remaining_time
+
+
+def test_opens_after_consecutive_failures():
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=60)
+    breaker.record_failure()
+    breaker.record_success()  # not consecutive
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert not breaker.is_available()
+    assert not breaker.allow_request()
+    assert breaker.rejected == 1
+
+
+def test_half_open_lets_one_probe_through():
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    sleep(0.06)
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow_request()
+    assert not breaker.allow_request()  # the probe is in flight
+    breaker.record_failure()  # the probe failed: open again
+    assert breaker.state == OPEN
+    sleep(0.06)
+    assert breaker.allow_request()
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert breaker.allow_request()
+
+
+def test_deadline_scope():
+    assert get_deadline() is None and remaining_time() is None
+    with deadline(10):
+        assert 9 < remaining_time() <= 10
+        with deadline(0):  # no deadline
+            assert remaining_time() is None
+    assert remaining_time() is None
@@ -33,3 +33,19 @@ class TestWhisperDevice:
             ocr_results = dev.get_screen_content_by_ocr(png_path, ocr_service="ez_ocr")
             assert ocr_results is not None, "OCR results are None"
             assert len(ocr_results) > 0, "OCR results are empty"
+
+
+def test_ez_ocr_reader_is_reused():
+    """The easyocr models are loaded once per process."""
+    from whisper_test.ocr_engine import get_ez_ocr_reader
+    assert get_ez_ocr_reader() is get_ez_ocr_reader()
+
+
+def test_ocr_images_batched():
+    """Batched OCR returns one result list per image, empty for unreadable images."""
+    import numpy as np
+    from whisper_test.ocr_utils import ocr_images_batched
+    blank = np.full((64, 64, 3), 255, dtype=np.uint8)
+    results = ocr_images_batched([blank, blank, "missing.png"])
+    assert len(results) == 3
+    assert results[2] == []
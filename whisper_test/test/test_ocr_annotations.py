@@ -0,0 +1,37 @@
+"""Tests for the OCR result log and the annotation renderer."""
+import unittest
+from os.path import exists, join
+from tempfile import TemporaryDirectory
+
+import cv2
+import numpy as np
+
+from whisper_test.ocr_annotations import OcrResultLog, load_ocr_results, render_annotations
+
+
+class TestOcrAnnotations(unittest.TestCase):
+
+    def test_results_are_written_in_batches(self):
+        with TemporaryDirectory() as tmp_dir:
+            log_path = join(tmp_dir, "ocr_results.jsonl")
+            result_log = OcrResultLog(log_path, flush_every=2)
+            result_log.add("a.png", "ez_ocr", [("Continue", 1, 2, 3, 4)])
+            assert not exists(log_path)
+            result_log.add("b.png", "omniparser", [["0", "text", "OK", True, 1, 2, 3, 4]])
+            result_log.add("a.png", "ez_ocr", [("Accept", 5, 6, 7, 8)])
+            assert set(load_ocr_results(log_path)) == {"a.png", "b.png"}
+            result_log.flush()
+            # the last results of a screenshot win
+            assert load_ocr_results(log_path)["a.png"]["results"] == [["Accept", 5, 6, 7, 8]]
+
+    def test_render_annotations(self):
+        with TemporaryDirectory() as tmp_dir:
+            img_path = join(tmp_dir, "screen.png")
+            cv2.imwrite(img_path, np.zeros((100, 100, 3), dtype=np.uint8))
+            out_path = render_annotations(img_path, [["Continue", 10, 10, 50, 20]])
+            assert out_path == join(tmp_dir, "screen-out.png")
+            assert cv2.imread(out_path)[10, 30].tolist() == [0, 255, 0]
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+"""Tests for the OCR result cache."""
+import unittest
+from os.path import join
+from tempfile import TemporaryDirectory
+
+import numpy as np
+
+from whisper_test.ocr_cache import OcrCache
+
+
+def write_image(path: str, content: bytes) -> str:
+    with open(path, 'wb') as f:
+        f.write(content)
+    return path
+
+
+class TestOcrCache(unittest.TestCase):
+
+    def test_keys(self):
+        with TemporaryDirectory() as tmp_dir:
+            img1 = write_image(join(tmp_dir, "1.png"), b"screen 1")
+            img1_copy = write_image(join(tmp_dir, "1_copy.png"), b"screen 1")
+            img2 = write_image(join(tmp_dir, "2.png"), b"screen 2")
+            key = OcrCache.make_key(img1, "ez_ocr", "1")
+            assert OcrCache.make_key(img1_copy, "ez_ocr", "1") == key
+            assert OcrCache.make_key(img2, "ez_ocr", "1") != key
+            assert OcrCache.make_key(img1, "omniparser", "1") != key
+            assert OcrCache.make_key(img1, "ez_ocr", "2") != key
+
+    def test_get_or_compute(self):
+        with TemporaryDirectory() as tmp_dir:
+            db_path = join(tmp_dir, "ocr_cache.sqlite")
+            img = write_image(join(tmp_dir, "1.png"), b"screen 1")
+            calls = []
+
+            def ocr():
+                calls.append(img)
+                return [("Continue", np.int32(10), np.int32(20), 30, 40)]
+
+            cache = OcrCache(db_path, max_memory_entries=1)
+            assert cache.get_or_compute(img, "ez_ocr", "1", ocr) == [["Continue", 10, 20, 30, 40]]
+            assert cache.get_or_compute(img, "ez_ocr", "1", ocr) == [["Continue", 10, 20, 30, 40]]
+            assert len(calls) == 1
+            # failed OCR calls are not cached
+            assert cache.get_or_compute(img, "omniparser", "1", lambda: None) is None
+            assert cache.stats()["misses"] == 2
+            cache.close()
+
+            reloaded = OcrCache(db_path)
+            assert reloaded.get_or_compute(img, "ez_ocr", "1", ocr) == [["Continue", 10, 20, 30, 40]]
+            assert len(calls) == 1
+            stats = reloaded.stats()
+            assert stats["disk_hits"] == 1 and stats["hit_rate"] == 1.0 and stats["n_stored"] == 1
+            reloaded.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+"""Tests for the tile-diff delta OCR."""
+import unittest
+from os.path import join
+from tempfile import TemporaryDirectory
+
+import cv2
+import numpy as np
+
+from whisper_test.ocr_delta import DeltaOcr, changed_regions, changed_tiles
+
+
+class TestDeltaOcr(unittest.TestCase):
+
+    def test_changed_regions(self):
+        img = np.zeros((256, 256, 3), dtype=np.uint8)
+        changed = img.copy()
+        changed[70:90, 70:90] = 255
+        tiles = changed_tiles(changed, img, tile_size=32)
+        assert tiles.shape == (8, 8)
+        assert tiles.sum() == 1 and tiles[2, 2]
+        assert changed_regions(tiles, 32, 8, 256, 256) == [(56, 56, 48, 48)]
+        # grown to the previous text box it touches
+        assert changed_regions(tiles, 32, 8, 256, 256, prev_boxes=[(0, 90, 200, 20)]) == [(0, 56, 200, 54)]
+
+    def test_only_changed_regions_are_ocred(self):
+        with TemporaryDirectory() as tmp_dir:
+            img = np.zeros((256, 256, 3), dtype=np.uint8)
+            before, after = join(tmp_dir, "before.png"), join(tmp_dir, "after.png")
+            cv2.imwrite(before, img)
+            img[200:220, 150:200] = 255
+            cv2.imwrite(after, img)
+            crops = []
+
+            def crop_ocr(_, boxes):
+                crops.extend(boxes)
+                return [[("Allow", 150, 200, 50, 20)]]
+
+            delta_ocr = DeltaOcr(lambda _: [("Title", 10, 10, 100, 20), ("Button", 140, 205, 20, 10)],
+                                 crop_ocr, tile_size=32, padding=8)
+            assert delta_ocr.ocr(before) == [("Title", 10, 10, 100, 20), ("Button", 140, 205, 20, 10)]
+            # the box overlapping the change is re-read, the other one is kept
+            assert delta_ocr.ocr(after) == [("Title", 10, 10, 100, 20), ("Allow", 150, 200, 50, 20)]
+            assert len(crops) == 1 and crops[0][1] < 200 and crops[0][0] <= 140
+            # nothing changed
+            assert delta_ocr.ocr(after) == [("Title", 10, 10, 100, 20), ("Allow", 150, 200, 50, 20)]
+            assert len(crops) == 1
+            assert delta_ocr.n_full == 1 and delta_ocr.n_delta == 2
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+"""Tests for the int8 ONNX OCR engine (requires torch and onnxruntime)."""
+import os
+from os.path import join
+from tempfile import TemporaryDirectory
+
+import numpy as np
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("onnxruntime")
+
+from whisper_test.ocr_onnx import (  # noqa: E402
+    OnnxModule, _downscale, calibration_screenshots, make_onnx_session, onnx_threads)
+
+
+def test_onnx_module_runs_in_place_of_torch_module():
+    model = torch.nn.Sequential(torch.nn.Conv2d(3, 4, 3, padding=1), torch.nn.ReLU()).eval()
+    with TemporaryDirectory() as tmp_dir:
+        model_path = join(tmp_dir, "model.onnx")
+        torch.onnx.export(model, (torch.zeros(1, 3, 32, 32),), model_path, input_names=["image"],
+                          dynamic_axes={"image": {0: "batch", 2: "height", 3: "width"}})
+        recorded = []
+        module = OnnxModule(make_onnx_session(model_path, threads=1), recorded)
+        x = torch.randn(2, 3, 40, 24)
+        # the recognizer is called with an extra text tensor
+        out = module(x, torch.zeros(2, 5))
+        with torch.no_grad():
+            assert torch.allclose(out, model(x), atol=1e-5)
+        assert len(recorded) == 1 and recorded[0].shape == (2, 3, 40, 24)
+
+
+def test_threads_are_shared_by_the_workers():
+    assert onnx_threads(threads=3, n_workers=4) == 3
+    assert onnx_threads(threads=0, n_workers=0) == (os.cpu_count() or 1)
+    assert onnx_threads(threads=0, n_workers=10 * (os.cpu_count() or 1)) == 1
+
+
+def test_calibration_inputs_are_downscaled():
+    image = np.random.rand(1, 3, 2560, 1184).astype(np.float32)
+    small = _downscale(image, max_side=640)
+    assert small.shape[:2] == (1, 3) and max(small.shape[2:]) <= 640
+    assert small.shape[2] % 32 == 0 and small.shape[3] % 32 == 0
+    assert _downscale(small, max_side=640) is small
+
+
+def test_calibration_screenshots_skip_annotated_images():
+    with TemporaryDirectory() as tmp_dir:
+        for idx in range(10):
+            open(join(tmp_dir, f"screen_{idx}.png"), 'wb').close()
+        open(join(tmp_dir, "screen_0-out.png"), 'wb').close()
+        img_paths = calibration_screenshots(tmp_dir, max_images=4)
+        assert len(img_paths) == 4
+        assert not any(p.endswith("-out.png") for p in img_paths)
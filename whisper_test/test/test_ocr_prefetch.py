@@ -0,0 +1,55 @@
+"""Tests for the speculative OCR of screenshots."""
+import unittest
+from os.path import join
+from tempfile import TemporaryDirectory
+from threading import Event
+
+from whisper_test.ocr_prefetch import OcrPrefetcher
+
+
+def write_image(path: str, content: bytes) -> str:
+    with open(path, 'wb') as f:
+        f.write(content)
+    return path
+
+
+class TestOcrPrefetcher(unittest.TestCase):
+
+    def test_same_frame_waits_for_prefetch(self):
+        with TemporaryDirectory() as tmp_dir:
+            img = write_image(join(tmp_dir, "1.png"), b"screen 1")
+            # the same screen, taken again
+            img_again = write_image(join(tmp_dir, "2.png"), b"screen 1")
+            other_img = write_image(join(tmp_dir, "3.png"), b"screen 2")
+            calls = []
+            release = Event()
+
+            def ocr(img_path):
+                calls.append(img_path)
+                release.wait(5)
+                return [("Continue", 1, 2, 3, 4)]
+
+            prefetcher = OcrPrefetcher(n_workers=2)
+            future = prefetcher.submit(img, "ez_ocr", ocr)
+            assert prefetcher.submit(img_again, "ez_ocr", ocr) is future
+            release.set()
+            assert prefetcher.result(img_again, "ez_ocr", ocr) == [("Continue", 1, 2, 3, 4)]
+            assert calls == [img]
+            # other frames and other backends are OCRed
+            prefetcher.result(other_img, "ez_ocr", ocr)
+            prefetcher.result(img, "omniparser", ocr)
+            assert calls == [img, other_img, img]
+            prefetcher.close()
+
+    def test_failed_prefetch_is_retried(self):
+        with TemporaryDirectory() as tmp_dir:
+            img = write_image(join(tmp_dir, "1.png"), b"screen 1")
+            prefetcher = OcrPrefetcher(n_workers=1)
+            prefetcher.submit(img, "omniparser", lambda _: None).result()
+            assert prefetcher.result(img, "omniparser", lambda _: ["element"]) == ["element"]
+            assert prefetcher.submit(join(tmp_dir, "missing.png"), "omniparser", lambda _: None) is None
+            prefetcher.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+"""Tests for the latency-aware OCR backend router."""
+import unittest
+from threading import Event
+from time import time
+
+from whisper_test.deadline import deadline, remaining_time
+from whisper_test.ocr_router import OcrRouter
+
+RESULTS = [["0", "text", "Continue", True, 1, 2, 3, 4]]
+
+
+class TestOcrRouter(unittest.TestCase):
+
+    def test_fails_over_and_reports_backend(self):
+        def broken(img_path):
+            raise ConnectionError("service down")
+
+        router = OcrRouter({"omniparser": broken, "ez_ocr": lambda img_path: RESULTS})
+        assert router.ocr("1.png", preferred="omniparser") == (RESULTS, "ez_ocr")
+        # a backend that returns nothing also fails over
+        router = OcrRouter({"omniparser": lambda img_path: None, "ez_ocr": lambda img_path: RESULTS})
+        assert router.ocr("1.png", preferred="omniparser") == (RESULTS, "ez_ocr")
+        report = router.report()
+        assert report["omniparser"]["error_rate"] == 1.0
+        assert report["ez_ocr"]["served"] == 1
+
+    def test_unhealthy_backend_is_skipped(self):
+        calls = []
+
+        def broken(img_path):
+            calls.append(img_path)
+            return None
+
+        router = OcrRouter({"omniparser": broken, "ez_ocr": lambda img_path: RESULTS}, retry_after=60)
+        router.ocr("1.png", preferred="omniparser")
+        assert router.ranked_backends(preferred="omniparser") == ["ez_ocr", "omniparser"]
+        router.ocr("2.png", preferred="omniparser")
+        assert calls == ["1.png"]
+
+    def test_slow_backend_fails_over_within_budget(self):
+        release = Event()
+
+        def slow(img_path):
+            release.wait(5)
+            return RESULTS
+
+        router = OcrRouter({"omniparser": slow, "ez_ocr": lambda img_path: RESULTS}, latency_budget=0.1)
+        try:
+            assert router.ocr("1.png", preferred="omniparser") == (RESULTS, "ez_ocr")
+        finally:
+            release.set()
+            router.close()
+
+    def test_step_deadline_bounds_the_last_backend(self):
+        release = Event()
+        seen_deadlines = []
+
+        def slow(img_path):
+            seen_deadlines.append(remaining_time())
+            release.wait(5)
+            return RESULTS
+
+        router = OcrRouter({"omniparser": slow, "ez_ocr": slow}, latency_budget=10)
+        try:
+            t0 = time()
+            with deadline(0.2):
+                assert router.ocr("1.png", preferred="omniparser") == (None, None)
+            assert time() - t0 < 1
+            # the backends saw the deadline of the step
+            assert seen_deadlines and all(d is not None and d <= 0.2 for d in seen_deadlines)
+        finally:
+            release.set()
+            router.close()
+
+    def test_fastest_backend_first(self):
+        router = OcrRouter({"omniparser": lambda img_path: RESULTS, "ez_ocr": lambda img_path: RESULTS},
+                           latency_budget=1.0)
+        router.stats["omniparser"].record(0.8, True)
+        router.stats["ez_ocr"].record(0.2, True)
+        assert router.ranked_backends(preferred="omniparser") == ["ez_ocr", "omniparser"]
+        # easyocr slows down: omniparser is now the fastest backend
+        router.stats["ez_ocr"].record(2.0, True)
+        router.stats["ez_ocr"].record(2.0, True)
+        assert router.ranked_backends() == ["omniparser", "ez_ocr"]
+        assert router.ranked_backends(latency_budget=5.0) == ["omniparser", "ez_ocr"]
+
+    def test_unmeasured_backend_after_preferred(self):
+        backends = {name: lambda img_path: RESULTS for name in ("omniparser", "ez_ocr", "vision")}
+        router = OcrRouter(backends, latency_budget=5.0)
+        assert router.ranked_backends(preferred="ez_ocr")[0] == "ez_ocr"
+        router.stats["omniparser"].record(0.5, True)
+        router.stats["ez_ocr"].record(2.0, True)
+        # vision is not measured: after the preferred backend, before the slower measured one
+        assert router.ranked_backends(preferred="omniparser") == ["omniparser", "vision", "ez_ocr"]
+        assert router.ranked_backends(preferred="ez_ocr") == ["omniparser", "ez_ocr", "vision"]
+        assert router.ranked_backends()[0] == "vision"
+
+    def test_all_backends_fail(self):
+        router = OcrRouter({"omniparser": lambda img_path: None, "ez_ocr": lambda img_path: None})
+        assert router.ocr("1.png") == (None, None)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,266 @@
+"""Tests for the Omniparser HTTP client, against a local server."""
+import json
+import re
+import threading
+import unittest
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from os.path import basename, join
+from tempfile import TemporaryDirectory
+from time import sleep, time
+
+import cv2
+import numpy as np
+
+from whisper_test.circuit_breaker import CircuitBreaker, CLOSED, OPEN
+from whisper_test.deadline import deadline
+from whisper_test.omniparser_client import OmniparserClient, encode_screenshot, rescale_structured_results
+
+
+class FlakyOmniparserHandler(BaseHTTPRequestHandler):
+    """Fails the first request with 503, then returns one screen element."""
+    n_requests = 0
+    last_body = b''
+
+    def do_POST(self):
+        FlakyOmniparserHandler.last_body = self.rfile.read(int(self.headers['Content-Length']))
+        FlakyOmniparserHandler.n_requests += 1
+        if FlakyOmniparserHandler.n_requests == 1:
+            self.send_response(503)
+            self.end_headers()
+            return
+        body = json.dumps({"structured_results": [["0", "text", "OK", True, 1, 2, 3, 4]]}).encode()
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class HangingOmniparserHandler(BaseHTTPRequestHandler):
+    """Answers after two seconds, like an overloaded service."""
+    n_requests = 0
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers['Content-Length']))
+        HangingOmniparserHandler.n_requests += 1
+        sleep(2)
+        self.send_response(500)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+class TestOmniparserClient(unittest.TestCase):
+
+    def setUp(self):
+        FlakyOmniparserHandler.n_requests = 0
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), FlakyOmniparserHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.client = OmniparserClient(f"http://127.0.0.1:{self.server.server_port}/process")
+        self.tmp_dir = TemporaryDirectory()
+        self.img_path = join(self.tmp_dir.name, "screen.png")
+        # 100 x 200 portrait screenshot
+        cv2.imwrite(self.img_path, np.full((200, 100, 3), 255, dtype=np.uint8))
+
+    def tearDown(self):
+        self.client.close()
+        self.server.shutdown()
+        self.tmp_dir.cleanup()
+
+    def test_retry_on_unavailable(self):
+        assert self.client.process(self.img_path) == [["0", "text", "OK", True, 1, 2, 3, 4]]
+        assert FlakyOmniparserHandler.n_requests == 2
+
+    def test_concurrent_requests(self):
+        futures = [self.client.submit(self.img_path) for _ in range(4)]
+        results = [future.result(timeout=10) for future in futures]
+        assert all(result is not None for result in results)  # the 503 is retried
+
+    def test_unreachable_server(self):
+        client = OmniparserClient("http://127.0.0.1:1/process", max_retries=0)
+        assert client.process(self.img_path) is None
+
+    def test_breaker_fails_fast_then_probes(self):
+        breaker = CircuitBreaker("Omniparser", failure_threshold=2, reset_timeout=0.2)
+        client = OmniparserClient("http://127.0.0.1:1/process", max_retries=0, breaker=breaker)
+        try:
+            assert client.process(self.img_path) is None
+            assert client.process(self.img_path) is None
+            assert breaker.state == OPEN
+            assert client.process(self.img_path) is None
+            assert breaker.rejected == 1
+            # the service is back: the probe after the reset timeout closes the breaker
+            sleep(0.25)
+            client.api_url = f"http://127.0.0.1:{self.server.server_port}/process"
+            FlakyOmniparserHandler.n_requests = 1  # skip the 503
+            assert client.process(self.img_path) is not None
+            assert breaker.state == CLOSED
+        finally:
+            client.close()
+
+    def test_step_deadline_cuts_requests_short(self):
+        server = ThreadingHTTPServer(('127.0.0.1', 0), HangingOmniparserHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        client = OmniparserClient(f"http://127.0.0.1:{server.server_port}/process", max_retries=0)
+        try:
+            t0 = time()
+            with deadline(0.3):
+                assert client.submit(self.img_path).result() is None
+            assert time() - t0 < 1.5
+            with deadline(0.01):
+                sleep(0.02)
+                assert client.process(self.img_path) is None  # not sent at all
+        finally:
+            client.close()
+            server.shutdown()
+
+    def test_read_timeout_is_not_retried(self):
+        HangingOmniparserHandler.n_requests = 0
+        server = ThreadingHTTPServer(('127.0.0.1', 0), HangingOmniparserHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        client = OmniparserClient(f"http://127.0.0.1:{server.server_port}/process",
+                                  read_timeout=0.3, max_retries=2)
+        try:
+            t0 = time()
+            assert client.process(self.img_path) is None
+            assert time() - t0 < 1.5
+            assert HangingOmniparserHandler.n_requests == 1
+            assert client.breaker.failures == 1
+        finally:
+            client.close()
+            server.shutdown()
+
+    def test_downscaled_upload_is_rescaled(self):
+        client = OmniparserClient(f"http://127.0.0.1:{self.server.server_port}/process",
+                                  upload_format="jpeg", upload_max_dim=50)
+        try:
+            # the server saw a 25 x 50 JPEG; the box is scaled back by 4
+            assert client.process(self.img_path) == [["0", "text", "OK", True, 4, 8, 12, 16]]
+            assert b"image/jpeg" in FlakyOmniparserHandler.last_body
+        finally:
+            client.close()
+
+    def test_unreadable_screenshot(self):
+        with open(self.img_path, 'wb') as f:
+            f.write(b'png')
+        assert self.client.process(self.img_path) is None
+        assert FlakyOmniparserHandler.n_requests == 0
+
+
+class TestUploadEncoding(unittest.TestCase):
+
+    def test_png_without_max_dim_is_sent_unchanged(self):
+        with TemporaryDirectory() as tmp_dir:
+            img_path = join(tmp_dir, "screen.png")
+            cv2.imwrite(img_path, np.zeros((40, 20, 3), dtype=np.uint8))
+            with open(img_path, 'rb') as f:
+                assert encode_screenshot(img_path, "png", 0) == (f.read(), "image/png", 1.0, 1.0)
+            image_bytes, mime_type, scale_x, scale_y = encode_screenshot(img_path, "webp", 20, 80)
+            assert mime_type == "image/webp" and (scale_x, scale_y) == (2.0, 2.0)
+            assert cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_COLOR).shape == (20, 10, 3)
+
+    def test_rescale_all_result_formats(self):
+        results = [["0", "text", "OK", True, 10, 20, 30, 40],
+                   ["1", "icon", "Close", 10, 20, 30, 40],
+                   {"id": "2", "text": "Next", "x": 10, "y": 20, "width": 30, "height": 40}]
+        assert rescale_structured_results(results, 2.0, 0.5) == [
+            ["0", "text", "OK", True, 20, 10, 60, 20],
+            ["1", "icon", "Close", 20, 10, 60, 20],
+            {"id": "2", "text": "Next", "x": 20, "y": 10, "width": 60, "height": 20}]
+        assert rescale_structured_results(None, 2.0, 2.0) is None
+
+    def test_rescale_string_coordinates(self):
+        # as in the fixtures captured from the service
+        results = [["20", "Text", "Accept", "701", "1431", "133", "55"],
+                   ["21", "text", "Decline", "True", "10.5", "20", "30", "40"]]
+        assert rescale_structured_results(results, 2.0, 0.5) == [
+            ["20", "Text", "Accept", 1402, 716, 266, 28],
+            ["21", "text", "Decline", "True", 21, 10, 60, 20]]
+
+
+class BatchOmniparserHandler(BaseHTTPRequestHandler):
+    """Answers /process_batch with one element per uploaded image; 404 if batches are disabled."""
+    batch_sizes = []
+    single_requests = 0
+    batches_enabled = True
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        if self.path.endswith("/process_batch"):
+            if not BatchOmniparserHandler.batches_enabled:
+                self.send_response(404)
+                self.end_headers()
+                return
+            # the text of each element is the file name of its image
+            names = re.findall(rb'name="images"; filename="([^"]+)"', body)
+            BatchOmniparserHandler.batch_sizes.append(len(names))
+            response = {"results": [{"structured_results": [["0", "text", name.decode(), True, 1, 2, 3, 4]]}
+                                    for name in names]}
+        else:
+            BatchOmniparserHandler.single_requests += 1
+            response = {"structured_results": [["0", "text", "OK", True, 1, 2, 3, 4]]}
+        body = json.dumps(response).encode()
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestOmniparserBatches(unittest.TestCase):
+
+    def setUp(self):
+        BatchOmniparserHandler.batch_sizes = []
+        BatchOmniparserHandler.single_requests = 0
+        BatchOmniparserHandler.batches_enabled = True
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), BatchOmniparserHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_port}/process"
+        self.tmp_dir = TemporaryDirectory()
+        self.img_paths = []
+        for idx in range(5):
+            img_path = join(self.tmp_dir.name, f"screen_{idx}.png")
+            cv2.imwrite(img_path, np.full((40, 20, 3), idx, dtype=np.uint8))
+            self.img_paths.append(img_path)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.tmp_dir.cleanup()
+
+    def test_process_batch(self):
+        client = OmniparserClient(self.url, batch_size=2)
+        try:
+            results = client.process_batch(self.img_paths)
+        finally:
+            client.close()
+        assert len(results) == 5 and all(result is not None for result in results)
+        # chunks of 2 and a single screenshot sent on its own
+        assert BatchOmniparserHandler.batch_sizes == [2, 2]
+        assert BatchOmniparserHandler.single_requests == 1
+
+    def test_concurrent_requests_are_micro_batched(self):
+        client = OmniparserClient(self.url, batch_size=8, batch_window=0.5)
+        try:
+            futures = [client.submit(img_path) for img_path in self.img_paths[:4]]
+            results = [future.result(timeout=10) for future in futures]
+        finally:
+            client.close()
+        # the results of the batch go back to the right requests
+        assert [result[0][2] for result in results] == [basename(p) for p in self.img_paths[:4]]
+        assert BatchOmniparserHandler.batch_sizes == [4]
+
+    def test_server_without_batch_endpoint(self):
+        BatchOmniparserHandler.batches_enabled = False
+        client = OmniparserClient(self.url, batch_size=8)
+        try:
+            results = client.process_batch(self.img_paths[:3])
+            assert all(result is not None for result in results)
+            assert not client.batch_supported
+            assert BatchOmniparserHandler.single_requests == 3
+        finally:
+            client.close()
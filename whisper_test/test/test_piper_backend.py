@@ -0,0 +1,30 @@
+"""Tests for the persistent piper process."""
+import unittest
+from os.path import exists
+from unittest.mock import patch
+
+from whisper_test.exceptions import PiperProcessError
+from whisper_test.piper_backend import PiperProcess
+
+
+class TestPiperProcess(unittest.TestCase):
+
+    def test_missing_binary_raises_piper_process_error(self):
+        # the TTS controller falls back to spawning piper on PiperProcessError
+        piper_process = PiperProcess("en_US-ryan-high.onnx")
+        with patch("whisper_test.piper_backend.PIPER_BINARY", "no-such-piper-binary"):
+            with self.assertRaises(PiperProcessError):
+                piper_process.synthesize("Tap", "tap.wav")
+        assert not piper_process.is_alive()
+        piper_process.close()
+
+    def test_close_removes_output_dir(self):
+        piper_process = PiperProcess("en_US-ryan-high.onnx")
+        with patch("whisper_test.piper_backend.PIPER_BINARY", "no-such-piper-binary"):
+            with self.assertRaises(PiperProcessError):
+                piper_process.start()
+        output_dir = piper_process._output_dir
+        assert exists(output_dir)
+        piper_process.close()
+        assert not exists(output_dir)
+        assert piper_process._output_dir is None
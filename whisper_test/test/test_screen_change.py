@@ -0,0 +1,106 @@
+"""Tests for the pixel-level screen change detector."""
+import unittest
+from os.path import join
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+
+import cv2
+import numpy as np
+
+from whisper_test.ocr_prefetch import OcrPrefetcher
+from whisper_test.ocr_utils import has_screen_changed, prefetch_ocr
+from whisper_test.screen_change import compare_screenshots, UNCHANGED, CHANGED, AMBIGUOUS
+
+WIDTH, HEIGHT = 400, 800
+
+
+def make_screen(color=(240, 240, 240)) -> np.ndarray:
+    img = np.full((HEIGHT, WIDTH, 3), color, dtype=np.uint8)
+    cv2.putText(img, "Settings", (20, 120), cv2.FONT_HERSHEY_SIMPLEX, 1.2, (0, 0, 0), 2)
+    cv2.putText(img, "Notifications", (20, 220), cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 0, 0), 2)
+    return img
+
+
+class TestScreenChange(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = TemporaryDirectory()
+        self.before = self.write("before.png", make_screen())
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def write(self, name: str, img: np.ndarray) -> str:
+        path = join(self.tmp_dir.name, name)
+        cv2.imwrite(path, img)
+        return path
+
+    def test_identical_and_status_bar_changes_are_unchanged(self):
+        assert compare_screenshots(self.before, self.write("same.png", make_screen())).verdict == UNCHANGED
+        img = make_screen()
+        cv2.putText(img, "9:41", (170, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 0), 2)  # the clock
+        assert compare_screenshots(self.before, self.write("clock.png", img)).verdict == UNCHANGED
+
+    def test_small_change_is_ambiguous_with_its_region(self):
+        img = make_screen()
+        cv2.rectangle(img, (300, 190), (370, 230), (0, 200, 0), -1)  # a toggled switch
+        diff = compare_screenshots(self.before, self.write("toggle.png", img))
+        assert diff.verdict == AMBIGUOUS
+        assert len(diff.regions) == 1
+        x, y, w, h = diff.regions[0]
+        assert x <= 300 and y <= 190 and x + w >= 370 and y + h >= 230
+
+    def test_new_screen_is_changed(self):
+        img = np.full((HEIGHT, WIDTH, 3), 30, dtype=np.uint8)
+        assert compare_screenshots(self.before, self.write("dark.png", img)).verdict == CHANGED
+        rotated = self.write("rotated.png", cv2.rotate(make_screen(), cv2.ROTATE_90_CLOCKWISE))
+        assert compare_screenshots(self.before, rotated).verdict == CHANGED
+
+    def test_ocr_only_for_ambiguous_changes(self):
+        dark = self.write("dark.png", np.full((HEIGHT, WIDTH, 3), 30, dtype=np.uint8))
+        img = make_screen()
+        cv2.rectangle(img, (300, 190), (370, 230), (0, 200, 0), -1)
+        toggle = self.write("toggle.png", img)
+        with patch("whisper_test.ocr_utils.get_omniparser_client") as get_client, \
+                patch("whisper_test.ocr_utils.get_ocr_prefetcher", return_value=OcrPrefetcher()), \
+                patch("whisper_test.ocr_utils.get_ocr_result_log"):
+            client = get_client.return_value
+            client.breaker.is_available.return_value = True
+            client.process.return_value = [["0", "text", "Settings", True, 20, 90, 150, 40]]
+            assert not has_screen_changed(self.before, self.write("same.png", make_screen()))
+            assert has_screen_changed(self.before, dark)
+            assert client.process.call_count == 0
+            # same text: the toggle did not change the screen
+            assert not has_screen_changed(self.before, toggle)
+            assert client.process.call_count == 2
+
+    def test_ambiguous_change_without_ocr_is_a_change(self):
+        img = make_screen()
+        cv2.rectangle(img, (300, 190), (370, 230), (0, 200, 0), -1)
+        toggle = self.write("toggle.png", img)
+        with patch("whisper_test.ocr_utils.get_omniparser_client") as get_client, \
+                patch("whisper_test.ocr_utils.get_ocr_prefetcher", return_value=OcrPrefetcher()), \
+                patch("whisper_test.ocr_utils.get_ocr_result_log"):
+            client = get_client.return_value
+            client.breaker.is_available.return_value = True
+            client.process.return_value = None  # e.g. the step deadline has passed
+            assert has_screen_changed(self.before, toggle)
+            client.breaker.is_available.return_value = False
+            assert has_screen_changed(self.before, toggle)
+
+    def test_ambiguous_change_reuses_the_prefetched_ocr(self):
+        img = make_screen()
+        cv2.rectangle(img, (300, 190), (370, 230), (0, 200, 0), -1)
+        toggle = self.write("toggle.png", img)
+        prefetcher = OcrPrefetcher()
+        with patch("whisper_test.ocr_utils.get_omniparser_client") as get_client, \
+                patch("whisper_test.ocr_utils.get_ocr_prefetcher", return_value=prefetcher), \
+                patch("whisper_test.ocr_utils.get_ocr_result_log"):
+            client = get_client.return_value
+            client.breaker.is_available.return_value = True
+            client.process.return_value = [["0", "text", "Settings", True, 20, 90, 150, 40]]
+            prefetch_ocr(self.before, "omniparser")
+            assert not has_screen_changed(self.before, toggle)
+            sent = [call.args[0] for call in client.process.call_args_list]
+            assert sorted(sent) == sorted([self.before, toggle])
+        prefetcher.close()
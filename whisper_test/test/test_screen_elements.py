@@ -0,0 +1,49 @@
+"""Tests for the columnar screen element representation."""
+import json
+
+import numpy as np
+import pytest
+
+from whisper_test.screen_elements import ScreenElements, A11Y_SOURCE, EZ_OCR_SOURCE, OMNIPARSER_SOURCE
+
+
+OMNIPARSER_DATA = [
+    ["0", "text", "Allow tracking?", False, 39, 456, 1029, 48],
+    ["1", "text", "Accept", True, 701, 1431, 133, 55],
+    ["2", "icon", "Close button", True, 1000, 80, 60.4, 60],
+]
+
+
+@pytest.mark.parametrize("screen_data, is_ocr, source, texts", [
+    (['Allow tracking?, Header', 'Don’t Allow, Button', 'Allow, Button'], False, A11Y_SOURCE,
+     ['Allow tracking?', 'Don’t Allow', 'Allow']),
+    ({"screen.png": [("Accept", 701, 1431, 133, 55)]}, True, EZ_OCR_SOURCE, ["Accept"]),
+    (OMNIPARSER_DATA, True, OMNIPARSER_SOURCE, ["Allow tracking?", "Accept", "Close button"]),
+    ([{"id": "1", "type": "text", "text": "Accept", "interactive": True,
+       "x": 701, "y": 1431, "width": 133, "height": 55}], True, OMNIPARSER_SOURCE, ["Accept"]),
+    ([["20", "Text", "Accept", "701", "1431", "133", "55"]], True, OMNIPARSER_SOURCE, ["Accept"]),
+])
+def test_from_screen_data(screen_data, is_ocr, source, texts):
+    elements = ScreenElements.from_screen_data(screen_data, is_ocr)
+    assert elements.source == source
+    assert elements.texts.tolist() == texts
+    assert elements.bboxes.dtype == np.int32 and elements.bboxes.shape == (len(texts), 4)
+    assert elements.raw is screen_data or elements.raw == screen_data
+    if is_ocr:
+        assert elements.find("accept") == (701, 1431, 133, 55)
+    else:
+        assert elements.types.tolist() == ['Header', 'Button', 'Button']
+        assert elements.interactive.tolist() == [False, True, True]
+        assert elements.find("allow") is None  # a11y elements have no coordinates
+
+
+def test_columns_and_serialization():
+    elements = ScreenElements.from_omniparser(OMNIPARSER_DATA)
+    assert elements.norm_texts.tolist() == ["allow tracking?", "accept", "close button"]
+    assert elements.interactive.tolist() == [False, True, True]
+    assert elements.texts_of_type("Icon") == ["Close button"]
+    records = json.loads(json.dumps(elements.to_records()))
+    assert records[2] == {"id": "2", "type": "icon", "text": "Close button", "interactive": True,
+                          "x": 1000, "y": 80, "width": 60, "height": 60}
+    assert ScreenElements.from_omniparser(records).texts.tolist() == elements.texts.tolist()
+
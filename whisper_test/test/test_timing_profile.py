@@ -0,0 +1,44 @@
+"""Tests for the learned timing profiles."""
+import unittest
+
+from whisper_test.common import SLEEP_AFTER_CMD, SLEEP_AFTER_LAUNCH_APP, SLEEP_AFTER_CUSTOM_CMD, CUSTOM_CMD
+from whisper_test.timing_profile import TimingProfile
+
+
+def make_samples(n, latency, kind="voice_cmd", phrase="Tap 1", model="D79AP", version="18.2"):
+    return [{"kind": kind, "phrase": phrase, "latency": latency, "success": True,
+             "hardware_model": model, "product_version": version} for _ in range(n)]
+
+
+class TestTimingProfile(unittest.TestCase):
+
+    def test_defaults_without_samples(self):
+        profile = TimingProfile.learn(make_samples(5, 0.5), "D79AP", "18.2")
+        assert profile.learned == {}
+        assert profile.sleep_after_cmd == SLEEP_AFTER_CMD
+        assert profile.syslog_wait_after_cmd == SLEEP_AFTER_CMD
+        assert profile.sleep_after_launch_app == SLEEP_AFTER_LAUNCH_APP
+
+    def test_learned_waits(self):
+        samples = make_samples(30, 1.0) + make_samples(30, 2.0, kind="app_launch")
+        # other devices, failed commands and other iOS versions are ignored
+        samples += make_samples(30, 0.1, model="D16AP")
+        samples += make_samples(30, 0.1, version="17.5")
+        samples += [dict(s, success=False, latency=0.1) for s in make_samples(30, 0.1)]
+        profile = TimingProfile.learn(samples, "D79AP", "18.2")
+
+        assert profile.syslog_wait_after_cmd == 2.5  # 1.0 * 1.5 + 1.0
+        assert profile.sleep_after_launch_app == 11.0  # 2.0 * 1.5 + 8.0
+
+    def test_settle_waits_are_not_learned_from_recognition_latency(self):
+        samples = make_samples(30, 0.5) + make_samples(30, 0.5, phrase=CUSTOM_CMD)
+        profile = TimingProfile.learn(samples, "D79AP", "18.2")
+        assert profile.syslog_wait_after_cmd < SLEEP_AFTER_CMD
+        assert profile.sleep_after_cmd == SLEEP_AFTER_CMD
+        assert profile.sleep_after_custom_cmd == SLEEP_AFTER_CUSTOM_CMD
+        assert set(profile.learned) == {"syslog_wait_after_cmd"}
+
+    def test_waits_never_exceed_defaults(self):
+        samples = make_samples(30, 20.0) + make_samples(30, 20.0, phrase=CUSTOM_CMD)
+        profile = TimingProfile.learn(samples, "D79AP", "18.2")
+        assert profile.waits == TimingProfile.DEFAULTS
@@ -1,9 +1,15 @@
 # WIP tests for the tts.py file
 import unittest
+from concurrent.futures import ThreadPoolExecutor
 from os.path import exists, isfile, getsize, join
-from tempfile import NamedTemporaryFile
+from tempfile import NamedTemporaryFile, TemporaryDirectory
+from threading import Event
+from time import sleep, time
+from unittest.mock import patch
 from whisper_test.tts import TTSController
-from whisper_test.common import TTS_PROVIDER_PIPER_EN_US_RYAN_HIGH, TTS_PROVIDER_PIPER_EN_US_LESSAC_MEDIUM
+from whisper_test.tts_warmup import get_command_vocabulary
+from whisper_test.common import (
+    TTS_PROVIDER_GTTS, TTS_PROVIDER_PIPER_EN_US_RYAN_HIGH, TTS_PROVIDER_PIPER_EN_US_LESSAC_MEDIUM)
 
 class TestTTS(unittest.TestCase):
 
@@ -59,3 +65,77 @@ class TestTTS(unittest.TestCase):
         assert tts.say("Hello, world", verify=False)
         assert exists(tts.tts_audio_dir)
         assert exists(tts.PIPER_BINARY_PATH)
+
+    def test_command_vocabulary(self):
+        vocabulary = get_command_vocabulary()
+        assert len(vocabulary) == len(set(vocabulary))
+        for phrase in ("150", "Tap, 9", "Swipe, left", "tap, Allow", "Tap Get", "tap stop"):
+            assert phrase in vocabulary
+
+    def test_prefetch(self):
+        futures = self.tts.prefetch(["Tap", "Tap", "Select"])
+        assert futures[0] is futures[1], "In-flight synthesis should be shared"
+        audio_file_path = self.tts.synthesize("Tap")
+        assert audio_file_path == futures[0].result()
+        assert all(isfile(future.result()) for future in futures)
+
+
+class TestTTSPrefetch(unittest.TestCase):
+    """Prefetch bookkeeping, without synthesizing audio."""
+
+    def setUp(self):
+        self.tmp_dir = TemporaryDirectory()
+        self.tts = TTSController(tts_provider=TTS_PROVIDER_GTTS, tts_audio_root_dir=self.tmp_dir.name)
+        self.tts.audio_player = None
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_prefetch_of_cached_phrase(self):
+        # a cache hit finishes before the done callback is added, which then runs right away
+        with patch.object(self.tts, "_synthesize", return_value="/cache/tap.wav"):
+            executor = ThreadPoolExecutor(max_workers=1)
+            try:
+                for _ in range(200):
+                    future = executor.submit(self.tts.prefetch, ["Tap", "Tap", "Select"])
+                    futures = future.result(timeout=5)  # a deadlock times out
+                    assert [f.result(timeout=5) for f in futures] == ["/cache/tap.wav"] * 3
+            finally:
+                executor.shutdown(wait=False)
+        # the finished syntheses are no longer pending
+        for _ in range(50):
+            if not self.tts._pending_synthesis:
+                break
+            sleep(0.01)
+        assert self.tts._pending_synthesis == {}
+
+    def test_last_playback_start(self):
+        # syslog confirmations that arrived before it belong to an earlier command
+        assert self.tts.last_playback_start is None
+        with patch("whisper_test.tts.playsound", side_effect=lambda path: sleep(0.05)):
+            t0 = time()
+            assert self.tts.play_audio(join(self.tmp_dir.name, "tap.mp3"), "Tap")
+        assert t0 <= self.tts.last_playback_start <= self.tts.last_playback_end - 0.05
+
+    def test_queued_prefetch_does_not_delay_the_chosen_phrase(self):
+        release = Event()
+
+        def synthesize(phrase):
+            if phrase.startswith("Slow"):
+                release.wait(5)
+            return f"/cache/{phrase}.wav"
+
+        with patch.object(self.tts, "_synthesize", side_effect=synthesize):
+            try:
+                # the workers are busy with the other candidates, "Tap" is queued behind them
+                futures = self.tts.prefetch([f"Slow {idx}" for idx in range(4)] + ["Tap"])
+                t0 = time()
+                assert self.tts.synthesize("Tap") == "/cache/Tap.wav"
+                assert time() - t0 < 1
+                assert futures[-1].cancelled()
+                # a cached phrase does not wait for the prefetch either
+                with patch.object(self.tts.audio_cache, "lookup", return_value="/cache/Slow 3.wav"):
+                    assert self.tts.synthesize("Slow 3") == "/cache/Slow 3.wav"
+                assert time() - t0 < 1
+            finally:
+                release.set()
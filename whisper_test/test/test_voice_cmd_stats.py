@@ -0,0 +1,61 @@
+"""Tests for the voice command latency statistics."""
+import unittest
+from os.path import join
+from tempfile import TemporaryDirectory
+
+from whisper_test.voice_cmd_stats import (
+    VoiceCmdLatencyStats, latency_histogram, load_latency_samples, recognition_vs_duration)
+
+
+class TestVoiceCmdLatencyStats(unittest.TestCase):
+
+    def test_record_command(self):
+        with TemporaryDirectory() as tmp_dir:
+            stats_path = join(tmp_dir, "stats.jsonl")
+            stats = VoiceCmdLatencyStats(stats_path, context={"hardware_model": "D79AP"})
+            stats.start_command("gTTS", "Tap 1")
+            stats.record_playback_end(100.0)
+            stats.record_playback_end(110.0)  # retry
+            assert stats.record_recognition(111.5) == 1.5
+            sample = stats.end_command(success=True)
+
+            assert sample["n_tries"] == 2
+            assert sample["latency"] == 1.5
+            assert sample["hardware_model"] == "D79AP"
+            assert load_latency_samples(stats_path) == [sample]
+
+    def test_recognition_without_command(self):
+        stats = VoiceCmdLatencyStats(stats_path=None)
+        assert stats.record_recognition(1.0) is None
+        assert stats.end_command(success=False) is None
+
+    def test_latency_histogram(self):
+        samples = [
+            {"provider": "a", "phrase": "Tap 1", "latency": 0.3, "success": True, "n_tries": 1},
+            {"provider": "a", "phrase": "Tap 2", "latency": 0.4, "success": True, "n_tries": 1},
+            {"provider": "a", "phrase": "Tap 2", "latency": 42, "success": True, "n_tries": 2},
+            {"provider": "b", "phrase": "Tap 1", "latency": None, "success": False, "n_tries": 3},
+        ]
+        by_provider = latency_histogram(samples, key="provider", bin_size=0.25, max_latency=1)
+        assert by_provider["a"]["bins"] == {0.25: 2, 0.75: 1}
+        assert by_provider["a"]["count"] == 3
+        assert by_provider["b"]["failure_rate"] == 1
+        assert by_provider["b"]["p95"] is None
+
+        by_phrase = latency_histogram(samples, key="phrase")
+        assert by_phrase["Tap 2"]["mean_tries"] == 1.5
+
+    def test_recognition_vs_duration(self):
+        fast = {"length_scale": 0.8}
+        samples = [
+            {"provider": "p", "synthesis": {}, "audio_duration": 1.0, "latency": 0.5,
+             "success": True, "n_tries": 1},
+            {"provider": "p", "synthesis": fast, "audio_duration": 0.8, "latency": 0.5,
+             "success": True, "n_tries": 1},
+            {"provider": "p", "synthesis": fast, "audio_duration": 0.8, "latency": None,
+             "success": False, "n_tries": 3},
+        ]
+        report = recognition_vs_duration(samples)
+        assert report['p {}']["time_to_recognition"] == 1.5
+        assert report['p {"length_scale": 0.8}']["first_try_rate"] == 0.5
+        assert report['p {"length_scale": 0.8}']["time_to_recognition"] == 1.3
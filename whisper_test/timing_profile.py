@@ -0,0 +1,123 @@
+"""Waits after voice commands and app launches, learned per device model and iOS version.
+
+The defaults in common.py are sized for the slowest device we have seen. Once
+enough latency samples (see voice_cmd_stats.py) exist for a device model and
+iOS version, each wait is replaced by a high percentile of the measured
+latencies, scaled and padded with a safety margin. A learned wait never
+exceeds its default.
+
+Only waits whose latency is measured are learned: the syslog wait from the
+recognition latency and the wait after app launches from the launch latency.
+The waits for the screen to settle after a command are not measured by the
+recognition latency and keep their defaults.
+
+USAGE:
+    python -m whisper_test.timing_profile [stats_path]
+"""
+import sys
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+from whisper_test.common import (
+    logger, SLEEP_AFTER_CMD, SLEEP_AFTER_LAUNCH_APP, SLEEP_AFTER_CUSTOM_CMD,
+    VOICE_CMD_STATS_PATH, TIMING_MIN_SAMPLES, TIMING_LATENCY_PERCENTILE,
+    TIMING_SAFETY_FACTOR, TIMING_SAFETY_MARGINS, TIMING_MIN_WAIT)
+from whisper_test.voice_cmd_stats import (
+    load_latency_samples, _percentile, VOICE_CMD_SAMPLE, APP_LAUNCH_SAMPLE)
+
+
+class TimingProfile:
+    """Waits used by WhisperTestDevice and DataCollector."""
+
+    DEFAULTS = {
+        # wait before scanning the syslog for the voice command confirmation
+        "syslog_wait_after_cmd": SLEEP_AFTER_CMD,
+        # wait for the screen to update after a confirmed command
+        "sleep_after_cmd": SLEEP_AFTER_CMD,
+        "sleep_after_launch_app": SLEEP_AFTER_LAUNCH_APP,
+        "sleep_after_custom_cmd": SLEEP_AFTER_CUSTOM_CMD,
+    }
+
+    def __init__(self, hardware_model: Optional[str] = None,
+                 product_version: Optional[str] = None, **waits):
+        self.hardware_model = hardware_model
+        self.product_version = product_version
+        unknown = set(waits) - set(self.DEFAULTS)
+        if unknown:
+            raise ValueError(f"Unknown waits: {sorted(unknown)}")
+        # syslog_wait_after_cmd, sleep_after_cmd, sleep_after_launch_app, sleep_after_custom_cmd
+        for name, default in self.DEFAULTS.items():
+            setattr(self, name, waits.get(name, default))
+        # waits that were learned from samples, with the number of samples used
+        self.learned: Dict[str, int] = {}
+
+    @property
+    def waits(self) -> Dict[str, float]:
+        return {name: getattr(self, name) for name in self.DEFAULTS}
+
+    def __repr__(self):
+        waits = ", ".join(f"{name}={value:.1f}" for name, value in self.waits.items())
+        return f"TimingProfile({self.hardware_model}, {self.product_version}: {waits})"
+
+    @staticmethod
+    def _tuned_wait(latencies: List[float], margin: float, default: float,
+                    min_samples: int) -> Optional[float]:
+        """Return the wait for the latencies, None if there are too few of them."""
+        if len(latencies) < min_samples:
+            return None
+        latency = _percentile(latencies, TIMING_LATENCY_PERCENTILE)
+        wait = latency * TIMING_SAFETY_FACTOR + margin
+        return min(default, max(TIMING_MIN_WAIT, wait))
+
+    @classmethod
+    def learn(cls, samples: List[dict], hardware_model: Optional[str] = None,
+              product_version: Optional[str] = None,
+              min_samples: int = TIMING_MIN_SAMPLES) -> "TimingProfile":
+        """Learn the waits from the samples of the given device model and iOS version."""
+        profile = cls(hardware_model, product_version)
+        latencies = defaultdict(list)
+        for sample in samples:
+            if (sample.get("hardware_model") != hardware_model or
+                    sample.get("product_version") != product_version or
+                    not sample.get("success") or sample.get("latency") is None or
+                    sample["latency"] < 0):
+                continue
+            kind = sample.get("kind", VOICE_CMD_SAMPLE)
+            if kind == APP_LAUNCH_SAMPLE:
+                latencies["sleep_after_launch_app"].append(sample["latency"])
+            elif kind == VOICE_CMD_SAMPLE:
+                # playback end to syslog confirmation; says nothing about when the UI settles
+                latencies["syslog_wait_after_cmd"].append(sample["latency"])
+
+        for name, values in latencies.items():
+            margin = TIMING_SAFETY_MARGINS[name]
+            wait = cls._tuned_wait(values, margin, cls.DEFAULTS[name], min_samples)
+            if wait is not None:
+                setattr(profile, name, wait)
+                profile.learned[name] = len(values)
+        return profile
+
+    @classmethod
+    def load(cls, hardware_model: Optional[str], product_version: Optional[str],
+             stats_path: str = VOICE_CMD_STATS_PATH) -> "TimingProfile":
+        """Learn the profile of the device from the latency stats file."""
+        profile = cls.learn(load_latency_samples(stats_path), hardware_model, product_version)
+        if profile.learned:
+            logger.info("⏱️ Using learned waits: %s", profile)
+        else:
+            logger.info("⏱️ Not enough latency samples for %s (iOS %s), using the default waits",
+                        hardware_model, product_version)
+        return profile
+
+
+def learn_all_profiles(samples: List[dict]) -> List[TimingProfile]:
+    """Learn a profile for every device model and iOS version in the samples."""
+    devices = {(s.get("hardware_model"), s.get("product_version")) for s in samples}
+    return [TimingProfile.learn(samples, hardware_model, product_version)
+            for hardware_model, product_version in sorted(devices, key=str)]
+
+
+if __name__ == "__main__":
+    path = sys.argv[1] if len(sys.argv) > 1 else VOICE_CMD_STATS_PATH
+    for timing_profile in learn_all_profiles(load_latency_samples(path)):
+        print(timing_profile, "learned:", timing_profile.learned or "-")
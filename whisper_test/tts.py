@@ -1,8 +1,10 @@
 import os
-import subprocess
+import threading
+import wave
+from concurrent.futures import Future, ThreadPoolExecutor
 from os.path import expanduser, join, basename
-from time import sleep
-from typing import List, Optional, Callable, Union
+from time import sleep, time
+from typing import Dict, List, Optional, Callable, Union
 
 try:
     from gtts import gTTS
@@ -12,7 +14,15 @@ except ImportError:  # Not required for all users
 from playsound import playsound
 from whisper_test.common import (
     logger, DEFAULT_TTS_LANGUAGE, DEFAULT_TTS_PROVIDER, PIPER_MODELS,
-    TTS_PROVIDER_GTTS, TTS_AUDIO_ROOT_DIR, MAX_N_VOICE_CMD_TRIES)
+    TTS_PROVIDER_GTTS, TTS_AUDIO_ROOT_DIR, MAX_N_VOICE_CMD_TRIES, PIPER_PERSISTENT_PROCESS,
+    AUDIO_PLAYBACK_STREAM, TTS_SYNTHESIS_WORKERS, PIPER_LENGTH_SCALE, TTS_TRIM_SILENCE)
+from whisper_test.exceptions import AudioStreamError, PiperProcessError
+from whisper_test.audio_cache import get_audio_cache, get_audio_duration
+from whisper_test.audio_player import (
+    get_audio_player, concatenate_buffers, load_wav, save_wav, trim_silence)
+from whisper_test.piper_backend import (
+    get_piper_pool, synthesize_once, length_scale_args, PIPER_SYNTHESIS_ARGS)
+from whisper_test.voice_cmd_stats import VoiceCmdLatencyStats
 
 
 class TTSController:
@@ -28,30 +38,64 @@ class TTSController:
     PIPER_BINARY_PATH = join(PIPER_ROOT_DIR, 'piper')
 
 
-    KEEP_CHARS_IN_AUDIO_FNAME = ('.', ',', '_')
     AUDIO_FILE_EXT = '.wav'
 
     SLEEP_BTWN_MULTIPLE_VOICE_CMDS = 0.1
+    GAP_BTWN_COMBINED_PHRASES = 0.05  # seconds of silence between combined phrases
+    MAX_PLAYBACK_DURATION = 30  # seconds
 
     def __init__(self, tts_provider: Optional[str] = DEFAULT_TTS_PROVIDER,
                  tts_audio_root_dir: Optional[str] = TTS_AUDIO_ROOT_DIR,
                  tts_language: Optional[str] = DEFAULT_TTS_LANGUAGE,
-                 verify_func: Optional[Callable[[str], bool]] = None):
+                 verify_func: Optional[Callable[[str], bool]] = None,
+                 latency_stats: Optional[VoiceCmdLatencyStats] = None,
+                 length_scale: float = PIPER_LENGTH_SCALE,
+                 trim_silence: bool = TTS_TRIM_SILENCE):
         """Initialize the TTS controller."""
         self.tts_provider = tts_provider
         self.tts_language = tts_language
+        # speech rate of piper voices (< 1.0: faster), and whether wav silence is trimmed
+        self.length_scale = length_scale
+        self.trim_silence = trim_silence
         self.tts_audio_root_dir = tts_audio_root_dir
         self.tts_audio_dir = join(
             self.tts_audio_root_dir, self.tts_provider)
         self.create_audio_dirs()
+        # shared by all controllers using the same root directory
+        self.audio_cache = get_audio_cache(self.tts_audio_root_dir)
+        # one persistent output stream shared by all controllers (None: use playsound)
+        self.audio_player = get_audio_player() if AUDIO_PLAYBACK_STREAM else None
         # optional: verify voice command success (using system logs)
         self.verify_func = verify_func
+        # playback end and syslog confirmation timestamps of verified commands
+        self.latency_stats = latency_stats if latency_stats is not None else VoiceCmdLatencyStats()
+        # the audio was queued for playback at last_playback_start
+        self.last_playback_start: Optional[float] = None
+        self.last_playback_end: Optional[float] = None
+        self.last_playback_duration: Optional[float] = None
+        # synthesis of upcoming phrases runs in the background while the current one plays
+        self._synthesis_executor = ThreadPoolExecutor(
+            max_workers=TTS_SYNTHESIS_WORKERS, thread_name_prefix="tts-synthesis")
+        self._pending_synthesis: Dict[str, Future] = {}  # phrase -> in-flight synthesis
+        self._pending_lock = threading.Lock()
+        if self.tts_provider in PIPER_MODELS and PIPER_PERSISTENT_PROCESS:
+            get_piper_pool(self.get_piper_model_path(), self.piper_extra_args).resize(TTS_SYNTHESIS_WORKERS)
 
     def create_audio_dirs(self) -> None:
         """Create the audio directories for the given TTS provider."""
         os.makedirs(self.tts_audio_root_dir, exist_ok=True)
         os.makedirs(self.tts_audio_dir, exist_ok=True)
 
+    def get_piper_model_path(self) -> str:
+        """Get the path of the ONNX model of the Piper voice."""
+        model_name = self.tts_provider.split('piper_')[1]
+        return join(self.get_piper_root_dir(), f'{model_name}.onnx')
+
+    @property
+    def piper_extra_args(self) -> List[str]:
+        """Piper arguments on top of PIPER_SYNTHESIS_ARGS."""
+        return length_scale_args(self.length_scale)
+
     def generate_audio_from_text(self, text: str, audio_file_path: str) -> None:
         """Call the TTS provider to convert text to speech."""
         if self.tts_provider == TTS_PROVIDER_GTTS:
@@ -60,36 +104,42 @@ class TTSController:
             tts = gTTS(text=text, lang=self.tts_language)
             tts.save(audio_file_path)
         elif self.tts_provider in PIPER_MODELS:
-            model_name = self.tts_provider.split('piper_')[1]
-            model_path = join(self.get_piper_root_dir(), f'{model_name}.onnx')
-
-            subprocess.run(
-                [
-                    "piper",
-                    "--model", model_path,
-                    "--output_file", audio_file_path,
-                    "--noise_scale", "0",
-                    "--noise_w", "0",
-                    "--sentence_silence", "0",
-                ],
-                input=text,
-                capture_output=True, text=True, check=True
-            )
+            model_path = self.get_piper_model_path()
+
+            if PIPER_PERSISTENT_PROCESS:
+                try:
+                    get_piper_pool(model_path, self.piper_extra_args).synthesize(text, audio_file_path)
+                    return
+                except PiperProcessError as e:
+                    logger.error("❌ Persistent piper process failed, spawning piper: %s", e)
+            synthesize_once(model_path, text, audio_file_path, self.piper_extra_args)
         else:
             raise ValueError(f"Unknown TTS provider: {self.tts_provider}")
 
-    def _get_audio_filename(self, phrase: str) -> str:
-        """Generate a valid filename for the audio file."""
-        phrase = phrase.replace(" ", "_")
-        sanitized_phrase = "".join(
-            c for c in phrase if c.isalnum() or c in self.KEEP_CHARS_IN_AUDIO_FNAME
-        ).rstrip()
-        return (sanitized_phrase + self.AUDIO_FILE_EXT).lower()
+    @property
+    def synthesis_params(self) -> dict:
+        """Parameters that change the synthesized audio, part of the audio cache key."""
+        if self.tts_provider == TTS_PROVIDER_GTTS:
+            return {"language": self.tts_language}
+        params = {"piper_args": PIPER_SYNTHESIS_ARGS + self.piper_extra_args}
+        if self.trim_silence:
+            params["trim_silence"] = True
+        return params
+
+    def postprocess_audio(self, audio_file_path: str) -> None:
+        """Trim the leading and trailing silence of a piper wav file in place."""
+        if not self.trim_silence or self.tts_provider not in PIPER_MODELS:
+            return
+        try:
+            buffer = load_wav(audio_file_path)
+        except (wave.Error, ValueError, EOFError) as e:
+            logger.info("Cannot trim the silence of %s: %s", basename(audio_file_path), e)
+            return
+        save_wav(trim_silence(buffer), audio_file_path)
 
-    def _get_audio_path(self, text: str) -> str:
-        """Get the audio path for the given text."""
-        audio_filename = self._get_audio_filename(text)
-        return join(self.tts_audio_dir, audio_filename)
+    def _get_audio_cache_key(self, tts_phrase: str) -> str:
+        """Get the audio cache key for the exact phrase sent to the TTS provider."""
+        return self.audio_cache.make_key(self.tts_provider, self.synthesis_params, tts_phrase)
 
     def append_comma(self, phrase: str) -> str:
         """Append a comma to the phrase if it doesn't end with one."""
@@ -98,37 +148,172 @@ class TTSController:
         # logger.info("Appended ', ' for better audio synthesis '%s'", phrase)
         return phrase + ", "
 
-    def text_to_speech(self, phrase: str, play_sound: bool = True) -> bool:
-        """Convert text to speech and optionally play the audio."""
+    def prefetch(self, phrases: Union[str, List[str]]) -> List[Future]:
+        """Synthesize the phrases in the background so they are ready when they are said.
+
+        Returns one future per phrase resolving to its audio path (None on error).
+        A phrase that is already being synthesized is not submitted again.
+        """
+        if isinstance(phrases, str):
+            phrases = [phrases]
+        futures, submitted = [], []
+        with self._pending_lock:
+            for phrase in phrases:
+                future = self._pending_synthesis.get(phrase)
+                if future is None:
+                    future = self._synthesis_executor.submit(self._prefetch_one, phrase)
+                    self._pending_synthesis[phrase] = future
+                    submitted.append((phrase, future))
+                futures.append(future)
+        # a finished future (e.g. a cache hit) runs the callback right away, which takes the lock
+        for phrase, future in submitted:
+            future.add_done_callback(lambda done, phrase=phrase: self._discard_pending(phrase, done))
+        return futures
+
+    def _discard_pending(self, phrase: str, future: Future) -> None:
+        with self._pending_lock:
+            # a later prefetch of the phrase may have replaced the finished future
+            if self._pending_synthesis.get(phrase) is future:
+                del self._pending_synthesis[phrase]
+
+    def _prefetch_one(self, phrase: str) -> Optional[str]:
+        """Synthesize the phrase and decode it into the player's memory."""
+        audio_file_path = self._synthesize(phrase)
+        if audio_file_path is not None and self.audio_player is not None:
+            try:
+                self.audio_player.load(audio_file_path)
+            except (wave.Error, ValueError, EOFError):
+                pass  # not a 16-bit wav, played with playsound
+        return audio_file_path
+
+    def synthesize(self, phrase: str) -> Optional[str]:
+        """Return the audio path of the phrase, from the cache if possible.
+
+        A prefetch of the phrase that is running is waited for. One that is
+        still queued behind other candidates is cancelled and the phrase is
+        synthesized right away.
+        """
+        audio_file_path = self.audio_cache.lookup(self._get_audio_cache_key(self._tts_phrase(phrase)))
+        if audio_file_path is not None:
+            return audio_file_path
+        with self._pending_lock:
+            future = self._pending_synthesis.get(phrase)
+        if future is not None and not future.cancel():
+            return future.result()
+        return self._synthesize(phrase)
+
+    def _tts_phrase(self, phrase: str) -> str:
+        """Return the text sent to the TTS provider for the phrase."""
         TTS_APPEND_COMMA_SINGLE_PHRASE = True
-        audio_file_path = self._get_audio_path(phrase)
         if TTS_APPEND_COMMA_SINGLE_PHRASE:
-            tts_phrase = self.append_comma(phrase)
-        else:
-            tts_phrase = phrase
+            return self.append_comma(phrase)
+        return phrase
+
+    def _synthesize(self, phrase: str) -> Optional[str]:
+        """Generate the audio for the phrase unless it is cached and return its path."""
+        tts_phrase = self._tts_phrase(phrase)
+        cache_key = self._get_audio_cache_key(tts_phrase)
+        audio_file_path = self.audio_cache.lookup(cache_key)
+        if audio_file_path is not None:
+            return audio_file_path
+
+        audio_file_path = self.audio_cache.path_for(
+            self.tts_provider, cache_key, self.AUDIO_FILE_EXT)
+        # write to a temporary file first, so parallel synthesis never exposes partial files
+        root, ext = os.path.splitext(audio_file_path)
+        tmp_audio_file_path = f"{root}.{threading.get_ident()}.part{ext}"
+        try:
+            self.generate_audio_from_text(tts_phrase, tmp_audio_file_path)
+            self.postprocess_audio(tmp_audio_file_path)
+            os.replace(tmp_audio_file_path, audio_file_path)
+        except Exception as e:
+            logger.error("❌ Error generating the audio for phrase %s: %s", phrase, e)
+            return None
+        self.audio_cache.add(cache_key, audio_file_path, text=tts_phrase,
+                             provider=self.tts_provider, params=self.synthesis_params)
+        return audio_file_path
 
-        if not os.path.exists(audio_file_path):
-            try:
-                self.generate_audio_from_text(tts_phrase, audio_file_path)
-            except Exception as e:
-                logger.error("❌ Error generating the audio for phrase %s: %s", phrase, e)
-                return False
+    def text_to_speech(self, phrase: str, play_sound: bool = True) -> bool:
+        """Convert text to speech and optionally play the audio."""
+        audio_file_path = self.synthesize(phrase)
+        if audio_file_path is None:
+            return False
 
         if play_sound:
-            return self.play_audio(audio_file_path)
-
-    def play_audio(self, audio_file_path: str) -> bool:
+            return self.play_audio(audio_file_path, phrase)
+        return True
+
+    def play_audio_async(self, audio_file_path: str) -> Optional[Future]:
+        """Queue the audio on the persistent output stream.
+
+        Returns a future resolving to the playback end time, or None if the
+        stream player is not available or cannot decode the file (e.g. mp3).
+        If the output stream cannot be opened, the stream player is disabled.
+        """
+        if self.audio_player is None:
+            return None
+        try:
+            return self.audio_player.play(audio_file_path)
+        except (wave.Error, ValueError, EOFError) as e:
+            logger.info("Cannot stream %s, falling back to playsound: %s", basename(audio_file_path), e)
+            return None
+        except AudioStreamError as e:
+            self._disable_audio_player(e)
+            return None
+
+    def _disable_audio_player(self, error: Exception) -> None:
+        logger.error("❌ %s, using playsound from now on", error)
+        self.audio_player = None
+
+    def play_audio(self, audio_file_path: str, phrase: Optional[str] = None) -> bool:
         """Play the audio file."""
         try:
-            logger.info("🗣 Playing the audio file %s", basename(audio_file_path))
-            playsound(audio_file_path)
+            logger.info("🗣 Playing the audio file %s (%s)", basename(audio_file_path), phrase)
+            self.last_playback_start = time()
+            self.last_playback_duration = get_audio_duration(audio_file_path)
+            playback = self.play_audio_async(audio_file_path)
+            if playback is not None:
+                self.last_playback_end = playback.result(timeout=self.MAX_PLAYBACK_DURATION)
+            else:
+                playsound(audio_file_path)
+                self.last_playback_end = time()
             return True
         except Exception as e:
             logger.error("❌ Error playing the audio file %s: %s", basename(audio_file_path), e)
             return False
 
-
-
+    def _say_combined(self, phrases: List[str]) -> Optional[bool]:
+        """Play the phrases as a single utterance.
+
+        The cached audio of the phrases is joined into one buffer with short
+        gaps, instead of playing the files one by one. Returns None if the
+        phrases cannot be combined (no stream player or output device, non-wav audio).
+        """
+        if self.audio_player is None:
+            return None
+        audio_file_paths = [future.result() for future in self.prefetch(phrases)]
+        if None in audio_file_paths:
+            return False
+        try:
+            buffer = concatenate_buffers(
+                [self.audio_player.load(path) for path in audio_file_paths],
+                gap_seconds=self.GAP_BTWN_COMBINED_PHRASES)
+        except (wave.Error, ValueError, EOFError) as e:
+            logger.info("Cannot combine the audio of %s: %s", phrases, e)
+            return None
+        try:
+            logger.info("🗣 Playing '%s' as one utterance", " ".join(phrases))
+            self.last_playback_start = time()
+            self.last_playback_duration = buffer.duration
+            self.last_playback_end = self.audio_player.play(buffer).result(
+                timeout=buffer.duration + self.MAX_PLAYBACK_DURATION)
+            return True
+        except AudioStreamError as e:
+            self._disable_audio_player(e)
+            return None
+        except Exception as e:
+            logger.error("❌ Error playing '%s': %s", " ".join(phrases), e)
+            return False
 
     def say(self, phrases: Union[str, List[str]], verify: bool = True,
             n_max_tries: int = MAX_N_VOICE_CMD_TRIES, verify_as_whole: bool = True) -> bool:
@@ -136,23 +321,59 @@ class TTSController:
         if isinstance(phrases, str):
             phrases = [phrases]
 
-        for attempt in range(n_max_tries):
-            all_said = True
+        record_latency = verify and self.verify_func is not None
+        if record_latency:
+            self.latency_stats.start_command(self.tts_provider, " ".join(phrases),
+                                             synthesis_params=self.synthesis_params)
 
-            for phrase_index, phrase in enumerate(phrases):
-                # only verify the last phrase if verify_as_whole is True
-                verify_part = verify and not verify_as_whole
+        all_said = self._say_with_retries(phrases, verify, n_max_tries, verify_as_whole)
 
-                if not self.text_to_speech(phrase):
-                    all_said = False
-                    break
+        if record_latency:
+            self.latency_stats.end_command(all_said)
+        return all_said
 
-                if verify_part and self.verify_func and not self.verify_func(phrase):
-                    all_said = False
-                    break
+    def _say_with_retries(self, phrases: List[str], verify: bool,
+                          n_max_tries: int, verify_as_whole: bool) -> bool:
+        """Say the phrases, verify them and retry the whole sequence on failure."""
+        # only verify the last phrase if verify_as_whole is True
+        verify_part = verify and not verify_as_whole
+
+        for attempt in range(n_max_tries):
+            all_said = True
 
-                if phrase_index < len(phrases) - 1:  # Only sleep between phrases, not after the last one
-                    sleep(self.SLEEP_BTWN_MULTIPLE_VOICE_CMDS)
+            said_combined = None
+            if len(phrases) > 1 and not verify_part:
+                said_combined = self._say_combined(phrases)
+            elif len(phrases) > 1:
+                # the next phrases are synthesized while the first one plays
+                self.prefetch(phrases[1:])
+
+            if said_combined is not None:
+                all_said = said_combined
+                if all_said:
+                    self.latency_stats.record_playback_end(
+                        self.last_playback_end, self.last_playback_duration)
+            else:
+                attempt_duration = 0.0  # audio duration of the phrases said in this attempt
+                for phrase_index, phrase in enumerate(phrases):
+                    if not self.text_to_speech(phrase):
+                        all_said = False
+                        break
+                    attempt_duration += self.last_playback_duration or 0.0
+
+                    if verify_part:
+                        self.latency_stats.record_playback_end(
+                            self.last_playback_end, self.last_playback_duration)
+                    elif phrase_index == len(phrases) - 1:
+                        self.latency_stats.record_playback_end(
+                            self.last_playback_end, attempt_duration)
+
+                    if verify_part and self.verify_func and not self.verify_func(phrase):
+                        all_said = False
+                        break
+
+                    if phrase_index < len(phrases) - 1:  # Only sleep between phrases, not after the last one
+                        sleep(self.SLEEP_BTWN_MULTIPLE_VOICE_CMDS)
 
             if all_said:
                 if not verify or not self.verify_func:
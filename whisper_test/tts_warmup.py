@@ -0,0 +1,108 @@
+"""Warm up the TTS audio cache with the known voice command vocabulary.
+
+USAGE:
+    python -m whisper_test.tts_warmup --provider piper_en_US-amy-medium --workers 8
+"""
+import argparse
+import os
+from concurrent.futures import ThreadPoolExecutor
+from time import time
+from typing import List, Optional
+
+from whisper_test.common import (
+    logger, DEFAULT_TTS_PROVIDER, PIPER_MODELS, RULE_BASED_ACTION_MAPPINGS, CUSTOM_CMD)
+from whisper_test.piper_backend import get_piper_pool
+from whisper_test.tts import TTSController
+
+
+GRID_CELL_COUNT = 150  # 10x15 (portrait) or 15x10 (landscape) grid
+GRID_SUB_CELL_COUNT = 9  # 3x3 sub-cells
+SWIPE_SCROLL_DIRECTIONS = ('left', 'right', 'up', 'down')
+
+# fixed fragments of the say_* methods of TTSController
+SAY_TEMPLATE_PHRASES = [
+    "Tap", "Choose", "Select", "Type", "Press", "key", "Drag", "to", "Start drag",
+    "Drop,", "Tap and hold", "emoji", "Decrement", "Increment", "by",
+    "Show grid", "Show grid with", "columns and", "rows",
+]
+
+# grid commands used by WhisperTestDevice.click_coordinates
+GRID_COMMANDS = [
+    "Show grid with 15 columns and 10 rows",
+    "show grid with 10 columns and 15 rows",
+]
+
+# App Store and Files app commands used by app_utils
+APP_STORE_COMMANDS = [
+    "Tap Get", "Tap Install", "Tap one", "Tap re-download", "Tap update",
+    "Tap Open", "Open Files", "Tap cancel", "Tap done",
+]
+
+# start/stop screen recording commands used by WhisperTestDevice
+SCREEN_RECORDING_COMMANDS = [
+    "start screen recording", "go home",
+    "show grids with 10 columns and 15 rows", "tap 2", "tap stop",
+]
+
+
+def get_command_vocabulary() -> List[str]:
+    """Return every phrase WhisperTest is known to say, without duplicates."""
+    phrases = list(SAY_TEMPLATE_PHRASES)
+    phrases += [f"Swipe, {direction}" for direction in SWIPE_SCROLL_DIRECTIONS]
+    phrases += [f"Scroll, {direction}" for direction in SWIPE_SCROLL_DIRECTIONS]
+    phrases += GRID_COMMANDS
+    # grid cell numbers; sub-cell numbers are included in 1..150
+    phrases += [str(number) for number in range(1, GRID_CELL_COUNT + 1)]
+    phrases += [f"Tap, {number}" for number in range(1, GRID_SUB_CELL_COUNT + 1)]
+    # rule-based buttons, formatted like create_rule_based_command
+    for dialog_mappings in RULE_BASED_ACTION_MAPPINGS.values():
+        for button_names in dialog_mappings.values():
+            phrases += [f"tap, {button_name}" for button_name in button_names]
+    phrases += ["tap, Cancel", "tap, Ok", "tap, cancel", CUSTOM_CMD]
+    phrases += APP_STORE_COMMANDS
+    phrases += SCREEN_RECORDING_COMMANDS
+    return list(dict.fromkeys(phrases))
+
+
+def warmup_audio_cache(tts_provider: str = DEFAULT_TTS_PROVIDER,
+                       phrases: Optional[List[str]] = None,
+                       n_workers: Optional[int] = None) -> dict:
+    """Synthesize the phrases (default: the command vocabulary) in parallel.
+
+    Each worker drives its own Piper process, so synthesis runs on
+    `n_workers` cores (default: all cores).
+    """
+    if phrases is None:
+        phrases = get_command_vocabulary()
+    if n_workers is None:
+        n_workers = os.cpu_count() or 1
+
+    tts = TTSController(tts_provider=tts_provider, verify_func=None)
+    if tts_provider in PIPER_MODELS:
+        get_piper_pool(tts.get_piper_model_path(), tts.piper_extra_args).resize(n_workers)
+
+    logger.info("🚀 Warming up the audio cache for %s: %d phrases, %d workers",
+                tts_provider, len(phrases), n_workers)
+    t0 = time()
+    with ThreadPoolExecutor(max_workers=n_workers) as executor:
+        audio_paths = list(executor.map(tts.synthesize, phrases))
+
+    failed = [phrase for phrase, path in zip(phrases, audio_paths) if path is None]
+    duration = time() - t0
+    logger.info("✅ Audio cache warmed up in %.1f s (%d failed)", duration, len(failed))
+    return {"n_phrases": len(phrases), "failed": failed, "duration": duration}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Synthesize the voice command vocabulary.")
+    parser.add_argument("--provider", default=DEFAULT_TTS_PROVIDER, help="TTS provider")
+    parser.add_argument("--workers", type=int, default=None, help="Number of parallel workers")
+    args = parser.parse_args()
+    result = warmup_audio_cache(args.provider, n_workers=args.workers)
+    print(f"Synthesized {result['n_phrases']} phrases in {result['duration']:.1f} s")
+    for phrase in result["failed"]:
+        print(f"Failed: {phrase}")
+
+
+if __name__ == "__main__":
+    main()
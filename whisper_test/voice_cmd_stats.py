@@ -0,0 +1,241 @@
+"""Recognition latency statistics for voice commands.
+
+Every verified voice command produces one sample with the time the audio
+playback ended, the time the confirmation ("Recognized text is a command" or
+"Matched Grammar") arrived in the syslog, and the number of tries it took.
+Samples are appended to a JSONL file so they can be aggregated across sessions.
+Samples also store the synthesis parameters and the duration of the played
+audio, to compare the recognition rate of faster or trimmed speech.
+"""
+import json
+import os
+import sys
+from collections import defaultdict
+from os.path import dirname
+from threading import Lock
+from time import time
+from typing import Dict, List, Optional
+
+from whisper_test.common import (
+    logger, VOICE_CMD_STATS_PATH, LATENCY_HISTOGRAM_BIN_SIZE, LATENCY_HISTOGRAM_MAX)
+
+
+VOICE_CMD_SAMPLE = "voice_cmd"
+APP_LAUNCH_SAMPLE = "app_launch"
+
+
+class VoiceCmdLatencyStats:
+    """Collect playback end, syslog confirmation and retry timestamps of voice commands."""
+
+    def __init__(self, stats_path: Optional[str] = VOICE_CMD_STATS_PATH,
+                 context: Optional[dict] = None):
+        self.stats_path = stats_path
+        # extra fields stored with every sample (e.g. device model, iOS version)
+        self.context = context if context is not None else {}
+        self.samples: List[dict] = []
+        self._current: Optional[dict] = None
+        self._lock = Lock()
+
+    def start_command(self, provider: str, phrase: str,
+                      synthesis_params: Optional[dict] = None) -> None:
+        """Start recording a new voice command."""
+        with self._lock:
+            self._current = {
+                "provider": provider,
+                "phrase": phrase,
+                "synthesis": synthesis_params or {},
+                "started_at": time(),
+                "attempts": [],
+            }
+
+    def record_playback_end(self, playback_end: Optional[float] = None,
+                            audio_duration: Optional[float] = None) -> None:
+        """Record the end of the audio playback for a new attempt."""
+        with self._lock:
+            if self._current is None:
+                return
+            self._current["attempts"].append({
+                "playback_end": time() if playback_end is None else playback_end,
+                "audio_duration": audio_duration,
+                "recognized_at": None,
+                "latency": None,
+            })
+
+    def record_recognition(self, recognized_at: float) -> Optional[float]:
+        """Record the arrival of the syslog confirmation for the last attempt."""
+        with self._lock:
+            if self._current is None or not self._current["attempts"]:
+                return None
+            attempt = self._current["attempts"][-1]
+            attempt["recognized_at"] = recognized_at
+            attempt["latency"] = recognized_at - attempt["playback_end"]
+            return attempt["latency"]
+
+    def end_command(self, success: bool) -> Optional[dict]:
+        """Finish the current command and store its sample."""
+        with self._lock:
+            sample, self._current = self._current, None
+        if sample is None:
+            return None
+        sample.update(self.context)
+        sample["kind"] = VOICE_CMD_SAMPLE
+        sample["n_tries"] = len(sample["attempts"])
+        sample["success"] = success
+        latencies = [a["latency"] for a in sample["attempts"] if a["latency"] is not None]
+        sample["latency"] = latencies[-1] if latencies else None
+        sample["audio_duration"] = (sample["attempts"][-1]["audio_duration"]
+                                    if sample["attempts"] else None)
+        self.samples.append(sample)
+        self._append_to_file(sample)
+        return sample
+
+    def record_event(self, kind: str, latency: float, **fields) -> dict:
+        """Store a latency sample that is not a voice command (e.g. an app launch)."""
+        sample = {"kind": kind, "latency": latency, "success": True, "n_tries": 1, **fields}
+        sample.update(self.context)
+        self.samples.append(sample)
+        self._append_to_file(sample)
+        return sample
+
+    def _append_to_file(self, sample: dict) -> None:
+        """Append the sample to the stats file."""
+        if not self.stats_path:
+            return
+        try:
+            os.makedirs(dirname(self.stats_path), exist_ok=True)
+            with open(self.stats_path, 'a') as f:
+                f.write(json.dumps(sample) + "\n")
+        except OSError as e:
+            logger.error("❌ Error writing voice command stats to %s: %s", self.stats_path, e)
+
+
+def load_latency_samples(stats_path: str = VOICE_CMD_STATS_PATH) -> List[dict]:
+    """Load the voice command samples stored in a JSONL file."""
+    samples = []
+    try:
+        with open(stats_path, 'r') as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    samples.append(json.loads(line))
+    except FileNotFoundError:
+        logger.info("No voice command stats found at %s", stats_path)
+    return samples
+
+
+def _percentile(values: List[float], pct: float) -> Optional[float]:
+    """Return the given percentile (0-100) of the values."""
+    if not values:
+        return None
+    values = sorted(values)
+    idx = min(len(values) - 1, max(0, round(pct / 100 * (len(values) - 1))))
+    return values[idx]
+
+
+def latency_histogram(samples: List[dict], key: str = "provider",
+                      bin_size: float = LATENCY_HISTOGRAM_BIN_SIZE,
+                      max_latency: float = LATENCY_HISTOGRAM_MAX) -> Dict[str, dict]:
+    """Aggregate voice command samples into latency histograms grouped by `key` (provider or phrase).
+
+    Bins are keyed by their lower edge in seconds. Latencies above `max_latency`
+    are counted in the last bin.
+    """
+    n_bins = int(max_latency / bin_size)
+    groups = defaultdict(list)
+    for sample in samples:
+        if sample.get("kind", VOICE_CMD_SAMPLE) == VOICE_CMD_SAMPLE:
+            groups[sample.get(key)].append(sample)
+
+    histograms = {}
+    for group, group_samples in groups.items():
+        latencies = [s["latency"] for s in group_samples
+                     if s.get("latency") is not None and s["latency"] >= 0]
+        bins = defaultdict(int)
+        for latency in latencies:
+            bin_idx = min(int(latency / bin_size), n_bins - 1)
+            bins[round(bin_idx * bin_size, 3)] += 1
+        n_failed = sum(1 for s in group_samples if not s.get("success"))
+        histograms[group] = {
+            "count": len(group_samples),
+            "failure_rate": n_failed / len(group_samples),
+            "mean_tries": sum(s.get("n_tries", 1) for s in group_samples) / len(group_samples),
+            "p50": _percentile(latencies, 50),
+            "p95": _percentile(latencies, 95),
+            "max": max(latencies) if latencies else None,
+            "bins": dict(sorted(bins.items())),
+        }
+    return histograms
+
+
+def synthesis_setting_key(sample: dict) -> str:
+    """Return a readable key of the provider and synthesis parameters of a sample."""
+    params = sample.get("synthesis") or {}
+    return f"{sample.get('provider')} {json.dumps(params, sort_keys=True)}"
+
+
+def recognition_vs_duration(samples: List[dict]) -> Dict[str, dict]:
+    """Compare the recognition rate and audio duration of each synthesis setting.
+
+    `time_to_recognition` is the mean audio duration plus the mean latency of
+    recognized commands: the setting with the lowest value that still has a
+    high `first_try_rate` is the fastest reliable one.
+    """
+    groups = defaultdict(list)
+    for sample in samples:
+        if sample.get("kind", VOICE_CMD_SAMPLE) == VOICE_CMD_SAMPLE:
+            groups[synthesis_setting_key(sample)].append(sample)
+
+    report = {}
+    for setting, group_samples in groups.items():
+        durations = [s["audio_duration"] for s in group_samples if s.get("audio_duration")]
+        latencies = [s["latency"] for s in group_samples
+                     if s.get("success") and s.get("latency") is not None]
+        mean_duration = sum(durations) / len(durations) if durations else None
+        mean_latency = sum(latencies) / len(latencies) if latencies else None
+        n_first_try = sum(1 for s in group_samples if s.get("success") and s.get("n_tries") == 1)
+        report[setting] = {
+            "count": len(group_samples),
+            "success_rate": sum(1 for s in group_samples if s.get("success")) / len(group_samples),
+            "first_try_rate": n_first_try / len(group_samples),
+            "mean_audio_duration": mean_duration,
+            "mean_latency": mean_latency,
+            "time_to_recognition": (mean_duration + mean_latency
+                                    if mean_duration is not None and mean_latency is not None
+                                    else None),
+        }
+    return report
+
+
+def print_recognition_report(samples: List[dict]) -> None:
+    """Print the recognition rate versus audio duration of each synthesis setting, fastest first."""
+    def fmt(value):
+        return f"{value:.2f}s" if value is not None else "-"
+
+    report = recognition_vs_duration(samples)
+    for setting, row in sorted(report.items(),
+                               key=lambda kv: kv[1]["time_to_recognition"] or float("inf")):
+        print(f"{setting}: n={row['count']} first_try={row['first_try_rate']:.0%} "
+              f"success={row['success_rate']:.0%} duration={fmt(row['mean_audio_duration'])} "
+              f"latency={fmt(row['mean_latency'])} total={fmt(row['time_to_recognition'])}")
+
+
+def print_latency_report(samples: List[dict], key: str = "provider") -> None:
+    """Print latency histograms grouped by `key`, slowest groups first."""
+    histograms = latency_histogram(samples, key=key)
+    for group, hist in sorted(histograms.items(), key=lambda kv: -(kv[1]["p95"] or 0)):
+        p50 = f"{hist['p50']:.2f}s" if hist["p50"] is not None else "-"
+        p95 = f"{hist['p95']:.2f}s" if hist["p95"] is not None else "-"
+        print(f"{group}: n={hist['count']} p50={p50} p95={p95} "
+              f"failures={hist['failure_rate']:.0%} tries={hist['mean_tries']:.2f}")
+        for bin_start, count in hist["bins"].items():
+            print(f"  {bin_start:5.2f}s {'#' * count}")
+
+
+if __name__ == "__main__":
+    # USAGE: python -m whisper_test.voice_cmd_stats [provider|phrase|setting] [stats_path]
+    group_key = sys.argv[1] if len(sys.argv) > 1 else "provider"
+    path = sys.argv[2] if len(sys.argv) > 2 else VOICE_CMD_STATS_PATH
+    if group_key == "setting":
+        print_recognition_report(load_latency_samples(path))
+    else:
+        print_latency_report(load_latency_samples(path), key=group_key)